@@ -1,14 +1,453 @@
-from AES.AES_Encryption import Encryption
-from AES.AES_Decryption import Decryption
+from AES.Key_Expansion import key_cache as shared_key_cache
+from AES.Key_Derivation import get_kdf, resolve_key, derived_key_cache as shared_derived_key_cache
+from AES.AES_Pure import PURE_ENGINE, PURE_MODES, encrypt_blocks as pure_encrypt_blocks
+from AES.Streaming import Stream_Encryptor, Stream_Decryptor
+from AES.AES_File import transform_file, SEGMENT_SIZE
+from AES.CipherText import CipherText
+from AES.Container import Container_Writer, Container_Reader
+from AES.basic_functions import basic_functions
+import threading
+
+# The NumPy engines, the cipher modes built on them, the process pool and asyncio support are imported on first
+# use, so a process that only handles short messages starts without loading them.
+
+# Messages up to this many bytes run on the pure-Python path by default
+SMALL_MESSAGE = 256
+# Engines whose small messages may take the pure-Python path: the default, and automatic selection, which makes no
+# promise about the backend either. An explicitly chosen backend, such as "bitslice" for its resistance to cache
+# timing, always runs.
+PURE_ENGINES = ("batch", "auto")
+
+def __getattr__(name):
+    # InvalidTag is defined with GCM, which is only imported once an authenticated mode is used
+    if name == "InvalidTag":
+        from AES.GCM import InvalidTag
+        return InvalidTag
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class AES:
-    def __init__(self,AESMODE=128) -> None:        
-        self.aesE = Encryption(AESMODE=AESMODE)
-        self.aesD = Decryption(AESMODE=AESMODE) 
-        self.AESOutput = None       
+    def __init__(self,AESMODE=128,key_cache=None,engine="batch",kdf="sha256",salt=b'',derived_key_cache=None,
+                 small_message=SMALL_MESSAGE) -> None:        
+        """
+        Facade over the registered AES backends.
+
+        Every `key` argument is either a raw key of AESMODE/8 bytes, used as is, or a str password that is turned
+        into a key with `kdf`. Derived keys are cached, so a slow KDF such as PBKDF2 or scrypt runs once per
+        password rather than once per message.
+
+        An instance holds no per-call state: every call keeps its state on its own stack, and the shared caches
+        are locked, so a single instance can serve any number of threads at once. The engines spend their time in
+        NumPy operations, which run without the GIL on large arrays.
+
+        Construction does no work up front: the engine is created, and its name checked, on first use. With the
+        default or the "auto" engine, messages of at most `small_message` bytes in ECB, CBC, CFB, OFB and CTR mode
+        run on the pure-Python T-table engine of `AES_Pure` instead, which gives the same output, is faster for a
+        few blocks and needs no NumPy. Any other engine handles every message itself.
+
+        Parameters:
+            AESMODE (int): The key size in bits (128, 192, or 256).
+            key_cache (Key_Cache, optional): Cache of expanded key schedules. Defaults to the process wide cache.
+            engine (str, optional): The backend name, see `Backends.available_backends()`, or "auto" to benchmark 
+                                    the verified backends for each message size and use the fastest, picked
+                                    separately for encryption and decryption.
+            kdf (str or object, optional): The key derivation function for passwords: "sha256" (the original
+                                           unsalted hash), "pbkdf2", "scrypt", or a configured object from
+                                           `Key_Derivation` such as `PBKDF2_KDF(iterations=...)`.
+            salt (bytes, optional): The salt for password derivation. Use a random salt stored with the data.
+            derived_key_cache (Derived_Key_Cache, optional): Cache of derived keys. Defaults to the process wide
+                                                             cache.
+            small_message (int, optional): Messages up to this many bytes take the pure-Python path, if `engine`
+                                           is "batch" or "auto". 0 sends every message to `engine`.
+        """
+        self.AESMODE = AESMODE
+        self.key_cache = shared_key_cache if key_cache is None else key_cache
+        self.engine = engine
+        self.kdf = get_kdf(kdf)
+        self.salt = bytes(salt)
+        self.derived_key_cache = shared_derived_key_cache if derived_key_cache is None else derived_key_cache
+        self.functions = basic_functions()
+        self._instances = {}
+        self._lock = threading.Lock()
+        self.small_message = small_message
+        self._async = None
+    @property
+    def aesE(self):
+        return self._select(16)[0]
+    @property
+    def aesD(self):
+        return self._select(16)[1]
     def Encryption(self,plainText,key):
-        self.AESOutput = self.aesE.Encryption(plainText,key) 
-        return self.AESOutput       
+        """
+        Encrypt text block by block (ECB), zero padded to whole blocks.
+
+        Parameters:
+            plainText (str or bytes-like): The plaintext. Strings are encoded as UTF-8.
+            key (str or bytes-like): The password, or a raw key of AESMODE/8 bytes.
+
+        Returns:
+            CipherText: The ciphertext, which records the plaintext length so the padding can be dropped again.
+        """
+        data = self.functions.to_hex(plainText)[0]
+        if self._pure(len(data)):
+            blocks = bytes(data).ljust(16 * max(1, -(-len(data) // 16)), b'\x00')
+            return CipherText(pure_encrypt_blocks(blocks,self._keys(key)),len(data))
+        blocks = self.functions.overflow(data)
+        return CipherText(self._select(blocks.size)[0].encrypt_blocks(blocks,self._keys(key)),len(data))
     def Decryption(self,cyphertext,key):
-        self.AESOutput = self.aesD.Decryption(cyphertext,key)
-        return self.AESOutput
\ No newline at end of file
+        """
+        Decrypt a ciphertext back to text.
+
+        Parameters:
+            cyphertext (CipherText or np.ndarray): A CipherText from `Encryption` or `encrypt`, or legacy state
+                                                   matrices of shape (4, 4) or (N, 4, 4).
+            key (str or bytes-like): The password, or a raw key of AESMODE/8 bytes.
+
+        Returns:
+            str: The decrypted text. Legacy matrices keep their zero padding.
+        """
+        if isinstance(cyphertext,CipherText):
+            return self.decrypt(cyphertext,key).decode('utf-8',errors='replace')
+        data = CipherText.from_matrix(cyphertext).data
+        return self._select(len(data))[1].decrypt_blocks(data,self._keys(key)).decode('utf-8',errors='replace')
+    def encrypt(self,data,key,mode="CTR",iv=None,offset=0,aad=None):
+        """
+        Encrypt data with a cipher mode. ECB and CBC plaintexts are PKCS#7 padded; CFB, OFB and CTR
+        ciphertexts have the length of the plaintext, and GCM ciphertexts are followed by a 16-byte tag.
+
+        Parameters:
+            data (str or bytes-like): The plaintext. Strings are encoded as UTF-8.
+            key (str or bytes-like): The password, or a raw key of AESMODE/8 bytes.
+            mode (str, optional): The cipher mode, see `Modes.MODES`.
+            iv (bytes): The 16-byte IV, or for CTR the nonce. ECB takes none.
+            offset (int, optional): For CTR, the byte position of `data` within the whole message.
+            aad (bytes, optional): For GCM, associated data that is authenticated but not encrypted.
+
+        Returns:
+            CipherText: The ciphertext with its mode, iv and plaintext length.
+
+        Raises:
+            ValueError: If the mode is unknown, the iv is missing or has the wrong length, an offset is
+                        given for a mode that cannot seek, or aad is given for a mode without authentication.
+        """
+        data = self._data(data)
+        cipher = self._mode(mode,key,iv,len(data),offset,aad=aad)
+        if cipher.tag_size:
+            out = cipher.seal(data)
+        elif cipher.padding:
+            out = cipher.encrypt(self.functions.pkcs7_pad(data),offset)
+        else:
+            out = cipher.encrypt(data,offset)
+        return CipherText(out,len(data),mode,cipher.iv)
+    def decrypt(self,data,key,mode=None,iv=None,offset=0,aad=None):
+        """
+        Decrypt data with a cipher mode. For CTR, `data` may be any byte range of the ciphertext, with `offset`
+        giving its position, so the bytes before it never have to be read. For GCM the tag is verified before
+        anything is decrypted.
+
+        Parameters:
+            data (CipherText or bytes-like): The ciphertext. A CipherText supplies the mode, the iv and the
+                                             plaintext length, so the padding is cut off by length.
+            key (str or bytes-like): The password, or a raw key of AESMODE/8 bytes.
+            mode (str, optional): The cipher mode. Defaults to the CipherText's mode, else CTR.
+            iv (bytes, optional): The IV or nonce. Defaults to the CipherText's iv.
+            offset (int, optional): For CTR, the byte position of `data` within the whole message.
+            aad (bytes, optional): For GCM, the associated data passed to `encrypt`.
+
+        Returns:
+            bytes: The plaintext, with any padding removed.
+
+        Raises:
+            ValueError: If the mode is unknown, the iv is missing or has the wrong length, an offset is given
+                        for a mode that cannot seek, or the padding is invalid.
+            InvalidTag: If the GCM tag does not match.
+        """
+        length = None
+        if isinstance(data,CipherText):
+            mode = data.mode if mode is None else mode
+            iv = data.iv if iv is None else iv
+            data, length = data.data, data.length
+        mode = "CTR" if mode is None else mode
+        cipher = self._mode(mode,key,iv,len(data),offset,decrypting=True,aad=aad)
+        if cipher.tag_size:
+            return cipher.open(data)
+        if cipher.padding:
+            if not len(data) or len(data) % 16:
+                raise ValueError(f"{mode} ciphertext must be a non-empty multiple of 16 bytes long")
+            plain = cipher.decrypt(data,offset)
+            return plain[:length] if length is not None else self.functions.pkcs7_unpad(plain)
+        return cipher.decrypt(data,offset)
+    def encrypt_many(self,pairs,mode="CTR",ivs=None):
+        """
+        Encrypt many messages, each under its own key, in one pass. Meant for large numbers of short messages,
+        where the per-call overhead of `encrypt` outweighs the cipher itself. The keys are expanded together and
+        every block runs through one engine pass: the instance's engine if it supports per-block keys, as "batch"
+        and "bitslice" do, otherwise the batch engine.
+
+        Parameters:
+            pairs (sequence of tuple): (key, plaintext) pairs. Keys are passwords or raw keys as for `encrypt`,
+                                       plaintexts str or bytes-like.
+            mode (str, optional): "CTR", or "ECB" with PKCS#7 padding.
+            ivs (sequence of bytes, optional): For CTR, one nonce per message.
+
+        Returns:
+            list: A CipherText per message, in order.
+
+        Raises:
+            ValueError: If the mode is not supported or a nonce is missing or has the wrong length.
+        """
+        keys = [self._raw_key(key) for key, _ in pairs]
+        messages = [bytes(self._data(data)) for _, data in pairs]
+        out = self._multi_key().encrypt(keys,messages,mode,ivs)
+        return [CipherText(data,len(message),mode,None if ivs is None else ivs[i])
+                for i,(data,message) in enumerate(zip(out,messages))]
+    def decrypt_many(self,pairs,mode=None,ivs=None):
+        """
+        Decrypt many messages, each under its own key, the counterpart of `encrypt_many`.
+
+        Parameters:
+            pairs (sequence of tuple): (key, ciphertext) pairs. CipherText objects supply their iv, and the first
+                                       one the mode.
+            mode (str, optional): "CTR" or "ECB". Defaults to the mode of the first CipherText, else CTR.
+            ivs (sequence of bytes, optional): For CTR, one nonce per message. Defaults to the CipherText ivs.
+
+        Returns:
+            list: The plaintext of every message, as bytes.
+        """
+        keys = [self._raw_key(key) for key, _ in pairs]
+        texts = [data for _, data in pairs]
+        if mode is None:
+            mode = texts[0].mode if texts and isinstance(texts[0],CipherText) else "CTR"
+        if ivs is None and mode == "CTR":
+            ivs = [data.iv if isinstance(data,CipherText) else None for data in texts]
+        return self._multi_key().decrypt(keys,[bytes(self._data(data)) for data in texts],mode,
+                                         None if ivs is None else [iv if iv is not None else b'' for iv in ivs])
+    def encrypt_into(self,src,dst,key,mode="CTR",iv=None,offset=0):
+        """
+        Encrypt `src` into a buffer the caller owns, or in place when `dst` is `src`. Meant for hot paths that must
+        not allocate: on the batch engine the work runs in fixed scratch buffers that are reused by every call,
+        so in the steady state no memory is allocated in proportion to the data. The instance's engine is used if
+        it can write into a buffer, as "batch" and "bitslice" can, so "bitslice" keeps its constant-time rounds,
+        at the cost of temporary bit-planes per slice. Otherwise the batch engine runs the call.
+
+        Parameters:
+            src (bytes-like or np.ndarray): The plaintext.
+            dst (bytearray, memoryview or np.ndarray): A writable contiguous buffer at least as long as `src`.
+            key (str or bytes-like): The password, or a raw key of AESMODE/8 bytes.
+            mode (str, optional): "CTR", or "ECB" for whole blocks without padding.
+            iv (bytes): For CTR, the nonce.
+            offset (int, optional): For CTR, the byte position of `src` within the whole message.
+
+        Returns:
+            int: The number of bytes written to `dst`.
+
+        Raises:
+            ValueError: If the mode cannot write into a buffer, `dst` is read-only or too short, or an ECB input
+                        is not a multiple of 16 bytes long.
+        """
+        return self._mode(mode,key,iv,0,offset,engines=self._engine_with("blocks_into")).encrypt_into(
+            self._data(src),dst,offset)
+    def decrypt_into(self,src,dst,key,mode="CTR",iv=None,offset=0):
+        """
+        Decrypt `src` into a buffer the caller owns, or in place, the counterpart of `encrypt_into`.
+
+        Returns:
+            int: The number of bytes written to `dst`.
+        """
+        return self._mode(mode,key,iv,0,offset,decrypting=True,engines=self._engine_with("blocks_into")).decrypt_into(
+            self._data(src),dst,offset)
+    def keystream(self,key,iv,offset,length):
+        """Return `length` bytes of CTR keystream for `key` and nonce `iv`, starting at byte `offset`."""
+        return self._mode("CTR",key,iv,length).keystream(offset,length)
+    def encryptor(self,key,mode="CTR",iv=None,aad=None):
+        """
+        Start an incremental encryption, for streams too large to hold in memory.
+
+        Parameters:
+            key (str or bytes-like): The password, or a raw key of AESMODE/8 bytes.
+            mode (str, optional): The cipher mode, see `Modes.MODES`.
+            iv (bytes): The IV, or for CTR the nonce.
+            aad (bytes, optional): For GCM, associated data. More can be streamed in with
+                                   `authenticate_additional_data` before the first `update`.
+
+        Returns:
+            Stream_Encryptor: An object with `update(chunk) -> bytes` and `finalize() -> bytes`.
+        """
+        return Stream_Encryptor(self._mode(mode,key,iv,SEGMENT_SIZE,aad=aad))
+    def decryptor(self,key,mode="CTR",iv=None,aad=None):
+        """
+        Start an incremental decryption, the counterpart of `encryptor`. For GCM the stream ends with the tag,
+        which `finalize` verifies.
+
+        Returns:
+            Stream_Decryptor: An object with `update(chunk) -> bytes` and `finalize() -> bytes`.
+        """
+        return Stream_Decryptor(self._mode(mode,key,iv,SEGMENT_SIZE,decrypting=True,aad=aad))
+    def encrypt_file(self,src,dst,key,mode="CTR",iv=None,chunk_size=SEGMENT_SIZE,aad=None):
+        """
+        Encrypt a file of any size through memory maps, without reading it into memory.
+
+        Parameters:
+            src (str or os.PathLike): The plaintext file.
+            dst (str or os.PathLike): The ciphertext file, created or replaced once complete. It may be `src`.
+            key (str or bytes-like): The password, or a raw key of AESMODE/8 bytes.
+            mode (str, optional): The cipher mode, see `Modes.MODES`.
+            iv (bytes): The IV, or for CTR the nonce.
+            chunk_size (int, optional): Bytes processed per engine call, a multiple of 16.
+            aad (bytes, optional): For GCM, associated data that is authenticated but not encrypted.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        return transform_file(self.encryptor(key,mode,iv,aad),src,dst,chunk_size)
+    def decrypt_file(self,src,dst,key,mode="CTR",iv=None,chunk_size=SEGMENT_SIZE,aad=None):
+        """
+        Decrypt a file written by `encrypt_file`, the same way. If a GCM tag does not verify, the output file is
+        left as it was and InvalidTag is raised.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        return transform_file(self.decryptor(key,mode,iv,aad),src,dst,chunk_size)
+    def xts(self,key,tweak_key,sector_size=4096):
+        """
+        Create an XTS cipher for sector-addressed storage.
+
+        Parameters:
+            key (str or bytes-like): The data key, a password or a raw key of AESMODE/8 bytes.
+            tweak_key (str or bytes-like): The tweak key, given the same way. It must differ from `key`.
+            sector_size (int, optional): The sector size in bytes for batched sector calls.
+
+        Returns:
+            XTS_Mode: An object with `encrypt_sector(sector, data)`, `encrypt_sectors(first_sector, data)` and
+                      the matching decryption methods.
+        """
+        from AES.XTS import XTS_Mode
+        aesE, aesD = self._select(sector_size)
+        return XTS_Mode(aesE,aesD,self._keys(key),self._keys(tweak_key),sector_size)
+    def container_writer(self,path,key,mode="CTR",chunk_size=SEGMENT_SIZE,nonce=None,append=False):
+        """
+        Create or append to a seekable encrypted container file, see `Container.Container_Writer`.
+
+        Returns:
+            Container_Writer: A file-like writer. Close it, or use it as a context manager, to write the index.
+        """
+        return Container_Writer(path,self,key,mode,chunk_size,nonce,append)
+    def container_reader(self,path,key):
+        """
+        Open an encrypted container for random-access reads, see `Container.Container_Reader`.
+
+        Returns:
+            Container_Reader: A file-like reader with `read`, `seek`, `tell` and `read_at`.
+        """
+        return Container_Reader(path,self,key)
+    def parallel(self,processes=None,chunk_size=SEGMENT_SIZE):
+        """
+        Create a multi-process scheduler for this key size and engine.
+
+        Parameters:
+            processes (int, optional): The number of worker processes. Defaults to the number of CPUs.
+            chunk_size (int, optional): Bytes per task, a multiple of 16.
+
+        Returns:
+            Parallel_Scheduler: The scheduler. Close it, or use it as a context manager, to stop the workers.
+        """
+        from AES.Parallel import Parallel_Scheduler
+        return Parallel_Scheduler(self.AESMODE,self.engine,processes,chunk_size,kdf=self.kdf,salt=self.salt,
+                                  derived_key_cache=self.derived_key_cache)
+    def asynchronous(self,executor=None,inline_threshold=1 << 16,max_in_flight=64 * SEGMENT_SIZE):
+        """
+        Create an asyncio front end with its own executor and limits, see `Asynchronous.Async_Cipher`. It also
+        encrypts and decrypts `asyncio.StreamReader`/`StreamWriter` pairs with `encrypt_stream`/`decrypt_stream`.
+
+        Parameters:
+            executor (concurrent.futures.Executor, optional): A thread or process pool for large jobs. Defaults to
+                                                              the loop's default executor.
+            inline_threshold (int, optional): Jobs below this many bytes run on the event loop.
+            max_in_flight (int, optional): Bytes of offloaded jobs allowed to run at the same time.
+
+        Returns:
+            Async_Cipher: The asyncio front end.
+        """
+        from AES.Asynchronous import Async_Cipher
+        return Async_Cipher(self,executor,inline_threshold,max_in_flight)
+    async def encrypt_async(self,data,key,mode="CTR",iv=None,offset=0,aad=None):
+        """
+        `encrypt` for asyncio code. Large payloads run on the loop's default executor, so the loop stays free.
+        Use `asynchronous` to pick the executor and limits.
+
+        Returns:
+            CipherText: The ciphertext with its mode, iv and plaintext length.
+        """
+        return await self._async_cipher().encrypt(data,key,mode,iv,offset,aad)
+    async def decrypt_async(self,data,key,mode=None,iv=None,offset=0,aad=None):
+        """
+        `decrypt` for asyncio code, see `encrypt_async`.
+
+        Returns:
+            bytes: The plaintext, with any padding removed.
+        """
+        return await self._async_cipher().decrypt(data,key,mode,iv,offset,aad)
+    def _async_cipher(self):
+        if self._async is None:
+            with self._lock:
+                if self._async is None:
+                    self._async = self.asynchronous()
+        return self._async
+    def _data(self,data):
+        if isinstance(data, CipherText):
+            return data.data
+        return self.functions.to_hex(data)[0] if isinstance(data, str) else data
+    def _mode(self,mode,key,iv,message_size,offset=0,decrypting=False,aad=None,engines=None):
+        from AES.Modes import MODES, new_mode
+        pure = engines is None and aad is None and mode in PURE_MODES and self._pure(message_size)
+        if not pure:
+            from AES import GCM  # registers GCM in MODES
+        mode_class = MODES.get(mode)
+        if offset and mode_class is not None and not mode_class.seekable:
+            raise ValueError(f"{mode} mode cannot start at an offset")
+        if pure:
+            engines = PURE_ENGINE, PURE_ENGINE
+        elif mode_class is not None and not (mode_class.parallel_decrypt if decrypting else mode_class.parallel_encrypt):
+            message_size = 16  # sequential modes run one block per engine call
+        aesE, aesD = self._select(message_size) if engines is None else engines
+        cipher = new_mode(mode,aesE,aesD,self._keys(key),None if iv is None else self._data(iv))
+        if aad is not None:
+            cipher.authenticate_additional_data(self._data(aad))
+        return cipher
+    def _pure(self,message_size):
+        return message_size <= self.small_message and self.engine in PURE_ENGINES
+    def _keys(self,key):
+        return self.key_cache.get(self._raw_key(key),self.AESMODE)
+    def _raw_key(self,key):
+        return resolve_key(key,self.AESMODE,self.kdf,self.salt,self.derived_key_cache)
+    def _multi_key(self):
+        from AES.Multi_Key import Multi_Key_Batch
+        aesE, aesD = self._engine_with("blocks_multi")
+        return Multi_Key_Batch(aesE,self.AESMODE,self.key_cache)
+    def _engine_with(self,method):
+        # Paths needing `encrypt_<method>`/`decrypt_<method>`, which only some backends have. The configured engine
+        # runs them when it can, so a choice such as "bitslice" is honoured. The others, which are table based like
+        # the batch engine, and "auto" fall back to it.
+        if self.engine != "auto":
+            aesE, aesD = self._backend(self.engine)
+            if method == "blocks_multi":
+                aesD = aesE  # one engine runs both directions of a multi-key batch
+            if hasattr(aesE,"encrypt_"+method) and hasattr(aesD,"decrypt_"+method):
+                return aesE, aesD
+        return self._backend("batch")
+    def _select(self,message_size):
+        if self.engine != "auto":
+            return self._backend(self.engine)
+        from AES.Backends import select_backend
+        # The backends rank differently in each direction, so encryption and decryption are picked separately
+        return (self._backend(select_backend(self.AESMODE, message_size, direction="encrypt"))[0],
+                self._backend(select_backend(self.AESMODE, message_size, direction="decrypt"))[1])
+    def _backend(self,name):
+        engines = self._instances.get(name)
+        if engines is None:
+            with self._lock:
+                engines = self._instances.get(name)
+                if engines is None:
+                    from AES.Backends import get_backend
+                    engines = self._instances[name] = get_backend(name, self.AESMODE).create(self.AESMODE, self.key_cache)
+        return engines
\ No newline at end of file
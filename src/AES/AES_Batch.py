@@ -0,0 +1,312 @@
+from AES.SBOX import SBOX
+from AES.Key_Expansion import key_cache as shared_key_cache
+from AES.basic_functions import basic_functions
+from AES.Galois_Field import Galois_Field
+import numpy as np
+import threading
+
+# ShiftRows as a permutation of the 16 bytes of a row-major 4x4 state: row r is rotated left by r
+SHIFT_ROWS = np.array([row * 4 + (col + row) % 4 for row in range(4) for col in range(4)])
+INV_SHIFT_ROWS = np.array([row * 4 + (col - row) % 4 for row in range(4) for col in range(4)])
+# The same permutations on blocks in byte order, where byte col * 4 + row holds state[row, col]
+BYTE_SHIFT_ROWS = np.array([(col + row) % 4 * 4 + row for col in range(4) for row in range(4)])
+BYTE_INV_SHIFT_ROWS = np.array([(col - row) % 4 * 4 + row for col in range(4) for row in range(4)])
+# Multiplication by 2 and by 4 in GF(2^8), used by MixColumns and InvMixColumns
+MUL2_ARRAY = np.frombuffer(Galois_Field.MUL2, dtype=np.uint8)
+MUL4_ARRAY = MUL2_ARRAY[MUL2_ARRAY]
+
+def _byte_round_keys(keys):
+    """The round keys in byte order, shape (rounds + 1, 16)."""
+    return np.ascontiguousarray(keys.round_keys.transpose(0, 2, 1)).reshape(-1, 16)
+
+class Batch_Engine:
+    def __init__(self, AESMODE=128, key_cache=None, chunk_blocks=65536):
+        """
+        AES engine that encrypts and decrypts a whole message as one (N, 4, 4) uint8 array.
+
+        Every round is applied to all N blocks at once: SubBytes is a table gather, ShiftRows a fixed index
+        permutation, MixColumns table lookups and XORs, and AddRoundKey a broadcast XOR. Messages are
+        processed in slices of `chunk_blocks` blocks so the temporary arrays stay cache friendly.
+
+        Parameters:
+            AESMODE (int): The key size in bits (128, 192, or 256).
+            key_cache (Key_Cache, optional): Cache of expanded key schedules. Defaults to the process wide cache.
+            chunk_blocks (int, optional): The number of blocks transformed per pass.
+        """
+        self.sbox = SBOX()
+        self.field = Galois_Field()
+        self.functions = basic_functions()
+        self.key_cache = shared_key_cache if key_cache is None else key_cache
+        self.AESMODE = AESMODE
+        self.key_rounds = {128: 10, 192: 12, 256: 14}[self.AESMODE]
+        self.chunk_blocks = chunk_blocks
+        self._scratch = threading.local()
+
+    def shift_rows(self, states):
+        """Apply ShiftRows to a stack of states of shape (N, 4, 4)."""
+        return states.reshape(-1, 16)[:, SHIFT_ROWS].reshape(states.shape)
+
+    def inv_shift_rows(self, states):
+        """Apply InvShiftRows to a stack of states of shape (N, 4, 4)."""
+        return states.reshape(-1, 16)[:, INV_SHIFT_ROWS].reshape(states.shape)
+
+    def encrypt_states(self, states, keys):
+        """
+        Encrypt a stack of states.
+
+        Parameters:
+            states (np.ndarray): A uint8 array of shape (N, 4, 4) in state layout.
+            keys (Expanded_Key): The expanded key schedule.
+
+        Returns:
+            np.ndarray: The encrypted states, shape (N, 4, 4).
+        """
+        state = states ^ keys[0]
+        for i in range(1, self.key_rounds):
+            state = self.sbox.matrix_Sub(state)
+            state = self.shift_rows(state)
+            state = self.field.mix_columns(state)
+            state ^= keys[i]
+        state = self.sbox.matrix_Sub(state)
+        state = self.shift_rows(state)
+        state ^= keys[self.key_rounds]
+        return state
+
+    def decrypt_states(self, states, keys):
+        """
+        Decrypt a stack of states.
+
+        Parameters:
+            states (np.ndarray): A uint8 array of shape (N, 4, 4) in state layout.
+            keys (Expanded_Key): The expanded key schedule.
+
+        Returns:
+            np.ndarray: The decrypted states, shape (N, 4, 4).
+        """
+        state = states ^ keys[self.key_rounds]
+        for i in range(self.key_rounds - 1, 0, -1):
+            state = self.inv_shift_rows(state)
+            state = self.sbox.inv_matrix_sub(state)
+            state ^= keys[i]
+            state = self.field.inv_mix_columns(state)
+        state = self.inv_shift_rows(state)
+        state = self.sbox.inv_matrix_sub(state)
+        state ^= keys[0]
+        return state
+
+    def encrypt_blocks(self, data, keys):
+        """
+        Encrypt a buffer of whole 16-byte blocks.
+
+        Parameters:
+            data (bytes-like): The blocks to encrypt, a multiple of 16 bytes long.
+            keys (Expanded_Key): The expanded key schedule.
+
+        Returns:
+            bytes: The encrypted blocks.
+        """
+        return self._run(self.encrypt_states, data, keys)
+
+    def decrypt_blocks(self, data, keys):
+        """
+        Decrypt a buffer of whole 16-byte blocks.
+
+        Parameters:
+            data (bytes-like): The blocks to decrypt, a multiple of 16 bytes long.
+            keys (Expanded_Key): The expanded key schedule.
+
+        Returns:
+            bytes: The decrypted blocks.
+        """
+        return self._run(self.decrypt_states, data, keys)
+
+    def encrypt_blocks_multi(self, data, schedules, index):
+        """
+        Encrypt a buffer of 16-byte blocks where every block has its own key.
+
+        The round keys of each slice of blocks are gathered once from `schedules`, giving an array indexed by round
+        and then by block, so `encrypt_states` runs unchanged: each AddRoundKey XORs every block with its own
+        round key instead of broadcasting one.
+
+        Parameters:
+            data (bytes-like): The blocks to encrypt, a multiple of 16 bytes long.
+            schedules (np.ndarray): A uint8 array of shape (K, rounds + 1, 4, 4), see `Key_Expansion.expand_keys`.
+            index (np.ndarray): For every block, the position of its key schedule in `schedules`.
+
+        Returns:
+            bytes: The encrypted blocks.
+        """
+        return self._run_multi(self.encrypt_states, data, schedules, index)
+
+    def decrypt_blocks_multi(self, data, schedules, index):
+        """Decrypt a buffer of 16-byte blocks where every block has its own key, see `encrypt_blocks_multi`."""
+        return self._run_multi(self.decrypt_states, data, schedules, index)
+
+    def encrypt_blocks_into(self, src, dst, keys):
+        """
+        Encrypt whole 16-byte blocks from `src` into `dst` without allocating.
+
+        The blocks are transformed in byte order straight in `dst`: every step of a round writes into one of a few
+        scratch buffers of at most `chunk_blocks` blocks through NumPy's `out=` arguments, so once the scratch
+        buffers have grown to the largest slice seen, nothing is allocated per call. Every thread has scratch
+        buffers of its own, so one engine can serve several threads at once.
+
+        Parameters:
+            src (np.ndarray): A flat uint8 array, a multiple of 16 bytes long.
+            dst (np.ndarray): A writable flat uint8 array of the same length. It may be `src` itself.
+            keys (Expanded_Key): The expanded key schedule.
+        """
+        self._run_into(self._encrypt_into, src, dst, keys.derived('batch_bytes', _byte_round_keys))
+
+    def decrypt_blocks_into(self, src, dst, keys):
+        """Decrypt whole 16-byte blocks from `src` into `dst` without allocating, see `encrypt_blocks_into`."""
+        self._run_into(self._decrypt_into, src, dst, keys.derived('batch_bytes', _byte_round_keys))
+
+    def scratch(self, name, shape, dtype=np.uint8):
+        """
+        Return a work buffer of the given shape, reusing the buffer the calling thread keeps under `name` when it
+        is large enough.
+
+        Parameters:
+            name (str): The buffer name. Buffers in use at the same time need different names.
+            shape (tuple): The shape required. Only the first dimension may vary between calls.
+            dtype (np.dtype, optional): The element type.
+
+        Returns:
+            np.ndarray: A view of the first `shape[0]` rows of the kept buffer, with arbitrary contents.
+        """
+        buffers = self._scratch.__dict__
+        buffer = buffers.get(name)
+        if buffer is None or len(buffer) < shape[0] or buffer.shape[1:] != tuple(shape[1:]) or buffer.dtype != dtype:
+            buffer = buffers[name] = np.empty(shape, dtype=dtype)
+        return buffer[:shape[0]]
+
+    def Encryption(self, plaintext, key):
+        """
+        Encrypt the given plaintext, zero padded to a whole number of blocks.
+
+        Parameters:
+            plaintext (str or bytes): The plaintext to be encrypted.
+            key (str): The encryption key, which is hashed based on the AES mode.
+
+        Returns:
+            np.ndarray: The ciphertext as uint8 state matrices, either a single 4x4 block or an array
+                        of shape (N, 4, 4), the same layout as `Encryption.Encryption`.
+        """
+        keys = self.key_cache.get(self.functions.hash_key(key, self.AESMODE), self.AESMODE)
+        blocks = self.functions.overflow(self.functions.to_hex(plaintext)[0])
+        states = self._chunked(self.encrypt_states, blocks.reshape(-1, 4, 4).transpose(0, 2, 1), keys)
+        return states[0] if len(states) == 1 else states
+
+    def Decryption(self, ciphertext, key):
+        """
+        Decrypt ciphertext produced by `Encryption` back to text.
+
+        Parameters:
+            ciphertext (np.ndarray): The ciphertext state matrices, shape (4, 4) or (N, 4, 4).
+            key (str): The encryption key, which is hashed based on the AES mode.
+
+        Returns:
+            str: The decrypted text, including any zero padding.
+        """
+        keys = self.key_cache.get(self.functions.hash_key(key, self.AESMODE), self.AESMODE)
+        states = np.asarray(ciphertext, dtype=np.uint8)
+        if states.size == 0 or states.size % 16:
+            raise ValueError("CipherText is not 16 bytes of length make sure its a correct encryption ciphertext")
+        states = self._chunked(self.decrypt_states, states.reshape(-1, 4, 4), keys)
+        return self.functions.to_text(*states)
+
+    def _chunked(self, transform, states, keys):
+        if len(states) <= self.chunk_blocks:
+            return transform(states, keys)
+        out = np.empty(states.shape, dtype=np.uint8)
+        for start in range(0, len(states), self.chunk_blocks):
+            stop = start + self.chunk_blocks
+            out[start:stop] = transform(states[start:stop], keys)
+        return out
+
+    def _run(self, transform, data, keys):
+        blocks = np.frombuffer(data, dtype=np.uint8)
+        if blocks.size % 16:
+            raise ValueError("Data must be a multiple of 16 bytes long")
+        states = blocks.reshape(-1, 4, 4).transpose(0, 2, 1)
+        states = self._chunked(transform, states, keys)
+        return states.transpose(0, 2, 1).tobytes()
+
+    def _run_multi(self, transform, data, schedules, index):
+        blocks = np.frombuffer(data, dtype=np.uint8)
+        if blocks.size % 16:
+            raise ValueError("Data must be a multiple of 16 bytes long")
+        states = blocks.reshape(-1, 4, 4).transpose(0, 2, 1)
+        if len(index) != len(states):
+            raise ValueError(f"Got {len(index)} key indices for {len(states)} blocks")
+        out = np.empty(states.shape, dtype=np.uint8)
+        for start in range(0, len(states), self.chunk_blocks):
+            stop = start + self.chunk_blocks
+            keys = schedules[index[start:stop]].swapaxes(0, 1)  # (rounds + 1, n, 4, 4)
+            out[start:stop] = transform(states[start:stop], keys)
+        return out.transpose(0, 2, 1).tobytes()
+
+    def _run_into(self, transform, src, dst, round_keys):
+        if len(src) % 16 or len(dst) != len(src):
+            raise ValueError("Data must be a multiple of 16 bytes long and fit the output buffer")
+        step = 16 * self.chunk_blocks
+        for start in range(0, len(src), step):
+            stop = min(start + step, len(src))
+            transform(src[start:stop].reshape(-1, 16), dst[start:stop].reshape(-1, 16), round_keys)
+
+    def _lookup(self, table, indices, out):
+        """Table gather into `out`. NumPy would convert uint8 indices to a fresh intp array, so reuse one instead."""
+        index = self.scratch('index', (indices.size,), np.intp).reshape(indices.shape)
+        np.copyto(index, indices)
+        np.take(table, index, out=out, mode='clip')
+
+    def _mix_columns_into(self, b, x):
+        """MixColumns of the byte-order blocks `b` written to `x`, as `Galois_Field.mix_columns`."""
+        n = len(b)
+        t, u, c = self.scratch('t', (n, 4)), self.scratch('u', (n, 16)), self.scratch('c', (n, 16))
+        b4, u4 = b.reshape(-1, 4, 4), u.reshape(-1, 4, 4)
+        np.bitwise_xor(b4[:, :, 0], b4[:, :, 1], out=t)
+        np.bitwise_xor(t, b4[:, :, 2], out=t)
+        np.bitwise_xor(t, b4[:, :, 3], out=t)
+        np.bitwise_xor(b4[:, :, :3], b4[:, :, 1:], out=u4[:, :, :3])
+        np.bitwise_xor(b4[:, :, 3], b4[:, :, 0], out=u4[:, :, 3])
+        self._lookup(MUL2_ARRAY, u, c)
+        np.bitwise_xor(b4, t[:, :, np.newaxis], out=x.reshape(-1, 4, 4))
+        np.bitwise_xor(x, c, out=x)
+
+    def _encrypt_into(self, src, x, round_keys):
+        n = len(src)
+        a, b = self.scratch('a', (n, 16)), self.scratch('b', (n, 16))
+        sbox = self.sbox.s_box_array
+        np.bitwise_xor(src, round_keys[0], out=x)
+        for i in range(1, self.key_rounds):
+            np.take(x, BYTE_SHIFT_ROWS, axis=1, out=a, mode='clip')
+            self._lookup(sbox, a, b)
+            self._mix_columns_into(b, x)
+            np.bitwise_xor(x, round_keys[i], out=x)
+        np.take(x, BYTE_SHIFT_ROWS, axis=1, out=a, mode='clip')
+        self._lookup(sbox, a, b)
+        np.bitwise_xor(b, round_keys[self.key_rounds], out=x)
+
+    def _decrypt_into(self, src, x, round_keys):
+        n = len(src)
+        a, b = self.scratch('a', (n, 16)), self.scratch('b', (n, 16))
+        v, w = self.scratch('v', (n, 8)), self.scratch('w', (n, 8))
+        v4, w4 = v.reshape(-1, 4, 2), w.reshape(-1, 4, 2)
+        inv_sbox = self.sbox.inv_s_box_array
+        np.bitwise_xor(src, round_keys[self.key_rounds], out=x)
+        for i in range(self.key_rounds - 1, 0, -1):
+            np.take(x, BYTE_INV_SHIFT_ROWS, axis=1, out=a, mode='clip')
+            self._lookup(inv_sbox, a, b)
+            np.bitwise_xor(b, round_keys[i], out=b)
+            # InvMixColumns = MixColumns after XORing rows 0, 2 with 4 * (s0 ^ s2) and rows 1, 3 with 4 * (s1 ^ s3)
+            b4 = b.reshape(-1, 4, 4)
+            np.bitwise_xor(b4[:, :, :2], b4[:, :, 2:], out=v4)
+            self._lookup(MUL4_ARRAY, v, w)
+            np.bitwise_xor(b4[:, :, :2], w4, out=b4[:, :, :2])
+            np.bitwise_xor(b4[:, :, 2:], w4, out=b4[:, :, 2:])
+            self._mix_columns_into(b, x)
+        np.take(x, BYTE_INV_SHIFT_ROWS, axis=1, out=a, mode='clip')
+        self._lookup(inv_sbox, a, b)
+        np.bitwise_xor(b, round_keys[0], out=x)
@@ -0,0 +1,224 @@
+from AES.AES_Batch import Batch_Engine, SHIFT_ROWS, INV_SHIFT_ROWS
+import numpy as np
+
+ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+def _rotate_left(value, bits):
+    return ((value << bits) | (value >> (8 - bits))) & 0xFF
+
+def bitslice(states):
+    """
+    Transpose a stack of states into bit-planes.
+
+    Parameters:
+        states (np.ndarray): A uint8 array of shape (N, 4, 4) in state layout.
+
+    Returns:
+        np.ndarray: A uint64 array of shape (8, 16, G) with G = ceil(N / 64). planes[b, i, g] holds bit b of
+                    state byte i (row-major) for blocks 64 * g ... 64 * g + 63, one block per bit.
+    """
+    n = len(states)
+    groups = max(1, -(-n // 64))
+    blocks = np.zeros((groups * 64, 16), dtype=np.uint8)
+    blocks[:n] = states.reshape(n, 16)
+    # (16, G, 64) bytes -> (8, 16, G, 64) bits -> 64 bits packed into one uint64 per plane word
+    bytes_first = np.ascontiguousarray(blocks.reshape(groups, 64, 16).transpose(2, 0, 1))
+    bits = np.unpackbits(bytes_first[np.newaxis], axis=0, bitorder='little')
+    return np.packbits(bits, axis=-1, bitorder='little').view('<u8').reshape(8, 16, groups)
+
+def unbitslice(planes, n):
+    """Inverse of `bitslice`: turn (8, 16, G) bit-planes back into the first `n` states of shape (n, 4, 4)."""
+    groups = planes.shape[2]
+    bits = np.unpackbits(planes.astype('<u8').view(np.uint8).reshape(8, 16, groups, 8), axis=-1, bitorder='little')
+    bytes_first = np.packbits(bits, axis=0, bitorder='little')[0]  # (16, G, 64)
+    blocks = bytes_first.transpose(1, 2, 0).reshape(groups * 64, 16)
+    return blocks[:n].reshape(n, 4, 4)
+
+def sub_bytes(x):
+    """
+    SubBytes on bit-planes (bit index on axis 0) as the 113 gate Boyar-Peralta circuit:
+    a linear top layer, a shared non-linear GF(2^4) inversion core and a linear bottom layer
+    that also applies the affine transform.
+    """
+    U0, U1, U2, U3, U4, U5, U6, U7 = x[7], x[6], x[5], x[4], x[3], x[2], x[1], x[0]
+    # Top linear layer
+    T1 = U0 ^ U3; T2 = U0 ^ U5; T3 = U0 ^ U6; T4 = U3 ^ U5; T5 = U4 ^ U6; T6 = T1 ^ T5
+    T7 = U1 ^ U2; T8 = U7 ^ T6; T9 = U7 ^ T7; T10 = T6 ^ T7; T11 = U1 ^ U5; T12 = U2 ^ U5
+    T13 = T3 ^ T4; T14 = T6 ^ T11; T15 = T5 ^ T11; T16 = T5 ^ T12; T17 = T9 ^ T16; T18 = U3 ^ U7
+    T19 = T7 ^ T18; T20 = T1 ^ T19; T21 = U6 ^ U7; T22 = T7 ^ T21; T23 = T2 ^ T22; T24 = T2 ^ T10
+    T25 = T20 ^ T17; T26 = T3 ^ T16; T27 = T1 ^ T12
+    # Non-linear middle layer
+    M1 = T13 & T6; M2 = T23 & T8; M3 = T14 ^ M1; M4 = T19 & U7; M5 = M4 ^ M1; M6 = T3 & T16
+    M7 = T22 & T9; M8 = T26 ^ M6; M9 = T20 & T17; M10 = M9 ^ M6; M11 = T1 & T15; M12 = T4 & T27
+    M13 = M12 ^ M11; M14 = T2 & T10; M15 = M14 ^ M11; M16 = M3 ^ M2; M17 = M5 ^ T24; M18 = M8 ^ M7
+    M19 = M10 ^ M15; M20 = M16 ^ M13; M21 = M17 ^ M15; M22 = M18 ^ M13; M23 = M19 ^ T25; M24 = M22 ^ M23
+    M25 = M22 & M20; M26 = M21 ^ M25; M27 = M20 ^ M21; M28 = M23 ^ M25; M29 = M28 & M27; M30 = M26 & M24
+    M31 = M20 & M23; M32 = M27 & M31; M33 = M27 ^ M25; M34 = M21 & M22; M35 = M24 & M34; M36 = M24 ^ M25
+    M37 = M21 ^ M29; M38 = M32 ^ M33; M39 = M23 ^ M30; M40 = M35 ^ M36; M41 = M38 ^ M40; M42 = M37 ^ M39
+    M43 = M37 ^ M38; M44 = M39 ^ M40; M45 = M42 ^ M41; M46 = M44 & T6; M47 = M40 & T8; M48 = M39 & U7
+    M49 = M43 & T16; M50 = M38 & T9; M51 = M37 & T17; M52 = M42 & T15; M53 = M45 & T27; M54 = M41 & T10
+    M55 = M44 & T13; M56 = M40 & T23; M57 = M39 & T19; M58 = M43 & T3; M59 = M38 & T22; M60 = M37 & T20
+    M61 = M42 & T1; M62 = M45 & T4; M63 = M41 & T2
+    # Bottom linear layer, including the affine transform
+    L0 = M61 ^ M62; L1 = M50 ^ M56; L2 = M46 ^ M48; L3 = M47 ^ M55; L4 = M54 ^ M58; L5 = M49 ^ M61
+    L6 = M62 ^ L5; L7 = M46 ^ L3; L8 = M51 ^ M59; L9 = M52 ^ M53; L10 = M53 ^ L4; L11 = M60 ^ L2
+    L12 = M48 ^ M51; L13 = M50 ^ L0; L14 = M52 ^ M61; L15 = M55 ^ L1; L16 = M56 ^ L0; L17 = M57 ^ L1
+    L18 = M58 ^ L8; L19 = M63 ^ L4; L20 = L0 ^ L1; L21 = L1 ^ L7; L22 = L3 ^ L12; L23 = L18 ^ L2
+    L24 = L15 ^ L9; L25 = L6 ^ L10; L26 = L7 ^ L9; L27 = L8 ^ L10; L28 = L11 ^ L14; L29 = L11 ^ L17
+    return np.stack([
+        ~(L6 ^ L23), ~(L13 ^ L27), L25 ^ L29, L20 ^ L22, L6 ^ L21, ~(L19 ^ L28), ~(L16 ^ L26), L6 ^ L24,
+    ])
+
+def _linear_map(function):
+    """Describe a GF(2)-linear byte function as, for each output bit, the list of input bits XORed into it."""
+    columns = [function(1 << bit) for bit in range(8)]
+    return [[bit for bit in range(8) if columns[bit] >> out & 1] for out in range(8)]
+
+def _apply_linear(rows, x):
+    """Apply a linear map from `_linear_map` to bit-planes with the bit index on axis 0."""
+    y = np.empty_like(x)
+    for out, sources in enumerate(rows):
+        np.copyto(y[out], x[sources[0]])
+        for source in sources[1:]:
+            y[out] ^= x[source]
+    return y
+
+# The inverse of the SubBytes affine transform, without its constant
+INV_AFFINE = _linear_map(lambda value: _rotate_left(value, 1) ^ _rotate_left(value, 3) ^ _rotate_left(value, 6))
+
+def _inv_affine(x):
+    # A^-1(x ^ 0x63) = A^-1(x) ^ 0x05
+    y = _apply_linear(INV_AFFINE, x)
+    y[[0, 2]] ^= ONES
+    return y
+
+def inv_sub_bytes(x):
+    """
+    InvSubBytes on bit-planes, reusing the forward circuit.
+
+    With S(x) = A(inv(x)) ^ 0x63, the field inverse is inv(z) = A^-1(S(z) ^ 0x63), so
+    InvS(y) = inv(A^-1(y ^ 0x63)) = A^-1(S(A^-1(y ^ 0x63)) ^ 0x63): two cheap linear maps around SubBytes.
+    """
+    return _inv_affine(sub_bytes(_inv_affine(x)))
+
+def xtime(x):
+    """Multiply bit-sliced bytes by 0x02: shift every bit up one plane and fold bit 7 back in."""
+    y = np.roll(x, 1, axis=0)
+    y[[1, 3, 4]] ^= x[7]
+    return y
+
+def mix_columns(planes):
+    """MixColumns on (8, 16, G) bit-planes, using the same xtime formulation as `Galois_Field.mix_columns`."""
+    s = planes.reshape(8, 4, 4, -1)
+    t = s[:, 0] ^ s[:, 1] ^ s[:, 2] ^ s[:, 3]
+    mixed = s ^ t[:, np.newaxis] ^ xtime(s ^ np.roll(s, -1, axis=1))
+    return mixed.reshape(planes.shape)
+
+def inv_mix_columns(planes):
+    """InvMixColumns on (8, 16, G) bit-planes, as preprocessing followed by MixColumns."""
+    s = planes.reshape(8, 4, 4, -1)
+    u = xtime(xtime(s[:, 0] ^ s[:, 2]))
+    v = xtime(xtime(s[:, 1] ^ s[:, 3]))
+    return mix_columns((s ^ np.stack([u, v, u, v], axis=1)).reshape(planes.shape))
+
+def _round_key_planes(keys):
+    """Every round key as all-ones/all-zeros masks of shape (rounds + 1, 8, 16, 1)."""
+    bits = np.unpackbits(keys.round_keys.reshape(-1, 16, 1), axis=-1, bitorder='little')  # (R+1, 16, 8)
+    masks = np.where(bits.transpose(0, 2, 1).astype(bool), ONES, np.uint64(0))
+    return masks[..., np.newaxis]
+
+def _key_planes(keys):
+    """
+    The round keys as bit-planes to XOR into the state: the cached masks of an Expanded_Key, or for per-block keys
+    of shape (rounds + 1, N, 4, 4), as gathered by `Batch_Engine.encrypt_blocks_multi`, every round bitsliced
+    like the blocks themselves, shape (rounds + 1, 8, 16, G).
+    """
+    if isinstance(keys, np.ndarray):
+        return np.stack([bitslice(round_keys) for round_keys in keys])
+    return keys.derived('bitslice', _round_key_planes)
+
+
+class Bitslice_Engine(Batch_Engine):
+    """
+    Bit-sliced AES engine for bulk workloads.
+
+    Blocks are transposed, 64 at a time, into uint64 bit-planes. SubBytes is computed as a Boolean circuit,
+    ShiftRows as a permutation of planes and MixColumns with plane shifts and XORs. There are no data dependent memory lookups, so the engine is
+    cache-timing neutral. The round structure and key schedule are the ones used by `Batch_Engine`.
+
+    Every public method of `Batch_Engine` runs on the bitsliced rounds, including the per-block keys of
+    `encrypt_blocks_multi` and the caller-provided buffers of `encrypt_blocks_into`, none of them falls back to
+    the table lookups of the batch engine.
+    """
+    def __init__(self, AESMODE=128, key_cache=None, chunk_blocks=16384):
+        # Smaller slices than Batch_Engine keep the bit-planes of a slice in cache
+        super().__init__(AESMODE=AESMODE, key_cache=key_cache, chunk_blocks=chunk_blocks)
+
+    def encrypt_states(self, states, keys):
+        """
+        Encrypt a stack of states.
+
+        Parameters:
+            states (np.ndarray): A uint8 array of shape (N, 4, 4) in state layout.
+            keys (Expanded_Key or np.ndarray): The expanded key schedule, or one schedule per state of shape
+                                               (rounds + 1, N, 4, 4).
+
+        Returns:
+            np.ndarray: The encrypted states, shape (N, 4, 4).
+        """
+        rk = _key_planes(keys)
+        state = bitslice(states) ^ rk[0]
+        for i in range(1, self.key_rounds):
+            state = sub_bytes(state)[:, SHIFT_ROWS]
+            state = mix_columns(state)
+            state ^= rk[i]
+        state = sub_bytes(state)[:, SHIFT_ROWS]
+        state ^= rk[self.key_rounds]
+        return unbitslice(state, len(states))
+
+    def decrypt_states(self, states, keys):
+        """
+        Decrypt a stack of states.
+
+        Parameters:
+            states (np.ndarray): A uint8 array of shape (N, 4, 4) in state layout.
+            keys (Expanded_Key or np.ndarray): The expanded key schedule, or one schedule per state of shape
+                                               (rounds + 1, N, 4, 4).
+
+        Returns:
+            np.ndarray: The decrypted states, shape (N, 4, 4).
+        """
+        rk = _key_planes(keys)
+        state = bitslice(states) ^ rk[self.key_rounds]
+        for i in range(self.key_rounds - 1, 0, -1):
+            state = inv_sub_bytes(state[:, INV_SHIFT_ROWS])
+            state ^= rk[i]
+            state = inv_mix_columns(state)
+        state = inv_sub_bytes(state[:, INV_SHIFT_ROWS])
+        state ^= rk[0]
+        return unbitslice(state, len(states))
+
+    def encrypt_blocks_into(self, src, dst, keys):
+        """
+        Encrypt whole 16-byte blocks from `src` into `dst`, which may be `src` itself, one slice of `chunk_blocks`
+        blocks at a time. Unlike `Batch_Engine.encrypt_blocks_into`, the bit-planes of each slice are temporary
+        arrays, so the call allocates in proportion to the slice size.
+
+        Parameters:
+            src (np.ndarray): A flat uint8 array, a multiple of 16 bytes long.
+            dst (np.ndarray): A writable flat uint8 array of the same length.
+            keys (Expanded_Key): The expanded key schedule.
+        """
+        self._run_into(self._transform_into(self.encrypt_states), src, dst, keys)
+
+    def decrypt_blocks_into(self, src, dst, keys):
+        """Decrypt whole 16-byte blocks from `src` into `dst`, see `encrypt_blocks_into`."""
+        self._run_into(self._transform_into(self.decrypt_states), src, dst, keys)
+
+    @staticmethod
+    def _transform_into(transform):
+        def run(src, dst, keys):
+            # Blocks are in byte order, where byte col * 4 + row holds state[row, col]
+            states = transform(src.reshape(-1, 4, 4).transpose(0, 2, 1), keys)
+            dst.reshape(-1, 4, 4)[:] = states.transpose(0, 2, 1)
+        return run
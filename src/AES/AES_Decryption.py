@@ -1,9 +1,10 @@
 from AES.SBOX import SBOX
 from AES.basic_functions import basic_functions
-from AES.Key_Expansion import Key_Expansion
+from AES.Galois_Field import Galois_Field
+from AES.Key_Expansion import Key_Expansion, Expanded_Key, key_cache as shared_key_cache
 import numpy as np
 class Decryption:
-    def __init__(self, AESMODE):
+    def __init__(self, AESMODE, key_cache=None):
         """
         Initialize the AES decryption class with the specified AES mode (key size).
 
@@ -15,18 +16,21 @@ class Decryption:
         Parameters:
             AESMODE (int): The size of the AES encryption key in bits. Accepted values are 128, 192, or 256.
                             This value determines the number of rounds used for decryption.
+            key_cache (Key_Cache, optional): Cache of expanded key schedules. Defaults to the process wide cache.
 
         Attributes:
             sbox (SBOX): An instance of the S-box used for the SubBytes step in AES decryption.
+            field (Galois_Field): The shared GF(2^8) arithmetic used by InvMixColumns.
             functions (basic_functions): An instance of the basic functions class initialized for decryption.
-            keys (list): A list to store the round keys generated during key expansion.
+            key_cache (Key_Cache): Cache of expanded key schedules, so a key is expanded once and reused for every block.
             AESMODE (int): The key size (in bits) used for AES decryption (128, 192, or 256).
             key_rounds (int): The number of rounds for AES decryption, based on the key size.
             key_exp (Key_Expansion): An instance of the Key_Expansion class used for generating round keys.
         """
         self.sbox = SBOX()
+        self.field = Galois_Field()
         self.functions = basic_functions(mode="decrypt")
-        self.keys = []
+        self.key_cache = shared_key_cache if key_cache is None else key_cache
         self.AESMODE = AESMODE
         self.key_rounds = {128: 10, 192: 12, 256: 14}[self.AESMODE]
         self.key_exp = Key_Expansion(self.key_rounds)
@@ -61,23 +65,7 @@ class Decryption:
         return self.sbox.inv_matrix_sub(matrix)
 
     def invMixCols(self, matrix):
-        columns_matrix = [
-            [0x0E, 0x0B, 0x0D, 0x09],
-            [0x09, 0x0E, 0x0B, 0x0D],
-            [0x0D, 0x09, 0x0E, 0x0B],
-            [0x0B, 0x0D, 0x09, 0x0E]
-        ]
-        result_matrix = []
-        # Matrix multiplication in GF(2^8)
-        for i in range(4):  # Iterate over columns of `matrix1`
-            result_row = []
-            for j in range(4):  # Iterate over rows of `columns_matrix`
-                element = 0
-                for k in range(4):  # Compute the dot product in GF(2^8)
-                    element ^= self.galois_multiply(matrix[k][i], columns_matrix[j][k])
-                result_row.append(hex(element))
-            result_matrix.append(result_row)
-        return np.array(result_matrix).T
+        return self.field.inv_mix_columns(matrix)
 
     def galois_multiply(self, a, b, modulus=0x11B):
         """
@@ -85,30 +73,22 @@ class Decryption:
 
         This function multiplies two numbers (a and b) in the Galois Field GF(2^8), which is the finite field 
         used in AES encryption. The multiplication is done using the modulus value (default 0x11B for AES) to 
-        ensure the result stays within the field's size. The function uses bitwise operations to simulate the 
-        multiplication process in GF(2^8).
+        ensure the result stays within the field's size. The product is read from the shared log/antilog 
+        tables in `Galois_Field`.
 
         Parameters:
-            a (hex string or int): The first operand, represented as a hexadecimal string or an integer.
+            a (int): The first operand, a byte of the state.
             b (int): The second operand, represented as an integer.
             modulus (int, optional): The modulus used for the field (default is 0x11B, which is the AES polynomial).
 
         Returns:
             int: The result of the Galois Field multiplication of a and b, as an integer.
         """  
-        result = 0         
-        a = int(a,16)
-        for _ in range(8): # 8 round for the GF(2^8)
-            if bin(b)[-1] == '1': #check the least significant bit of b and see if its 1
-                result ^= a
-            a = a*2 # right shift
-            if a >= 256:
-                a ^= modulus
-            b = b//2 #left shift
-        return result 
+        return self.field.multiply(a, b, modulus)
 
     def Decryption(self, ciphertext: np.ndarray, key):
         key = self.functions.hash_key(key,self.AESMODE)
+        key = self.key_cache.get(key, self.AESMODE)  # expanded once for every block of the message
         if len(ciphertext.flatten()) > 16:
             decrpt = []
             for matrix in ciphertext:     
@@ -121,33 +101,52 @@ class Decryption:
         else:
             raise ValueError("CipherText is not 16 bytes of length make sure its a correct encryption ciphertext")                
     
-    def DecryptionProcess(self, ciphertext: np.ndarray, key):
-        matrix = ciphertext
-        # Convert key to matrix if necessary
+    def decrypt_blocks(self, data, key):
+        """
+        Decrypt a buffer of whole 16-byte blocks, one DecryptionProcess call per block.
+
+        Parameters:
+            data (bytes-like): The blocks to decrypt, a multiple of 16 bytes long.
+            key (Expanded_Key or bytes): The expanded key schedule, or a key looked up in the key cache.
+
+        Returns:
+            bytes: The decrypted blocks.
+        """
+        keys = self.expanded_key(key)
+        data = bytes(data)
+        if len(data) % 16:
+            raise ValueError("Data must be a multiple of 16 bytes long")
+        return b''.join(self.DecryptionProcess(self.functions.hex_to_matrix(data[i:i + 16]), keys).T.tobytes()
+                        for i in range(0, len(data), 16))
+
+    def expanded_key(self, key):
+        """Return the Expanded_Key for `key`: an expanded key, a key matrix, or raw key bytes looked up in the key cache."""
+        if isinstance(key, Expanded_Key):
+            return key
         if isinstance(key, np.ndarray):
-            matrix2 = key
-        elif not self.functions.is_hex(key):
-            val2 = self.functions.to_hex(key)
-            matrix2 = self.functions.hex_to_matrix(val2)
+            return self.key_cache.get(key.T.tobytes(), self.AESMODE)
+        return self.key_cache.get(self.functions.to_hex(key), self.AESMODE)
 
-        # Expand the key
-        self.keys = self.key_exp.key_expansion(matrix2)                   
+    def DecryptionProcess(self, ciphertext: np.ndarray, key):
+        matrix = ciphertext
+        # Look up the expanded key if necessary
+        keys = self.expanded_key(key)
         
         # Initial Add Round Key
-        state = self.add_round_keys(matrix, self.keys[self.key_rounds])        
+        state = self.add_round_keys(matrix, keys[self.key_rounds])        
         
         # Perform rounds
         for round_num in range(self.key_rounds-1, 0, -1):  # Decrypting rounds in reverse order
             state = self.invshift(state)
             state = self.invSubBytes(state)   
-            state = self.add_round_keys(state, self.keys[round_num])   
+            state = self.add_round_keys(state, keys[round_num])   
             if round_num != 0:      
                 state = self.invMixCols(state)                        
         
         # Final round (no InvMixCols)
         state = self.invshift(state)
         state = self.invSubBytes(state)
-        state = self.add_round_keys(state, self.keys[0])        
+        state = self.add_round_keys(state, keys[0])        
         
         return state
         
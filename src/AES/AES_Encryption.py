@@ -1,9 +1,10 @@
 from AES.SBOX import SBOX
-from AES.Key_Expansion import Key_Expansion
+from AES.Key_Expansion import Key_Expansion, Expanded_Key, key_cache as shared_key_cache
 from AES.basic_functions import basic_functions
+from AES.Galois_Field import Galois_Field
 import numpy as np
 class Encryption:    
-    def __init__(self,AESMODE=128):
+    def __init__(self,AESMODE=128,key_cache=None):
         """
         Initialize the AES Encryption class with the specified encryption key size and related parameters.
         
@@ -13,12 +14,13 @@ class Encryption:
         Parameters:
             AESMODE (int): The size of the encryption key in bits. Accepted values are 128, 192, or 256. 
                         This determines the number of rounds used in the encryption process.
+            key_cache (Key_Cache, optional): Cache of expanded key schedules. Defaults to the process wide cache.
         
         Attributes:
             sbox (SBOX): The substitution box used for performing the SubBytes step in AES encryption.
+            field (Galois_Field): The shared GF(2^8) arithmetic used by MixColumns.
             functions (basic_functions): A collection of basic AES functions used throughout the encryption process.
-            words (list): Stores the words from the expanded key schedule, which is used during encryption rounds.
-            keys (list): Contains the round keys generated from the key schedule, used in each round of AES encryption.
+            key_cache (Key_Cache): Cache of expanded key schedules, so a key is expanded once and reused for every block.
             AESMODE (int): The key size in bits (128, 192, or 256) that defines the encryption strength and rounds.
             key_rounds (int): The number of rounds for AES encryption, determined by the AES key size. 
                             - 128-bit key: 10 rounds
@@ -27,9 +29,9 @@ class Encryption:
             KeyGen (Key_Expansion): Instance of the Key_Expansion class used to generate the key schedule and round keys.
         """
         self.sbox = SBOX()  
+        self.field = Galois_Field()
         self.functions = basic_functions()           
-        self.words = [] 
-        self.keys = []
+        self.key_cache = shared_key_cache if key_cache is None else key_cache
         self.AESMODE = AESMODE
         self.key_rounds = {128:10, 192:12, 256:14}[self.AESMODE] 
         self.KeyGen = Key_Expansion(key_size=self.key_rounds)                          
@@ -85,28 +87,13 @@ class Encryption:
 
         Parameters:
             matrix (np.ndarray): A 4x4 matrix representing the current state of the AES block. Each element is a byte.
+                                A stack of states of shape (N, 4, 4) is mixed in one pass.
 
         Returns:
             np.ndarray: A 4x4 matrix where each column has been mixed based on the MixColumns transformation.
                         The result is a new matrix in which the columns have been diffused.
         """
-        columns_matrix = [
-            [0x02, 0x03, 0x01, 0x01],
-            [0x01, 0x02, 0x03, 0x01],
-            [0x01, 0x01, 0x02, 0x03],
-            [0x03, 0x01, 0x01, 0x02]
-        ]    
-        result_matrix = []            
-        # Matrix multiplication in GF(2^8)
-        for i in range(4):  # Iterate over columns of `matrix1`
-            result_row = []
-            for j in range(4):  # Iterate over rows of `columns_matrix`
-                element = 0
-                for k in range(4):  # Compute the dot product in GF(2^8)
-                    element ^= self.galois_multiply(matrix[k][i], columns_matrix[j][k])
-                result_row.append(hex(element))
-            result_matrix.append(result_row)                                 
-        return np.array(result_matrix).T
+        return self.field.mix_columns(matrix)
     
     def galois_multiply(self,a,b,modulus=0x11B):  
         """
@@ -114,27 +101,18 @@ class Encryption:
 
         This function multiplies two numbers (a and b) in the Galois Field GF(2^8), which is the finite field 
         used in AES encryption. The multiplication is done using the modulus value (default 0x11B for AES) to 
-        ensure the result stays within the field's size. The function uses bitwise operations to simulate the 
-        multiplication process in GF(2^8).
+        ensure the result stays within the field's size. The product is read from the shared log/antilog 
+        tables in `Galois_Field`.
 
         Parameters:
-            a (hex string or int): The first operand, represented as a hexadecimal string or an integer.
+            a (int): The first operand, a byte of the state.
             b (int): The second operand, represented as an integer.
             modulus (int, optional): The modulus used for the field (default is 0x11B, which is the AES polynomial).
 
         Returns:
             int: The result of the Galois Field multiplication of a and b, as an integer.
         """  
-        result = 0         
-        a = int(a,16)
-        for _ in range(8): # 8 round for the GF(2^8)
-            if bin(b)[-1] == '1': #check the least significant bit of b and see if its 1
-                result ^= a
-            a = a*2 # right shift
-            if a >= 256:
-                a ^= modulus
-            b = b//2 #left shift
-        return result     
+        return self.field.multiply(a, b, modulus)
                                        
     def Encryption(self,plaintext,key):  
         """
@@ -151,11 +129,12 @@ class Encryption:
             key (str or bytes): The encryption key to be used in AES, which is hashed based on the AES mode.
 
         Returns:
-            str or bytes: The resulting ciphertext, either as a concatenated string or in block form, depending 
-                        on the length of the input plaintext.
+            np.ndarray: The resulting ciphertext as uint8 state matrices, either a single 4x4 block or 
+                        an array of shape (N, 4, 4), depending on the length of the input plaintext.
         """      
         key = self.functions.hash_key(key,self.AESMODE)
-        val, val2 = self.functions.to_hex(plaintext, key)
+        val2 = self.key_cache.get(key, self.AESMODE)  # expanded once for every block of the message
+        val = self.functions.to_hex(plaintext)[0]
         if len(val) == 16:
             cipher_text = self.EncrptionProcess(val, val2)
         elif len(val) < 16:
@@ -169,24 +148,46 @@ class Encryption:
             cipher_text = self.functions.concatText(cipher)
         return cipher_text
              
+    def encrypt_blocks(self,data,key):
+        """
+        Encrypt a buffer of whole 16-byte blocks, one EncrptionProcess call per block.
+
+        Parameters:
+            data (bytes-like): The blocks to encrypt, a multiple of 16 bytes long.
+            key (Expanded_Key or bytes): The expanded key schedule, or a key looked up in the key cache.
+
+        Returns:
+            bytes: The encrypted blocks.
+        """
+        keys = self.expanded_key(key)
+        data = bytes(data)
+        if len(data) % 16:
+            raise ValueError("Data must be a multiple of 16 bytes long")
+        return b''.join(self.EncrptionProcess(data[i:i + 16], keys).T.tobytes() for i in range(0, len(data), 16))
+             
+    def expanded_key(self,key):
+        """Return the Expanded_Key for `key`, which is either already expanded or raw key bytes looked up in the key cache."""
+        return key if isinstance(key, Expanded_Key) else self.key_cache.get(key, self.AESMODE)
+             
     def EncrptionProcess(self,plaintext,key):   
         """
         Perform the AES encryption process on the given plaintext using the specified key.
 
         This function implements the core AES encryption process, which involves multiple rounds of 
         transformations (SubBytes, ShiftRows, MixColumns, and AddRoundKey) on the plaintext. The key 
-        schedule is generated using the provided key, and the encryption proceeds with an initial round key 
+        schedule is taken from the key cache, and the encryption proceeds with an initial round key 
         addition, followed by a series of intermediate rounds, and a final round without MixColumns.
 
         Parameters:
-            plaintext (str or bytes): The plaintext to be encrypted, typically a 16-byte block.
-            key (str or bytes): The encryption key used for key expansion, typically a 16, 24, or 32-byte key.
+            plaintext (bytes or bytearray): The plaintext to be encrypted, typically a 16-byte block.
+            key (Expanded_Key or bytes): The expanded key schedule, or a 16, 24, or 32-byte key which is looked up
+                                        in the key cache.
 
         Returns:
             np.ndarray: The resulting ciphertext after all AES rounds, as a 4x4 matrix of bytes.
         """
-        matrix, matrix2= self.functions.hex_to_matrix(plaintext,key)            
-        keys = self.KeyGen.key_expansion(matrix2)                                      
+        matrix = self.functions.hex_to_matrix(plaintext)[0]
+        keys = self.expanded_key(key)
         # Initial key round addition
         state = self.add_round_keys(matrix, keys[0])  # First round key addition                        
         # Loop through all the rounds
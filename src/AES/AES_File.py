@@ -0,0 +1,73 @@
+import mmap
+import os
+import stat
+
+# Bytes processed per engine call: the size of file chunks, and of the keystream generated at once, so large inputs
+# never hold their whole keystream in memory
+SEGMENT_SIZE = 1 << 20
+
+def transform_file(stream, src, dst, chunk_size=SEGMENT_SIZE):
+    """
+    Run a whole file through a streaming cipher using memory-mapped input and output.
+
+    The input is mapped read-only and handed to the stream as zero-copy memoryview slices of `chunk_size` bytes.
+    The output file is sized to the input up front and mapped as well, so every chunk is written straight into the
+    page cache. The resident memory therefore stays at a few chunks regardless of the file size. Output that does not
+    have the length of the input, such as padding, is appended or truncated at the end. The output is written to a
+    temporary file next to `dst`, which replaces `dst` only once complete, so `src` and `dst` may be the same file.
+
+    Parameters:
+        stream (Stream_Cipher): A fresh encryptor or decryptor.
+        src (str or os.PathLike): The input file.
+        dst (str or os.PathLike): The output file, created or replaced.
+        chunk_size (int, optional): Bytes passed to the stream per call, a multiple of 16.
+
+    Returns:
+        int: The size of the output file in bytes.
+
+    Raises:
+        ValueError: If `chunk_size` is not a positive multiple of 16, or the stream rejects the input. The partial
+                    output file is removed and `dst` is left untouched.
+    """
+    if chunk_size <= 0 or chunk_size % 16:
+        raise ValueError("chunk_size must be a positive multiple of 16")
+    import tempfile  # pulls in shutil and random, so it is kept out of the import of the package
+    size = os.path.getsize(src)
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dst)), prefix='.aes-', suffix='.tmp')
+    try:
+        with open(src, 'rb') as fin, open(descriptor, 'w+b') as fout:
+            written = 0
+            tail = b''
+            if size:
+                fout.truncate(size)
+                with mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as source, \
+                     mmap.mmap(fout.fileno(), size, access=mmap.ACCESS_WRITE) as target:
+                    view = memoryview(source)
+                    try:
+                        for start in range(0, size, chunk_size):
+                            out = stream.update(view[start:start + chunk_size])
+                            room = min(len(out), size - written)
+                            target[written:written + room] = out[:room]
+                            written += room
+                            tail += out[room:]
+                        out = stream.finalize()
+                    finally:
+                        view.release()
+                    room = min(len(out), size - written)
+                    target[written:written + room] = out[:room]
+                    written += room
+                    tail += out[room:]
+            else:
+                tail = stream.finalize()
+            fout.seek(written)
+            fout.write(tail)
+            written += len(tail)
+            fout.truncate(written)
+        if os.path.exists(dst):
+            os.chmod(temporary, stat.S_IMODE(os.stat(dst).st_mode))
+        os.replace(temporary, dst)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)  # never leave partial output, such as plaintext whose tag did not verify
+        raise
+    return written
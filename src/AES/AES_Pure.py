@@ -0,0 +1,158 @@
+from AES.Galois_Field import Galois_Field
+from AES.SBOX import S_BOX_TABLE as _S, INV_S_BOX_TABLE as _INV_S
+
+def _rotate(word, bits):
+    """Rotate a 32-bit word right by `bits`."""
+    return ((word >> bits) | (word << (32 - bits))) & 0xFFFFFFFF
+
+def _tables(column):
+    """Build the four 256-entry tables from the mixed column of a byte in row 0."""
+    T0 = tuple(column(value) for value in range(256))
+    return T0, tuple(_rotate(w, 8) for w in T0), tuple(_rotate(w, 16) for w in T0), tuple(_rotate(w, 24) for w in T0)
+
+_GF = Galois_Field
+
+# TE[i][x] is S[x] times column i of the MixColumns matrix, packed as a big-endian column word
+TE0, TE1, TE2, TE3 = _tables(lambda x: (_GF.MUL2[_S[x]] << 24) | (_S[x] << 16) | (_S[x] << 8) | _GF.MUL3[_S[x]])
+# TD[i][x] is InvS[x] times column i of the InvMixColumns matrix
+TD0, TD1, TD2, TD3 = _tables(lambda x: (_GF.MUL14[_INV_S[x]] << 24) | (_GF.MUL9[_INV_S[x]] << 16)
+                                       | (_GF.MUL13[_INV_S[x]] << 8) | _GF.MUL11[_INV_S[x]])
+
+def encryption_words(keys):
+    return keys.round_key_words
+
+def decryption_words(keys):
+    """
+    Round keys for the equivalent inverse cipher: the schedule in reverse round order, with InvMixColumns
+    applied to every round key except the first and the last.
+    """
+    words = keys.round_key_words
+    dk = list(words[4 * keys.rounds:4 * keys.rounds + 4])
+    for round in range(keys.rounds - 1, 0, -1):
+        for w in words[4 * round:4 * round + 4]:
+            # TD starts with InvSubBytes, so apply the forward S-box first to leave only InvMixColumns
+            dk.append(TD0[_S[w >> 24]] ^ TD1[_S[(w >> 16) & 0xFF]] ^ TD2[_S[(w >> 8) & 0xFF]] ^ TD3[_S[w & 0xFF]])
+    dk.extend(words[0:4])
+    return tuple(dk)
+
+def encrypt_block(block, rk, rounds):
+    """
+    Encrypt one 16-byte block with the T-tables.
+
+    Each round is 16 table lookups and XORs: TE0..TE3 combine SubBytes, ShiftRows and MixColumns,
+    and the final round uses the plain S-box.
+
+    Parameters:
+        block (bytes-like): The 16-byte plaintext block.
+        rk (tuple): The round keys as 32-bit column words.
+        rounds (int): The number of AES rounds.
+
+    Returns:
+        bytes: The 16-byte ciphertext block.
+    """
+    s0 = int.from_bytes(block[0:4], 'big') ^ rk[0]
+    s1 = int.from_bytes(block[4:8], 'big') ^ rk[1]
+    s2 = int.from_bytes(block[8:12], 'big') ^ rk[2]
+    s3 = int.from_bytes(block[12:16], 'big') ^ rk[3]
+    k = 4
+    for _ in range(rounds - 1):
+        t0 = TE0[s0 >> 24] ^ TE1[(s1 >> 16) & 0xFF] ^ TE2[(s2 >> 8) & 0xFF] ^ TE3[s3 & 0xFF] ^ rk[k]
+        t1 = TE0[s1 >> 24] ^ TE1[(s2 >> 16) & 0xFF] ^ TE2[(s3 >> 8) & 0xFF] ^ TE3[s0 & 0xFF] ^ rk[k + 1]
+        t2 = TE0[s2 >> 24] ^ TE1[(s3 >> 16) & 0xFF] ^ TE2[(s0 >> 8) & 0xFF] ^ TE3[s1 & 0xFF] ^ rk[k + 2]
+        t3 = TE0[s3 >> 24] ^ TE1[(s0 >> 16) & 0xFF] ^ TE2[(s1 >> 8) & 0xFF] ^ TE3[s2 & 0xFF] ^ rk[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+    # Final round: SubBytes and ShiftRows only
+    t0 = (_S[s0 >> 24] << 24 | _S[(s1 >> 16) & 0xFF] << 16 | _S[(s2 >> 8) & 0xFF] << 8 | _S[s3 & 0xFF]) ^ rk[k]
+    t1 = (_S[s1 >> 24] << 24 | _S[(s2 >> 16) & 0xFF] << 16 | _S[(s3 >> 8) & 0xFF] << 8 | _S[s0 & 0xFF]) ^ rk[k + 1]
+    t2 = (_S[s2 >> 24] << 24 | _S[(s3 >> 16) & 0xFF] << 16 | _S[(s0 >> 8) & 0xFF] << 8 | _S[s1 & 0xFF]) ^ rk[k + 2]
+    t3 = (_S[s3 >> 24] << 24 | _S[(s0 >> 16) & 0xFF] << 16 | _S[(s1 >> 8) & 0xFF] << 8 | _S[s2 & 0xFF]) ^ rk[k + 3]
+    return (t0 << 96 | t1 << 64 | t2 << 32 | t3).to_bytes(16, 'big')
+
+def decrypt_block(block, dk, rounds):
+    """
+    Decrypt one 16-byte block with the equivalent inverse cipher.
+
+    Parameters:
+        block (bytes-like): The 16-byte ciphertext block.
+        dk (tuple): The decryption round keys from `decryption_words`.
+        rounds (int): The number of AES rounds.
+
+    Returns:
+        bytes: The 16-byte plaintext block.
+    """
+    s0 = int.from_bytes(block[0:4], 'big') ^ dk[0]
+    s1 = int.from_bytes(block[4:8], 'big') ^ dk[1]
+    s2 = int.from_bytes(block[8:12], 'big') ^ dk[2]
+    s3 = int.from_bytes(block[12:16], 'big') ^ dk[3]
+    k = 4
+    for _ in range(rounds - 1):
+        t0 = TD0[s0 >> 24] ^ TD1[(s3 >> 16) & 0xFF] ^ TD2[(s2 >> 8) & 0xFF] ^ TD3[s1 & 0xFF] ^ dk[k]
+        t1 = TD0[s1 >> 24] ^ TD1[(s0 >> 16) & 0xFF] ^ TD2[(s3 >> 8) & 0xFF] ^ TD3[s2 & 0xFF] ^ dk[k + 1]
+        t2 = TD0[s2 >> 24] ^ TD1[(s1 >> 16) & 0xFF] ^ TD2[(s0 >> 8) & 0xFF] ^ TD3[s3 & 0xFF] ^ dk[k + 2]
+        t3 = TD0[s3 >> 24] ^ TD1[(s2 >> 16) & 0xFF] ^ TD2[(s1 >> 8) & 0xFF] ^ TD3[s0 & 0xFF] ^ dk[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+    # Final round: InvSubBytes and InvShiftRows only
+    t0 = (_INV_S[s0 >> 24] << 24 | _INV_S[(s3 >> 16) & 0xFF] << 16 | _INV_S[(s2 >> 8) & 0xFF] << 8 | _INV_S[s1 & 0xFF]) ^ dk[k]
+    t1 = (_INV_S[s1 >> 24] << 24 | _INV_S[(s0 >> 16) & 0xFF] << 16 | _INV_S[(s3 >> 8) & 0xFF] << 8 | _INV_S[s2 & 0xFF]) ^ dk[k + 1]
+    t2 = (_INV_S[s2 >> 24] << 24 | _INV_S[(s1 >> 16) & 0xFF] << 16 | _INV_S[(s0 >> 8) & 0xFF] << 8 | _INV_S[s3 & 0xFF]) ^ dk[k + 2]
+    t3 = (_INV_S[s3 >> 24] << 24 | _INV_S[(s2 >> 16) & 0xFF] << 16 | _INV_S[(s1 >> 8) & 0xFF] << 8 | _INV_S[s0 & 0xFF]) ^ dk[k + 3]
+    return (t0 << 96 | t1 << 64 | t2 << 32 | t3).to_bytes(16, 'big')
+
+def encrypt_blocks(data, keys):
+    """
+    Encrypt a buffer of whole 16-byte blocks.
+
+    Parameters:
+        data (bytes-like): The blocks to encrypt, a multiple of 16 bytes long.
+        keys (Expanded_Key): The expanded key schedule.
+
+    Returns:
+        bytes: The encrypted blocks.
+    """
+    rk = keys.round_key_words
+    data = memoryview(data).cast('B')
+    if len(data) % 16:
+        raise ValueError("Data must be a multiple of 16 bytes long")
+    return b''.join(encrypt_block(data[i:i + 16], rk, keys.rounds) for i in range(0, len(data), 16))
+
+def decrypt_blocks(data, keys):
+    """
+    Decrypt a buffer of whole 16-byte blocks. The decryption round keys are derived once per key and cached on
+    the Expanded_Key.
+
+    Parameters:
+        data (bytes-like): The blocks to decrypt, a multiple of 16 bytes long.
+        keys (Expanded_Key): The expanded key schedule.
+
+    Returns:
+        bytes: The decrypted blocks.
+    """
+    dk = keys.derived('ttable_decrypt', decryption_words)
+    data = memoryview(data).cast('B')
+    if len(data) % 16:
+        raise ValueError("Data must be a multiple of 16 bytes long")
+    return b''.join(decrypt_block(data[i:i + 16], dk, keys.rounds) for i in range(0, len(data), 16))
+
+
+class Pure_Engine:
+    """
+    The T-table block functions behind the block-engine interface, so every mode of `Modes` runs on them.
+
+    No NumPy is involved, and for a message of a few blocks that is faster than setting up a call into a NumPy
+    engine. The AES facade uses it for messages up to its `small_message` size.
+    """
+    def encrypt_blocks(self, data, keys):
+        if len(data) == 16:  # the sequential modes pass one block at a time
+            return encrypt_block(data, keys.round_key_words, keys.rounds)
+        return encrypt_blocks(data, keys)
+
+    def decrypt_blocks(self, data, keys):
+        return decrypt_blocks(data, keys)
+
+
+PURE_ENGINE = Pure_Engine()
+
+# Cipher modes of `Modes.MODES` that run on the pure-Python engine without NumPy
+PURE_MODES = ("ECB", "CBC", "CFB", "OFB", "CTR")
@@ -0,0 +1,87 @@
+from AES.AES_Encryption import Encryption
+from AES.AES_Decryption import Decryption
+from AES.AES_Pure import encryption_words, decryption_words, encrypt_block, decrypt_block
+import numpy as np
+
+
+class TTable_Encryption(Encryption):
+    """
+    Encryption whose EncrptionProcess runs on 32-bit T-tables instead of per-byte round functions.
+
+    Meant for latency sensitive callers that encrypt one or two blocks at a time. The round keys are
+    read from the cached Expanded_Key, so a warm key costs no setup at all.
+    """
+    def EncrptionProcess(self, plaintext, key):
+        """
+        Encrypt one 16-byte block with the T-table rounds.
+
+        Parameters:
+            plaintext (bytes-like): The 16-byte plaintext block.
+            key (Expanded_Key or bytes): The expanded key schedule, or a key looked up in the key cache.
+
+        Returns:
+            np.ndarray: The ciphertext as a 4x4 uint8 state matrix.
+        """
+        block = self.encrypt_blocks(bytes(plaintext), key)
+        return np.frombuffer(block, dtype=np.uint8).reshape(4, 4).T
+
+    def encrypt_blocks(self, data, key):
+        """
+        Encrypt a buffer of whole 16-byte blocks.
+
+        Parameters:
+            data (bytes-like): The blocks to encrypt, a multiple of 16 bytes long.
+            key (Expanded_Key or bytes): The expanded key schedule, or a key looked up in the key cache.
+
+        Returns:
+            bytes: The encrypted blocks.
+        """
+        keys = self.expanded_key(key)
+        rk = keys.derived('ttable_encrypt', encryption_words)
+        data = memoryview(data).cast('B')
+        if len(data) % 16:
+            raise ValueError("Data must be a multiple of 16 bytes long")
+        return b''.join(encrypt_block(data[i:i + 16], rk, keys.rounds) for i in range(0, len(data), 16))
+
+
+class TTable_Decryption(Decryption):
+    """
+    Decryption whose DecryptionProcess runs the equivalent inverse cipher on 32-bit T-tables.
+
+    The InvMixColumns-transformed decryption round keys are derived once per key and cached on
+    the Expanded_Key.
+    """
+    def DecryptionProcess(self, ciphertext, key):
+        """
+        Decrypt one block with the T-table rounds.
+
+        Parameters:
+            ciphertext (np.ndarray): The ciphertext as a 4x4 uint8 state matrix.
+            key (Expanded_Key, np.ndarray or bytes): The expanded key schedule, a key matrix, or a key
+                                                     looked up in the key cache.
+
+        Returns:
+            np.ndarray: The plaintext as a 4x4 uint8 state matrix.
+        """
+        block = np.asarray(ciphertext, dtype=np.uint8).T.tobytes()
+        block = self.decrypt_blocks(block, key)
+        return np.frombuffer(block, dtype=np.uint8).reshape(4, 4).T
+
+    def decrypt_blocks(self, data, key):
+        """
+        Decrypt a buffer of whole 16-byte blocks.
+
+        Parameters:
+            data (bytes-like): The blocks to decrypt, a multiple of 16 bytes long.
+            key (Expanded_Key, np.ndarray or bytes): The expanded key schedule, a key matrix, or a key
+                                                     looked up in the key cache.
+
+        Returns:
+            bytes: The decrypted blocks.
+        """
+        keys = self.expanded_key(key)
+        dk = keys.derived('ttable_decrypt', decryption_words)
+        data = memoryview(data).cast('B')
+        if len(data) % 16:
+            raise ValueError("Data must be a multiple of 16 bytes long")
+        return b''.join(decrypt_block(data[i:i + 16], dk, keys.rounds) for i in range(0, len(data), 16))
@@ -0,0 +1,157 @@
+from AES.Modes import SEGMENT_SIZE
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+
+# Per process AES instances used by process pool workers, keyed by their settings
+_remote_instances = {}
+
+def _remote_call(settings, method, args):
+    """Run an AES method in a process pool worker, on an instance built once per worker and settings."""
+    from AES.AES import AES
+    AESMODE, engine, kdf, salt = settings
+    key = (AESMODE, engine, kdf.params, salt)
+    aes = _remote_instances.get(key)
+    if aes is None:
+        aes = _remote_instances[key] = AES(AESMODE, engine=engine, kdf=kdf, salt=salt)
+    return getattr(aes, method)(*args)
+
+
+class Byte_Budget:
+    def __init__(self, limit):
+        """
+        An asyncio semaphore counted in bytes rather than in jobs.
+
+        A job waits until its size fits under `limit` next to the jobs already running. A job larger than the
+        whole budget runs once nothing else is in flight, so it is delayed but never stuck.
+
+        Parameters:
+            limit (int): The number of bytes allowed in flight.
+        """
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = None
+
+    async def acquire(self, size):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight == 0 or self.in_flight + size <= self.limit)
+            self.in_flight += size
+
+    async def release(self, size):
+        async with self._condition:
+            self.in_flight -= size
+            self._condition.notify_all()
+
+
+class Async_Cipher:
+    def __init__(self, aes, executor=None, inline_threshold=1 << 16, max_in_flight=64 * SEGMENT_SIZE):
+        """
+        asyncio front end for an `AES` facade that keeps the event loop responsive.
+
+        Jobs smaller than `inline_threshold` bytes run directly on the loop, where they take less time than a hand
+        off to another thread would. Larger jobs go to `executor`. The AES facade is thread safe and its NumPy
+        work runs without the GIL, so a thread pool lets the loop serve other requests in the meantime. With a
+        process pool the workers build their own AES instance with the same settings. The bytes of all offloaded
+        jobs in flight are bounded by `max_in_flight`; further jobs wait, which gives callers backpressure
+        instead of an ever growing queue.
+
+        Parameters:
+            aes (AES): The facade doing the work.
+            executor (concurrent.futures.Executor, optional): A thread or process pool. Defaults to the loop's
+                                                              default executor.
+            inline_threshold (int, optional): Jobs below this many bytes run on the event loop.
+            max_in_flight (int, optional): Bytes of offloaded jobs allowed to run at the same time.
+        """
+        self.aes = aes
+        self.executor = executor
+        self.inline_threshold = inline_threshold
+        self.budget = Byte_Budget(max_in_flight)
+
+    async def encrypt(self, data, key, mode="CTR", iv=None, offset=0, aad=None):
+        """
+        Await `AES.encrypt`.
+
+        Returns:
+            CipherText: The ciphertext with its mode, iv and plaintext length.
+        """
+        return await self._run(len(data), 'encrypt', data, key, mode, iv, offset, aad)
+
+    async def decrypt(self, data, key, mode=None, iv=None, offset=0, aad=None):
+        """
+        Await `AES.decrypt`.
+
+        Returns:
+            bytes: The plaintext, with any padding removed.
+        """
+        return await self._run(len(data), 'decrypt', data, key, mode, iv, offset, aad)
+
+    async def encrypt_stream(self, reader, writer, key, mode="CTR", iv=None, aad=None, chunk_size=SEGMENT_SIZE):
+        """
+        Encrypt everything read from an `asyncio.StreamReader` into an `asyncio.StreamWriter`, chunk by chunk.
+
+        Every chunk is transformed off the loop when it is large enough, and the writer is drained after each one,
+        so a slow peer throttles the reads. The writer is left open.
+
+        Parameters:
+            reader (asyncio.StreamReader): The plaintext source, read until EOF.
+            writer (asyncio.StreamWriter): The ciphertext sink.
+            key (str or bytes-like): The password, or a raw key of AESMODE/8 bytes.
+            mode (str, optional): The cipher mode, see `Modes.MODES`.
+            iv (bytes): The IV, or for CTR the nonce.
+            aad (bytes, optional): For GCM, associated data.
+            chunk_size (int, optional): Bytes read per step.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        return await self._pump(self.aes.encryptor(key, mode, iv, aad), reader, writer, chunk_size)
+
+    async def decrypt_stream(self, reader, writer, key, mode="CTR", iv=None, aad=None, chunk_size=SEGMENT_SIZE):
+        """
+        Decrypt a stream written by `encrypt_stream`, the same way. For GCM the tag at the end of the stream is
+        verified by the last step, which raises InvalidTag after the plaintext has been written, so a GCM reader
+        must not act on the output before this call returns.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        return await self._pump(self.aes.decryptor(key, mode, iv, aad), reader, writer, chunk_size)
+
+    async def _run(self, size, method, *args):
+        if size < self.inline_threshold:
+            return getattr(self.aes, method)(*args)
+        loop = asyncio.get_running_loop()
+        await self.budget.acquire(size)
+        try:
+            if isinstance(self.executor, ProcessPoolExecutor):
+                settings = (self.aes.AESMODE, self.aes.engine, self.aes.kdf, self.aes.salt)
+                return await loop.run_in_executor(self.executor, _remote_call, settings, method, args)
+            return await loop.run_in_executor(self.executor, getattr(self.aes, method), *args)
+        finally:
+            await self.budget.release(size)
+
+    async def _pump(self, stream, reader, writer, chunk_size):
+        # A stream keeps its state in this process, so its chunks never go to a process pool
+        executor = None if isinstance(self.executor, ProcessPoolExecutor) else self.executor
+        loop = asyncio.get_running_loop()
+        written = 0
+        while True:
+            chunk = await reader.read(chunk_size)
+            if not chunk:
+                break
+            if len(chunk) < self.inline_threshold:
+                out = stream.update(chunk)
+            else:
+                await self.budget.acquire(len(chunk))
+                try:
+                    out = await loop.run_in_executor(executor, stream.update, chunk)
+                finally:
+                    await self.budget.release(len(chunk))
+            writer.write(out)
+            written += len(out)
+            await writer.drain()
+        out = stream.finalize()
+        writer.write(out)
+        await writer.drain()
+        return written + len(out)
@@ -0,0 +1,193 @@
+from AES.AES_Encryption import Encryption
+from AES.AES_Decryption import Decryption
+from AES.AES_Batch import Batch_Engine
+from AES.AES_TTable import TTable_Encryption, TTable_Decryption
+from AES.AES_Bitslice import Bitslice_Engine
+from AES.Key_Expansion import Expanded_Key
+from collections import OrderedDict
+import os
+import time
+
+# FIPS-197 Appendix C known answers: (AESMODE, key, plaintext, ciphertext)
+KNOWN_ANSWERS = {
+    128: ("000102030405060708090a0b0c0d0e0f", "00112233445566778899aabbccddeeff", "69c4e0d86a7b0430d8cdb78070b4c55a"),
+    192: ("000102030405060708090a0b0c0d0e0f1011121314151617", "00112233445566778899aabbccddeeff",
+          "dda97ca4864cdfe06eaf70a0ec0d7191"),
+    256: ("000102030405060708090a0b0c0d0e0f101112131415161718191a1b1c1d1e1f", "00112233445566778899aabbccddeeff",
+          "8ea2b7ca516745bfeafc49904b496089"),
+}
+
+class Backend:
+    def __init__(self, name, encryption, decryption=None, auto=True):
+        """
+        A named encryption/decryption implementation that can sit behind the AES facade.
+
+        Every implementation provides `Encryption`/`Decryption` for messages and `encrypt_blocks`/`decrypt_blocks`
+        for raw 16-byte block buffers.
+
+        Parameters:
+            name (str): The name callers select the backend by.
+            encryption (type): The class implementing encryption, constructed with (AESMODE, key_cache).
+            decryption (type, optional): The class implementing decryption. Defaults to `encryption`.
+            auto (bool, optional): Whether `auto` mode may benchmark and pick this backend.
+        """
+        self.name = name
+        self.encryption = encryption
+        self.decryption = encryption if decryption is None else decryption
+        self.auto = auto
+
+    def create(self, AESMODE=128, key_cache=None):
+        """
+        Build the encryption and decryption objects for a key size.
+
+        Returns:
+            tuple: (encryption, decryption), the same object twice if one class implements both.
+        """
+        aesE = self.encryption(AESMODE=AESMODE, key_cache=key_cache)
+        if self.decryption is self.encryption:
+            return aesE, aesE
+        return aesE, self.decryption(AESMODE=AESMODE, key_cache=key_cache)
+
+
+_backends = OrderedDict()
+_verified = {}
+_selected = {}
+
+def register_backend(backend, replace=False):
+    """
+    Add a backend to the registry.
+
+    Parameters:
+        backend (Backend): The backend to register.
+        replace (bool, optional): Allow replacing a backend registered under the same name.
+
+    Raises:
+        ValueError: If the name is already taken and `replace` is False.
+    """
+    if backend.name in _backends and not replace:
+        raise ValueError(f"A backend named {backend.name!r} is already registered")
+    _backends[backend.name] = backend
+    for entry in [entry for entry in _verified if entry[0] == backend.name]:
+        del _verified[entry]
+    _selected.clear()  # the new backend may win the next benchmark
+
+def available_backends():
+    """Return the names of the registered backends, in registration order."""
+    return list(_backends)
+
+def get_backend(name, AESMODE=128):
+    """
+    Look up a backend by name, checking it against the reference implementation first.
+
+    Parameters:
+        name (str): The registered backend name.
+        AESMODE (int, optional): The key size the backend will be used with.
+
+    Returns:
+        Backend: The verified backend.
+
+    Raises:
+        ValueError: If no backend has that name.
+        RuntimeError: If the backend does not reproduce the reference output.
+    """
+    if name not in _backends:
+        raise ValueError(f"Unknown engine {name!r}. Expected one of {', '.join(['auto'] + available_backends())}.")
+    if not verify_backend(name, AESMODE):
+        raise RuntimeError(f"Backend {name!r} does not match the reference implementation for AES-{AESMODE}")
+    return _backends[name]
+
+def verify_backend(name, AESMODE=128):
+    """
+    Check a backend against the FIPS-197 known answer and against the reference implementation on random blocks,
+    in both directions. The result is cached for the lifetime of the process.
+
+    Returns:
+        bool: True if the backend produced the same output as the reference.
+    """
+    if (name, AESMODE) in _verified:
+        return _verified[(name, AESMODE)]
+    aesE, aesD = _backends[name].create(AESMODE)
+    reference = Encryption(AESMODE=AESMODE)
+    key, plaintext, ciphertext = (bytes.fromhex(value) for value in KNOWN_ANSWERS[AESMODE])
+    random_key = Expanded_Key(os.urandom(AESMODE // 8), AESMODE)
+    blocks = os.urandom(16 * 4)
+    expected = reference.encrypt_blocks(blocks, random_key)
+    try:
+        known = Expanded_Key(key, AESMODE)
+        ok = (aesE.encrypt_blocks(plaintext, known) == ciphertext
+              and aesD.decrypt_blocks(ciphertext, known) == plaintext
+              and aesE.encrypt_blocks(blocks, random_key) == expected
+              and aesD.decrypt_blocks(expected, random_key) == blocks)
+    except Exception:
+        ok = False
+    _verified[(name, AESMODE)] = ok
+    return ok
+
+def _size_bucket(message_size):
+    # Buckets of 1, 2-4, 5-16, 17-64 ... blocks, capped at 1024 blocks where throughput has settled
+    blocks = max(1, -(-message_size // 16))
+    bucket = 1
+    while bucket < blocks and bucket < 1024:
+        bucket *= 4
+    return bucket
+
+# What select_backend can optimize for
+DIRECTIONS = ("encrypt", "decrypt", "both")
+
+def _best_time(run, blocks, key, repeat):
+    run(blocks[:16], key)  # warm up table and key caches
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(blocks, key)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def select_backend(AESMODE=128, message_size=16, repeat=3, direction="encrypt"):
+    """
+    Pick the fastest verified backend for a message size, benchmarking the candidates on first use.
+
+    Every candidate's `encrypt_blocks` and `decrypt_blocks` are timed, since the backends do not rank the same in
+    both directions. The winners are cached per process for each key size and message size bucket, so the
+    benchmark only runs once per bucket.
+
+    Parameters:
+        AESMODE (int, optional): The key size in bits.
+        message_size (int, optional): The message length in bytes.
+        repeat (int, optional): Timing runs per backend and direction; the fastest run counts.
+        direction (str, optional): "encrypt" or "decrypt" for the fastest backend in that direction, or "both"
+                                   for the fastest at encryption and decryption together, for callers that run a
+                                   single backend both ways.
+
+    Returns:
+        str: The name of the selected backend.
+
+    Raises:
+        ValueError: If `direction` is not one of `DIRECTIONS`.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"Unknown direction {direction!r}. Expected one of {', '.join(DIRECTIONS)}.")
+    bucket = _size_bucket(message_size)
+    if (AESMODE, bucket) in _selected:
+        return _selected[(AESMODE, bucket)][direction]
+    key = Expanded_Key(os.urandom(AESMODE // 8), AESMODE)
+    blocks = os.urandom(16 * bucket)
+    timings = {way: {} for way in DIRECTIONS}
+    for name, backend in list(_backends.items()):
+        if not backend.auto or not verify_backend(name, AESMODE):
+            continue
+        aesE, aesD = backend.create(AESMODE)
+        timings["encrypt"][name] = _best_time(aesE.encrypt_blocks, blocks, key, repeat)
+        timings["decrypt"][name] = _best_time(aesD.decrypt_blocks, blocks, key, repeat)
+        timings["both"][name] = timings["encrypt"][name] + timings["decrypt"][name]
+    if not timings["both"]:
+        raise RuntimeError("No verified backend is available for automatic selection")
+    winners = {way: min(timing, key=timing.get) for way, timing in timings.items()}
+    _selected[(AESMODE, bucket)] = winners
+    return winners[direction]
+
+
+register_backend(Backend("reference", Encryption, Decryption, auto=False))
+register_backend(Backend("ttable", TTable_Encryption, TTable_Decryption))
+register_backend(Backend("batch", Batch_Engine))
+register_backend(Backend("bitslice", Bitslice_Engine))
@@ -0,0 +1,112 @@
+import binascii
+
+class CipherText:
+    """
+    The result of an encryption: one immutable `bytes` buffer plus the metadata needed to decrypt it.
+
+    Only the ciphertext bytes are stored, so a CipherText costs little more than its length in memory. The hex,
+    base64 and legacy state matrix representations are computed on demand and never kept. A CipherText exposes
+    its bytes through the buffer protocol (`__buffer__`, Python 3.12+), through `view` on older versions and
+    through `bytes(ciphertext)`, and compares equal to a bytes-like object holding the same bytes.
+
+    Attributes:
+        data (bytes): The ciphertext, including any padding or tag.
+        length (int): The length of the original plaintext in bytes.
+        mode (str): The cipher mode it was produced with.
+        iv (bytes or None): The IV or nonce, None for ECB.
+    """
+    __slots__ = ('data', 'length', 'mode', 'iv')
+
+    def __init__(self, data, length=None, mode="ECB", iv=None):
+        """
+        Parameters:
+            data (bytes-like): The ciphertext.
+            length (int, optional): The plaintext length. Defaults to the ciphertext length.
+            mode (str, optional): The cipher mode.
+            iv (bytes-like, optional): The IV or nonce.
+        """
+        object.__setattr__(self, 'data', bytes(data))
+        object.__setattr__(self, 'length', len(self.data) if length is None else length)
+        object.__setattr__(self, 'mode', mode)
+        object.__setattr__(self, 'iv', None if iv is None else bytes(iv))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CipherText is immutable")
+
+    @classmethod
+    def from_hex(cls, text, length=None, mode="ECB", iv=None):
+        """Build a CipherText from a hexadecimal string such as the one returned by `hex`."""
+        return cls(bytes.fromhex(text), length, mode, iv)
+
+    @classmethod
+    def from_base64(cls, text, length=None, mode="ECB", iv=None):
+        """Build a CipherText from a base64 string such as the one returned by `base64`."""
+        return cls(binascii.a2b_base64(text), length, mode, iv)
+
+    @classmethod
+    def from_matrix(cls, states, length=None):
+        """Build an ECB CipherText from state matrices of shape (4, 4) or (N, 4, 4), the legacy layout."""
+        import numpy as np
+        states = np.asarray(states, dtype=np.uint8).reshape(-1, 4, 4)
+        return cls(states.transpose(0, 2, 1).tobytes(), length)
+
+    @property
+    def hex(self):
+        """The ciphertext as an upper case hexadecimal string."""
+        return self.data.hex().upper()
+
+    @property
+    def base64(self):
+        """The ciphertext as a base64 string."""
+        return binascii.b2a_base64(self.data, newline=False).decode('ascii')
+
+    @property
+    def matrix(self):
+        """
+        The ciphertext as uint8 state matrices in the legacy layout: a single 4x4 block, or an array of shape
+        (N, 4, 4). The array is a read-only view of `data`.
+
+        Raises:
+            ValueError: If the ciphertext is not a whole number of blocks.
+        """
+        if not self.data or len(self.data) % 16:
+            raise ValueError("Only whole 16-byte blocks have a matrix view")
+        import numpy as np
+        states = np.frombuffer(self.data, dtype=np.uint8).reshape(-1, 4, 4).transpose(0, 2, 1)
+        return states[0] if len(states) == 1 else states
+
+    @property
+    def view(self):
+        """A read-only memoryview of the ciphertext, to pass it on without copying."""
+        return memoryview(self.data)
+
+    def __buffer__(self, flags):
+        return memoryview(self.data)
+
+    def tobytes(self):
+        return self.data
+
+    def __bytes__(self):
+        return self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        return self.data[index]
+
+    def __eq__(self, other):
+        if isinstance(other, CipherText):
+            return (self.data, self.length, self.mode, self.iv) == (other.data, other.length, other.mode, other.iv)
+        if isinstance(other, (bytes, bytearray, memoryview)):
+            return self.data == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.data)
+
+    def __repr__(self):
+        return f"CipherText(mode={self.mode!r}, length={self.length}, data={self.hex[:32]}{'...' if len(self) > 16 else ''})"
+
+    def __reduce__(self):
+        return (CipherText, (self.data, self.length, self.mode, self.iv))
@@ -0,0 +1,314 @@
+from bisect import bisect_right
+import os
+import struct
+
+# Header: magic, format version, key size in bits, cipher mode, chunk size, 8-byte file nonce
+HEADER = struct.Struct('>4sBH4sI8s')
+HEADER_MAGIC = b'AESC'
+VERSION = 2
+# Index entry per chunk: file offset, plaintext offset, plaintext length, tag (zeros for unauthenticated modes)
+ENTRY = struct.Struct('>QQI16s')
+# Footer: index offset, number of chunks, index tag (zeros for unauthenticated modes), magic
+FOOTER = struct.Struct('>QI16s4s')
+FOOTER_MAGIC = b'AESI'
+# Cipher modes a container can use: every chunk must be decryptable on its own, at any position
+CONTAINER_MODES = ("CTR", "GCM")
+
+def chunk_iv(nonce, index):
+    """
+    The IV of chunk `index`: the file nonce followed by the 32-bit chunk number. Every chunk gets a fresh counter
+    range (CTR) or IV (GCM), so chunks of any size can be appended without reusing keystream, and a chunk moved to
+    another position fails to authenticate under GCM.
+    """
+    return nonce + index.to_bytes(4, 'big')
+
+def index_iv(nonce, count):
+    """
+    The IV sealing an index of `count` chunks, kept apart from the chunk IVs by the top bit of the counter. Appending
+    always adds chunks, so every index written to a file gets its own IV.
+    """
+    return nonce + (0x80000000 | count).to_bytes(4, 'big')
+
+def _index_aad(header, entries):
+    """The data a GCM index tag authenticates: the header, the chunk count and every index entry."""
+    return header + len(entries).to_bytes(4, 'big') + b''.join(ENTRY.pack(*entry) for entry in entries)
+
+def _read_layout(f):
+    """Read the header, index and footer of an open container file."""
+    f.seek(0)
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError("Not an encrypted container: the file is too short")
+    magic, version, AESMODE, mode, chunk_size, nonce = HEADER.unpack(header)
+    if magic != HEADER_MAGIC or version != VERSION:
+        raise ValueError("Not an encrypted container, or an unsupported version")
+    end = f.seek(0, os.SEEK_END)
+    if end < HEADER.size + FOOTER.size:
+        raise ValueError("The container has no index, it was not closed properly")
+    f.seek(end - FOOTER.size)
+    index_offset, count, tag, magic = FOOTER.unpack(f.read(FOOTER.size))
+    if magic != FOOTER_MAGIC:
+        raise ValueError("The container has no index, it was not closed properly")
+    f.seek(index_offset)
+    raw = f.read(count * ENTRY.size)
+    if len(raw) < count * ENTRY.size:
+        raise ValueError("The container index is truncated")
+    entries = [ENTRY.unpack_from(raw, i * ENTRY.size) for i in range(count)]
+    return header, AESMODE, mode.decode('ascii').strip(), chunk_size, nonce, end, entries, tag
+
+def _verify_index(aes, key, header, nonce, entries, tag):
+    aes.decrypt(tag, key, "GCM", index_iv(nonce, len(entries)), aad=_index_aad(header, entries))
+
+
+class Container_Writer:
+    def __init__(self, path, aes, key, mode="CTR", chunk_size=1 << 20, nonce=None, append=False):
+        """
+        Write a seekable encrypted container.
+
+        The plaintext is cut into chunks of `chunk_size` bytes, each encrypted on its own under its own IV.
+        Closing the writer adds a trailing index of chunk offsets and tags and a fixed-size footer pointing to it.
+        Under GCM every chunk authenticates the header as associated data, and the footer holds a tag over the
+        header and the whole index, so dropping, reordering or swapping chunks, or editing the index, fails to
+        verify.
+
+        In append mode nothing already written is touched: new chunks follow the old footer, then a new index
+        covering all chunks and a new footer. Until the new footer is written the old layout is intact, and if the
+        writer fails the file is truncated back to it. A process killed mid-append leaves the old container in the
+        file's first bytes, up to the old footer. Note that an old footer, kept in the middle of the file, is still
+        a valid seal of the container before the append.
+
+        Parameters:
+            path (str or os.PathLike): The container file.
+            aes (AES): The facade used to encrypt, which also fixes the key size.
+            key (str or bytes-like): The password, derived with the facade's KDF, or a raw key.
+            mode (str, optional): "CTR", or "GCM" to store an authentication tag per chunk.
+            chunk_size (int, optional): Plaintext bytes per chunk.
+            nonce (bytes, optional): The 8-byte file nonce. Defaults to a random one. Never reuse a nonce with the
+                                     same key.
+            append (bool, optional): Add chunks to an existing container, keeping its settings.
+
+        Raises:
+            ValueError: If the mode is not usable in a container, `chunk_size` is not positive, or an appended
+                        container has a different key size.
+            InvalidTag: If an appended GCM container's index fails to authenticate.
+        """
+        self.aes = aes
+        self.key = key
+        if append:
+            self.file = open(path, 'r+b')
+            try:
+                self.header, AESMODE, mode, chunk_size, nonce, end, self.entries, tag = _read_layout(self.file)
+                if AESMODE != aes.AESMODE:
+                    raise ValueError(f"The container uses AES-{AESMODE}, not AES-{aes.AESMODE}")
+                if mode == "GCM":
+                    _verify_index(aes, key, self.header, nonce, self.entries, tag)
+            except BaseException:
+                self.file.close()
+                raise
+            self.offset = self._start = end
+        else:
+            if mode not in CONTAINER_MODES:
+                raise ValueError(f"Containers support {', '.join(CONTAINER_MODES)}, not {mode!r}")
+            if chunk_size <= 0:
+                raise ValueError("chunk_size must be positive")
+            nonce = os.urandom(8) if nonce is None else bytes(nonce)
+            if len(nonce) != 8:
+                raise ValueError("The container nonce must be 8 bytes long")
+            self.header = HEADER.pack(HEADER_MAGIC, VERSION, aes.AESMODE, mode.encode('ascii').ljust(4), chunk_size,
+                                      nonce)
+            self.file = open(path, 'w+b')
+            self.file.write(self.header)
+            self.entries = []
+            self.offset = HEADER.size
+            self._start = None
+        self._count = len(self.entries)
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self.nonce = nonce
+        self.size = self.entries[-1][1] + self.entries[-1][2] if self.entries else 0
+        self._buffer = bytearray()
+        self.file.seek(self.offset)
+
+    def write(self, data):
+        """
+        Add plaintext to the container. Full chunks are encrypted and written at once.
+
+        Returns:
+            int: The number of bytes accepted.
+        """
+        data = memoryview(data).cast('B')
+        accepted = len(data)
+        try:
+            if self._buffer:
+                need = self.chunk_size - len(self._buffer)
+                self._buffer += data[:need]
+                data = data[need:]
+                if len(self._buffer) < self.chunk_size:
+                    return accepted
+                self._write_chunk(self._buffer)
+                self._buffer = bytearray()
+            whole = len(data) - len(data) % self.chunk_size
+            for start in range(0, whole, self.chunk_size):
+                self._write_chunk(data[start:start + self.chunk_size])
+            self._buffer += data[whole:]
+        except BaseException:
+            self.abort()
+            raise
+        return accepted
+
+    def close(self):
+        """Write the last partial chunk, the index and the footer, and close the file."""
+        if self.file.closed:
+            return
+        try:
+            if self._buffer:
+                self._write_chunk(self._buffer)
+                self._buffer = bytearray()
+            if len(self.entries) == self._count and self._start is not None:
+                self.file.close()  # nothing was appended, the old footer still describes the file
+                return
+            tag = b''
+            if self.mode == "GCM":
+                tag = self.aes.encrypt(b'', self.key, "GCM", index_iv(self.nonce, len(self.entries)),
+                                       aad=_index_aad(self.header, self.entries)).data
+            index = b''.join(ENTRY.pack(*entry) for entry in self.entries)
+            self.file.write(index + FOOTER.pack(self.offset, len(self.entries), tag.ljust(16, b'\x00'),
+                                                FOOTER_MAGIC))
+            self.file.truncate()
+            self.file.close()
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self):
+        """
+        Close the file without writing an index. A new container is left incomplete; an appended one is truncated
+        back to its previous layout.
+        """
+        if self.file.closed:
+            return
+        if self._start is not None:
+            self.file.truncate(self._start)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _write_chunk(self, data):
+        index = len(self.entries)
+        if index >= 0x80000000:
+            raise ValueError("A container holds at most 2**31 chunks")
+        aad = self.header if self.mode == "GCM" else None
+        sealed = self.aes.encrypt(bytes(data), self.key, self.mode, chunk_iv(self.nonce, index), aad=aad).data
+        tag = sealed[len(data):] if self.mode == "GCM" else b''
+        self.file.write(sealed[:len(data)])
+        self.entries.append((self.offset, self.size, len(data), tag.ljust(16, b'\x00')))
+        self.offset += len(data)
+        self.size += len(data)
+
+
+class Container_Reader:
+    def __init__(self, path, aes, key):
+        """
+        Read a container written by `Container_Writer` with random access.
+
+        Only the index is read when opening. `read` and `read_at` locate the chunks covering the requested
+        plaintext range through the index and decrypt only those. Under GCM the index is authenticated when
+        opening, and each chunk's tag is verified before its plaintext is returned.
+
+        Parameters:
+            path (str or os.PathLike): The container file.
+            aes (AES): The facade used to decrypt, which must use the container's key size.
+            key (str or bytes-like): The password, derived with the facade's KDF, or a raw key.
+
+        Attributes:
+            size (int): The plaintext length of the whole container.
+
+        Raises:
+            ValueError: If the file is not a complete container or uses another key size.
+            InvalidTag: If a GCM container's header or index fails to authenticate, for example because chunks were
+                        dropped from its end.
+        """
+        self.aes = aes
+        self.key = key
+        self.file = open(path, 'rb')
+        try:
+            self.header, AESMODE, self.mode, self.chunk_size, self.nonce, _, self.entries, tag = \
+                _read_layout(self.file)
+            if AESMODE != aes.AESMODE:
+                raise ValueError(f"The container uses AES-{AESMODE}, not AES-{aes.AESMODE}")
+            if self.mode == "GCM":
+                _verify_index(aes, key, self.header, self.nonce, self.entries, tag)
+        except BaseException:
+            self.file.close()
+            raise
+        self._starts = [entry[1] for entry in self.entries]
+        self.size = self.entries[-1][1] + self.entries[-1][2] if self.entries else 0
+        self.position = 0
+
+    def read_chunk(self, index):
+        """
+        Decrypt one chunk.
+
+        Raises:
+            InvalidTag: If a GCM chunk fails to authenticate.
+        """
+        file_offset, _, length, tag = self.entries[index]
+        self.file.seek(file_offset)
+        data = self.file.read(length)
+        if self.mode == "GCM":
+            return self.aes.decrypt(data + tag, self.key, self.mode, chunk_iv(self.nonce, index), aad=self.header)
+        return self.aes.decrypt(data, self.key, self.mode, chunk_iv(self.nonce, index))
+
+    def read_at(self, offset, length):
+        """
+        Decrypt `length` plaintext bytes starting at `offset`, touching only the chunks that hold them.
+
+        Returns:
+            bytes: The plaintext, shorter than `length` at the end of the container.
+        """
+        end = min(offset + length, self.size)
+        if offset >= end:
+            return b''
+        out = bytearray()
+        index = bisect_right(self._starts, offset) - 1
+        while index < len(self.entries) and self.entries[index][1] < end:
+            start = self.entries[index][1]
+            plain = self.read_chunk(index)
+            out += plain[max(0, offset - start):end - start]
+            index += 1
+        return bytes(out)
+
+    def read(self, size=-1):
+        """Read from the current position, like a binary file."""
+        if size is None or size < 0:
+            size = self.size - self.position
+        data = self.read_at(self.position, size)
+        self.position += len(data)
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """Move the plaintext position, like a binary file."""
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self.position, os.SEEK_END: self.size}[whence]
+        if base + offset < 0:
+            raise ValueError("Negative seek position")
+        self.position = base + offset
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
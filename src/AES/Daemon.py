@@ -0,0 +1,394 @@
+from AES.Asynchronous import Async_Cipher
+from AES.CipherText import CipherText
+from AES.GCM import InvalidTag
+from AES.Multi_Key import MULTI_KEY_MODES
+import argparse
+import asyncio
+import queue
+import socket
+import struct
+import threading
+
+# Every frame starts with the length of the rest of the frame
+FRAME = struct.Struct('>I')
+# Request header: operation, key type, cipher mode, iv length, key length, aad length. The key, iv, aad and data
+# follow in that order.
+REQUEST = struct.Struct('>BB4sBHI')
+ENCRYPT, DECRYPT = 1, 2
+RAW_KEY, PASSWORD = 0, 1
+# A response body is a status byte followed by the output, or by a UTF-8 error message
+OK, ERROR, INVALID_TAG = 0, 1, 2
+# Larger frames are refused and the connection is closed
+MAX_FRAME = 1 << 28
+
+def pack_request(operation, data, key, mode, iv=None, aad=None):
+    """
+    Build a request frame.
+
+    Parameters:
+        operation (int): ENCRYPT or DECRYPT.
+        data (bytes-like): The input.
+        key (str or bytes-like): A password, derived by the daemon's KDF, or a raw key.
+        mode (str): The cipher mode.
+        iv (bytes, optional): The IV or nonce.
+        aad (bytes, optional): For GCM, associated data.
+
+    Returns:
+        bytes: The frame, length prefix included.
+    """
+    kind, key = (PASSWORD, key.encode('utf-8')) if isinstance(key, str) else (RAW_KEY, bytes(key))
+    iv = b'' if iv is None else bytes(iv)
+    aad = b'' if aad is None else bytes(aad)
+    body = REQUEST.pack(operation, kind, mode.encode('ascii').ljust(4), len(iv), len(key), len(aad)) \
+           + key + iv + aad + bytes(data)
+    return FRAME.pack(len(body)) + body
+
+def unpack_request(body):
+    """
+    Split a request body, without its length prefix, into (operation, mode, key, iv, aad, data). An empty iv or
+    aad is returned as None.
+
+    Raises:
+        ValueError: If the body is shorter than its header says.
+    """
+    operation, kind, mode, iv_length, key_length, aad_length = REQUEST.unpack_from(body)
+    start = REQUEST.size
+    stop = start + key_length + iv_length + aad_length
+    if len(body) < stop:
+        raise ValueError("Truncated request")
+    key = body[start:start + key_length]
+    iv = body[start + key_length:start + key_length + iv_length]
+    aad = body[stop - aad_length:stop]
+    key = key.decode('utf-8') if kind == PASSWORD else key
+    return operation, mode.decode('ascii').strip(), key, iv or None, aad or None, body[stop:]
+
+
+class Micro_Batcher:
+    def __init__(self, aes, window=0.0003, max_batch=256):
+        """
+        Merge small requests arriving close together into one vectorized engine call.
+
+        The first request of a batch starts a timer of `window` seconds. Every request arriving in the meantime
+        joins the batch. Then each group of the same operation and mode goes through `AES.encrypt_many` or
+        `AES.decrypt_many` at once, whatever their keys. A batch with few distinct keys takes the schedules from
+        the key cache, so a batch under one hot key costs one cache lookup and one engine call. If a batch fails,
+        its requests are retried one by one, so a bad request only fails itself. Note that the event loop's
+        timer resolution, 1 ms with epoll, bounds how short the window is in practice. A window of 0 only
+        merges the requests that arrive in the same loop iteration. While the previous batch held a single request
+        the daemon is taken to be idle, and the next batch also closes at the end of the loop iteration, so a lone
+        request does not pay for the window.
+
+        Parameters:
+            aes (AES): The facade doing the work.
+            window (float, optional): Seconds a batch stays open.
+            max_batch (int, optional): Requests after which a batch is flushed without waiting.
+        """
+        self.aes = aes
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self._last_size = 0
+
+    def submit(self, operation, mode, key, data, iv):
+        """
+        Queue a request.
+
+        Returns:
+            asyncio.Future: Resolves to the output bytes.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((operation, mode, key, data, iv, future))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            if self.window > 0 and self._last_size > 1:
+                self._timer = loop.call_later(self.window, self.flush)
+            else:
+                self._timer = loop.call_soon(self.flush)
+        return future
+
+    def flush(self):
+        """Run every queued request now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        self._last_size = len(pending)
+        groups = {}
+        for request in pending:
+            groups.setdefault(request[:2], []).append(request)
+        for (operation, mode), requests in groups.items():
+            self._run(operation, mode, requests)
+
+    def _run(self, operation, mode, requests):
+        pairs = [(key, data) for _, _, key, data, _, _ in requests]
+        ivs = [iv for _, _, _, _, iv, _ in requests] if mode == "CTR" else None
+        try:
+            if operation == ENCRYPT:
+                results = [ciphertext.data for ciphertext in self.aes.encrypt_many(pairs, mode, ivs)]
+            else:
+                results = self.aes.decrypt_many(pairs, mode, ivs)
+        except Exception as error:
+            if len(requests) == 1:
+                if not requests[0][5].done():
+                    requests[0][5].set_exception(error)
+                return
+            for request in requests:
+                self._run(operation, mode, [request])
+            return
+        for request, result in zip(requests, results):
+            if not request[5].done():
+                request[5].set_result(result)
+
+
+class AES_Daemon:
+    def __init__(self, aes, path=None, host="127.0.0.1", port=0, window=0.0003, max_batch=256, batch_limit=4096,
+                 executor=None, inline_threshold=1 << 16):
+        """
+        A local encryption server wrapping an `AES` facade, so short-lived processes can share one warm process
+        with cached key and KDF results.
+
+        Requests and responses are length-prefixed binary frames, see `pack_request`. A connection carries any
+        number of requests, answered in order. ECB and CTR requests of at most `batch_limit` bytes go through a
+        `Micro_Batcher`. Larger requests and the other modes run through an `Async_Cipher`, so bulk work is
+        moved off the event loop.
+
+        Parameters:
+            aes (AES): The facade doing the work. Its key size, KDF and salt apply to every request.
+            path (str, optional): Listen on this Unix socket instead of TCP.
+            host (str, optional): The TCP address. Keep it on the loopback interface, since requests carry keys.
+            port (int, optional): The TCP port, 0 for any free port.
+            window (float, optional): The batching window in seconds.
+            max_batch (int, optional): Requests per batch at most.
+            batch_limit (int, optional): Requests larger than this many bytes are not batched.
+            executor (concurrent.futures.Executor, optional): Where large requests run, see `Async_Cipher`.
+            inline_threshold (int, optional): Unbatched requests below this many bytes run on the event loop.
+        """
+        self.aes = aes
+        self.path = path
+        self.host = host
+        self.port = port
+        self.batch_limit = batch_limit
+        self.batcher = Micro_Batcher(aes, window, max_batch)
+        self.cipher = Async_Cipher(aes, executor, inline_threshold)
+        self.server = None
+        self.address = None
+
+    async def start(self):
+        """Start listening. `address` is then the socket path or the (host, port) pair."""
+        if self.path is not None:
+            self.server = await asyncio.start_unix_server(self._serve, self.path)
+            self.address = self.path
+        else:
+            self.server = await asyncio.start_server(self._serve, self.host, self.port)
+            self.address = self.server.sockets[0].getsockname()[:2]
+        return self.address
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                try:
+                    size, = FRAME.unpack(await reader.readexactly(FRAME.size))
+                    if size > MAX_FRAME:
+                        break
+                    body = await reader.readexactly(size)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                status, payload = await self._handle(body)
+                writer.write(FRAME.pack(len(payload) + 1) + bytes([status]) + payload)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def _handle(self, body):
+        try:
+            operation, mode, key, iv, aad, data = unpack_request(body)
+            if operation not in (ENCRYPT, DECRYPT):
+                raise ValueError(f"Unknown operation {operation}")
+            if mode in MULTI_KEY_MODES and aad is None and len(data) <= self.batch_limit:
+                if mode == "CTR" and iv is None:
+                    raise ValueError("CTR mode needs a nonce of 1 to 16 bytes")
+                out = await self.batcher.submit(operation, mode, key, data, iv)
+            elif operation == ENCRYPT:
+                out = (await self.cipher.encrypt(data, key, mode, iv, aad=aad)).data
+            else:
+                out = await self.cipher.decrypt(data, key, mode, iv, aad=aad)
+            return OK, bytes(out)
+        except InvalidTag as error:
+            return INVALID_TAG, str(error).encode('utf-8')
+        except Exception as error:
+            # Any other failure is reported to this request only, so it never drops a pooled connection
+            return ERROR, (str(error) or type(error).__name__).encode('utf-8')
+
+
+class AES_Client:
+    def __init__(self, path=None, host="127.0.0.1", port=None, pool_size=4, timeout=None):
+        """
+        Blocking client of an `AES_Daemon`, safe to share between threads.
+
+        Connections are opened on demand and kept open for reuse, up to `pool_size` of them. A caller waits when all
+        are busy. A request on a reused connection that the daemon has closed meanwhile is retried once on a new
+        connection.
+
+        Parameters:
+            path (str, optional): The daemon's Unix socket.
+            host (str, optional): The daemon's TCP address.
+            port (int, optional): The daemon's TCP port. Either `path` or `port` is required.
+            pool_size (int, optional): Connections kept at most.
+            timeout (float, optional): Socket timeout in seconds.
+        """
+        if path is None and port is None:
+            raise ValueError("Give the daemon's Unix socket path or TCP port")
+        self.path = path
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def encrypt(self, data, key, mode="CTR", iv=None, aad=None):
+        """
+        Encrypt through the daemon, like `AES.encrypt`.
+
+        Returns:
+            CipherText: The ciphertext with its mode, iv and plaintext length.
+
+        Raises:
+            ValueError: If the daemon rejects the request.
+        """
+        data = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+        out = self._request(pack_request(ENCRYPT, data, key, mode, iv, aad))
+        return CipherText(out, len(data), mode, iv)
+
+    def decrypt(self, data, key, mode=None, iv=None, aad=None):
+        """
+        Decrypt through the daemon, like `AES.decrypt`. A CipherText supplies the mode and iv.
+
+        Returns:
+            bytes: The plaintext.
+
+        Raises:
+            ValueError: If the daemon rejects the request.
+            InvalidTag: If a GCM tag does not match.
+        """
+        if isinstance(data, CipherText):
+            mode = data.mode if mode is None else mode
+            iv = data.iv if iv is None else iv
+            data = data.data
+        return self._request(pack_request(DECRYPT, data, key, "CTR" if mode is None else mode, iv, aad))
+
+    def close(self):
+        """Close the idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self):
+        if self.path is not None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = self.path
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            address = (self.host, self.port)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _exchange(self, sock, frame):
+        sock.sendall(frame)
+        size, = FRAME.unpack(self._receive(sock, FRAME.size))
+        return self._receive(sock, size)
+
+    def _receive(self, sock, size):
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = sock.recv_into(view[received:])
+            if not count:
+                raise ConnectionError("The daemon closed the connection")
+            received += count
+        return bytes(buffer)
+
+    def _request(self, frame):
+        with self._slots:
+            try:
+                sock, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                sock, reused = self._connect(), False
+            try:
+                body = self._exchange(sock, frame)
+            except ConnectionError:
+                sock.close()
+                if not reused:
+                    raise
+                sock = self._connect()
+                try:
+                    body = self._exchange(sock, frame)
+                except BaseException:
+                    sock.close()
+                    raise
+            except BaseException:
+                sock.close()
+                raise
+            self._idle.put(sock)
+        status, payload = body[0], body[1:]
+        if status == INVALID_TAG:
+            raise InvalidTag(payload.decode('utf-8'))
+        if status != OK:
+            raise ValueError(payload.decode('utf-8'))
+        return payload
+
+
+def main(argv=None):
+    from AES.AES import AES
+    parser = argparse.ArgumentParser(prog="python -m AES.Daemon", description="Run a local AES encryption daemon.")
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--bits", type=int, default=128, choices=(128, 192, 256))
+    parser.add_argument("--engine", default="batch")
+    parser.add_argument("--kdf", default="sha256")
+    parser.add_argument("--salt", default="", help="hex encoded salt for password derivation")
+    parser.add_argument("--window", type=float, default=300, help="batching window in microseconds")
+    args = parser.parse_args(argv)
+    aes = AES(args.bits, engine=args.engine, kdf=args.kdf, salt=bytes.fromhex(args.salt))
+    daemon = AES_Daemon(aes, args.unix, args.host, args.port, window=args.window / 1e6)
+
+    async def run():
+        print("listening on", await daemon.start(), flush=True)
+        await daemon.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
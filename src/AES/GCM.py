@@ -0,0 +1,223 @@
+from AES.Modes import MODES, Cipher_Mode, CTR_Mode
+import hmac
+import numpy as np
+
+# The GCM reduction polynomial x^128 + x^7 + x^2 + x + 1 in the bit-reflected order of GHASH
+R = 0xE1 << 120
+
+class InvalidTag(ValueError):
+    """Raised when a GCM authentication tag does not match, meaning the key, IV, AAD, ciphertext or tag is wrong."""
+
+
+def ghash_tables(H):
+    """
+    Precompute the multiplication tables for a hash key.
+
+    Multiplying by H is linear, so X * H is the XOR over the 16 bytes of X of (byte_j << 8 * (15 - j)) * H.
+    TABLE[j][b] holds that product for byte position j and byte value b, which turns every GHASH block into 16
+    lookups and XORs without any reduction step.
+
+    Parameters:
+        H (int): The hash key E(K, 0^128) as a 128-bit big-endian integer.
+
+    Returns:
+        tuple: 16 tuples of 256 integers.
+    """
+    # powers[i] is the product of H with the element that has only bit i set, counting from the most significant bit
+    powers = [H]
+    for _ in range(127):
+        V = powers[-1]
+        powers.append((V >> 1) ^ R if V & 1 else V >> 1)
+    tables = []
+    for j in range(16):
+        table = [0] * 256
+        for b in range(1, 256):
+            low = (b & -b).bit_length() - 1
+            table[b] = table[b ^ (1 << low)] ^ powers[8 * j + 7 - low]
+        tables.append(tuple(table))
+    return tuple(tables)
+
+def ghash_multiply(tables, X):
+    """Multiply the 128-bit field element X by the hash key the tables were built for."""
+    T = tables
+    return (T[0][X >> 120] ^ T[1][(X >> 112) & 0xFF] ^ T[2][(X >> 104) & 0xFF] ^ T[3][(X >> 96) & 0xFF]
+            ^ T[4][(X >> 88) & 0xFF] ^ T[5][(X >> 80) & 0xFF] ^ T[6][(X >> 72) & 0xFF] ^ T[7][(X >> 64) & 0xFF]
+            ^ T[8][(X >> 56) & 0xFF] ^ T[9][(X >> 48) & 0xFF] ^ T[10][(X >> 40) & 0xFF] ^ T[11][(X >> 32) & 0xFF]
+            ^ T[12][(X >> 24) & 0xFF] ^ T[13][(X >> 16) & 0xFF] ^ T[14][(X >> 8) & 0xFF] ^ T[15][X & 0xFF])
+
+
+class GHASH:
+    def __init__(self, tables):
+        """
+        Incremental GHASH over a sequence of byte strings. Input of any length is accepted; `pad` zero fills the
+        current partial block, as GCM does between the AAD and the ciphertext.
+
+        Parameters:
+            tables (tuple): The multiplication tables from `ghash_tables`.
+        """
+        self.tables = tables
+        self.state = 0
+        self._partial = b''
+
+    def update(self, data):
+        data = memoryview(data).cast('B')
+        if self._partial:
+            need = 16 - len(self._partial)
+            self._partial += bytes(data[:need])
+            data = data[need:]
+            if len(self._partial) < 16:
+                return
+            self._absorb(self._partial)
+            self._partial = b''
+        whole = len(data) - len(data) % 16
+        self._absorb(data[:whole])
+        self._partial = bytes(data[whole:])
+
+    def pad(self):
+        if self._partial:
+            self._absorb(self._partial.ljust(16, b'\x00'))
+            self._partial = b''
+
+    def digest(self):
+        self.pad()
+        return self.state
+
+    def _absorb(self, data):
+        tables, X = self.tables, self.state
+        for i in range(0, len(data), 16):
+            X = ghash_multiply(tables, X ^ int.from_bytes(data[i:i + 16], 'big'))
+        self.state = X
+
+
+class GCTR_Mode(CTR_Mode):
+    """The GCM flavour of CTR: only the low 32 bits of the counter block are incremented, modulo 2^32."""
+    def counter_blocks(self, first_block, count):
+        prefix = np.frombuffer((self.initial_counter >> 32).to_bytes(12, 'big'), dtype='>u4')
+        start = (self.initial_counter + first_block) & 0xFFFFFFFF
+        counters = np.empty((count, 4), dtype='>u4')
+        counters[:, :3] = prefix
+        counters[:, 3] = (np.uint64(start) + np.arange(count, dtype=np.uint64)) & np.uint64(0xFFFFFFFF)
+        return counters.tobytes()
+
+    def _fill_counters(self, counters, first_block):
+        counters.view(np.uint8).reshape(-1)[:] = np.frombuffer(self.counter_blocks(first_block, len(counters)),
+                                                               dtype=np.uint8)
+
+
+def _hash_key_tables(engine):
+    return lambda keys: ghash_tables(int.from_bytes(engine.encrypt_blocks(bytes(16), keys), 'big'))
+
+
+class GCM_Mode(Cipher_Mode):
+    """
+    Galois/Counter Mode: CTR encryption plus a GHASH authentication tag over the AAD and the ciphertext, in one pass.
+
+    The GHASH tables depend only on the key, so they are cached on the Expanded_Key and every further message under
+    the same key only pays for the counter block setup. `seal`/`open` handle whole messages with the 16-byte tag
+    appended to the ciphertext, and `open` verifies the tag before any plaintext is produced. The streaming
+    `encrypt`/`decrypt` + `tag`/`verify` calls release data as it is processed.
+    """
+    name = "GCM"
+    tag_size = 16
+
+    def __init__(self, encryption, decryption, keys, iv):
+        """
+        Parameters:
+            encryption: An object with `encrypt_blocks(data, keys)`, such as a registered backend's encryption.
+            decryption: The backend's decryption. GCM only runs the cipher forwards, so it is not used.
+            keys (Expanded_Key): The expanded key schedule.
+            iv (bytes): The IV, 12 bytes recommended. Other non-empty lengths are hashed into the counter block.
+
+        Raises:
+            ValueError: If the IV is missing or empty.
+        """
+        if not iv:
+            raise ValueError("GCM mode needs a non-empty iv")
+        self.engine = encryption
+        self.decryption = decryption
+        self.keys = keys
+        self.iv = bytes(iv)
+        self.tables = keys.derived('ghash', _hash_key_tables(encryption))
+        if len(self.iv) == 12:
+            J0 = int.from_bytes(self.iv + b'\x00\x00\x00\x01', 'big')
+        else:
+            J0 = GHASH(self.tables)
+            J0.update(self.iv)
+            J0.pad()
+            J0.update((8 * len(self.iv)).to_bytes(16, 'big'))
+            J0 = J0.digest()
+        self.initial_counter = J0
+        inc = (J0 & ~0xFFFFFFFF) | ((J0 + 1) & 0xFFFFFFFF)
+        self._ctr = GCTR_Mode(encryption, decryption, keys, inc.to_bytes(16, 'big'))
+        self._ghash = GHASH(self.tables)
+        self._aad_length = 0
+        self._length = 0
+
+    def authenticate_additional_data(self, data):
+        """
+        Add associated data that is authenticated but not encrypted. May be called several times, before any
+        plaintext or ciphertext.
+
+        Raises:
+            ValueError: If encryption or decryption has already started.
+        """
+        if self._length:
+            raise ValueError("Additional data must be passed before any plaintext or ciphertext")
+        self._ghash.update(data)
+        self._aad_length += len(data)
+
+    def encrypt(self, data, offset=0):
+        out = self._ctr.encrypt(data, self._length)
+        self._hash_ciphertext(out)
+        return out
+
+    def decrypt(self, data, offset=0):
+        self._hash_ciphertext(data)
+        return self._ctr.decrypt(data, self._length - len(data))
+
+    def tag(self):
+        """Return the 16-byte authentication tag over everything processed so far."""
+        self._ghash.pad()
+        lengths = (8 * self._aad_length) << 64 | 8 * self._length
+        self._ghash.update(lengths.to_bytes(16, 'big'))
+        S = self._ghash.digest()
+        E = int.from_bytes(self.engine.encrypt_blocks(self.initial_counter.to_bytes(16, 'big'), self.keys), 'big')
+        return (S ^ E).to_bytes(16, 'big')
+
+    def verify(self, tag):
+        """
+        Check a received tag against the data processed so far, in constant time.
+
+        Raises:
+            InvalidTag: If the tag does not match.
+        """
+        if not hmac.compare_digest(self.tag(), bytes(tag)):
+            raise InvalidTag("GCM authentication failed, the key, iv, aad, ciphertext or tag is wrong")
+
+    def seal(self, data):
+        """Encrypt a whole message and return the ciphertext followed by the 16-byte tag."""
+        return self.encrypt(data) + self.tag()
+
+    def open(self, data):
+        """
+        Authenticate and decrypt a whole message produced by `seal`. The tag is checked before anything is decrypted.
+
+        Raises:
+            InvalidTag: If the message is shorter than a tag or the tag does not match.
+        """
+        data = memoryview(data).cast('B')
+        if len(data) < self.tag_size:
+            raise InvalidTag("GCM message is shorter than its tag")
+        ciphertext, tag = data[:-self.tag_size], data[-self.tag_size:]
+        self._hash_ciphertext(ciphertext)
+        self.verify(tag)
+        return self._ctr.decrypt(ciphertext, 0)
+
+    def _hash_ciphertext(self, data):
+        if not self._length:
+            self._ghash.pad()  # the AAD ends on a block boundary
+        self._ghash.update(data)
+        self._length += len(data)
+
+
+MODES["GCM"] = GCM_Mode
@@ -0,0 +1,120 @@
+AES_MODULUS = 0x11B
+
+def _multiply(a, b, modulus=AES_MODULUS):
+    """Multiply two bytes in GF(2^8) with the shift-and-add method."""
+    result = 0
+    for _ in range(8):
+        if b & 1:
+            result ^= a
+        a <<= 1
+        if a & 0x100:
+            a ^= modulus
+        b >>= 1
+    return result
+
+# Doubling of every byte value, the building block of the tables below
+_XTIME = bytes((value << 1) ^ AES_MODULUS if value & 0x80 else value << 1 for value in range(256))
+
+def _multiply_table(factor):
+    # XOR of the doublings of all 256 bytes picked by the bits of factor. bytes.translate doubles a whole table in
+    # one call, which keeps the import fast.
+    result, power = 0, bytes(range(256))
+    while factor:
+        if factor & 1:
+            result ^= int.from_bytes(power, 'big')
+        power = power.translate(_XTIME)
+        factor >>= 1
+    return result.to_bytes(256, 'big')
+
+def _log_tables():
+    # 0x03 generates the multiplicative group of GF(2^8)
+    exp = [0] * 510
+    log = [0] * 256
+    value = 1
+    for power in range(255):
+        exp[power] = exp[power + 255] = value
+        log[value] = power
+        value ^= _XTIME[value]  # times 0x03
+    return bytes(exp), bytes(log)
+
+class Galois_Field:
+    """
+    Arithmetic in GF(2^8) with the AES polynomial x^8 + x^4 + x^3 + x + 1 (0x11B).
+
+    The multiply-by-2/3/9/11/13/14 tables used by MixColumns and InvMixColumns, together with the
+    log/antilog tables used for general multiplication, are computed once when the module is imported
+    and shared by every instance. The column transforms accept a single 4x4 state or a stack of states
+    of shape (N, 4, 4).
+    """
+    MUL2 = _multiply_table(0x02)
+    MUL3 = _multiply_table(0x03)
+    MUL9 = _multiply_table(0x09)
+    MUL11 = _multiply_table(0x0B)
+    MUL13 = _multiply_table(0x0D)
+    MUL14 = _multiply_table(0x0E)
+    EXP, LOG = _log_tables()
+
+    def multiply(self, a, b, modulus=AES_MODULUS):
+        """
+        Multiply two bytes in GF(2^8).
+
+        Parameters:
+            a (int): The first operand.
+            b (int): The second operand.
+            modulus (int, optional): The reduction polynomial. Tables are used for the AES polynomial (0x11B),
+                                     any other modulus falls back to the shift-and-add method.
+
+        Returns:
+            int: The product of a and b.
+        """
+        a, b = int(a), int(b)
+        if modulus != AES_MODULUS:
+            return _multiply(a, b, modulus)
+        if a == 0 or b == 0:
+            return 0
+        return self.EXP[self.LOG[a] + self.LOG[b]]
+
+    def xtime(self, state):
+        """Multiply every byte of `state` by 0x02."""
+        import numpy as np
+        return np.frombuffer(self.MUL2, dtype=np.uint8)[state]
+
+    def mix_columns(self, state):
+        """
+        Apply MixColumns to a state or a stack of states.
+
+        Each output byte is computed as s[r] ^ t ^ xtime(s[r] ^ s[r+1]), where t is the XOR of the
+        four bytes of the column, which is equivalent to multiplying the column by the fixed
+        matrix [[2, 3, 1, 1], [1, 2, 3, 1], [1, 1, 2, 3], [3, 1, 1, 2]].
+
+        Parameters:
+            state (np.ndarray): A uint8 array of shape (4, 4) or (N, 4, 4), rows on the second to last axis.
+
+        Returns:
+            np.ndarray: The mixed state, with the same shape.
+        """
+        import numpy as np
+        state = np.asarray(state, dtype=np.uint8)
+        t = state[..., 0, :] ^ state[..., 1, :] ^ state[..., 2, :] ^ state[..., 3, :]
+        rotated = np.roll(state, -1, axis=-2)
+        return state ^ t[..., np.newaxis, :] ^ self.xtime(state ^ rotated)
+
+    def inv_mix_columns(self, state):
+        """
+        Apply InvMixColumns to a state or a stack of states.
+
+        The inverse matrix [[14, 11, 13, 9], [9, 14, 11, 13], [13, 9, 14, 11], [11, 13, 9, 14]] factors into
+        a cheap preprocessing step followed by MixColumns: rows 0 and 2 are XORed with 4 * (s0 ^ s2) and
+        rows 1 and 3 with 4 * (s1 ^ s3), so only xtime lookups are needed.
+
+        Parameters:
+            state (np.ndarray): A uint8 array of shape (4, 4) or (N, 4, 4), rows on the second to last axis.
+
+        Returns:
+            np.ndarray: The unmixed state, with the same shape.
+        """
+        import numpy as np
+        state = np.asarray(state, dtype=np.uint8)
+        u = self.xtime(self.xtime(state[..., 0, :] ^ state[..., 2, :]))
+        v = self.xtime(self.xtime(state[..., 1, :] ^ state[..., 3, :]))
+        return self.mix_columns(state ^ np.stack([u, v, u, v], axis=-2))
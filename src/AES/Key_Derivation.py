@@ -0,0 +1,207 @@
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+class SHA256_KDF:
+    """
+    The original derivation of `basic_functions.hash_key`: SHA-256 over the salt and the UTF-8 password,
+    truncated to the key size. With an empty salt it gives the same keys as before. It is fast, so it offers no
+    protection against guessing weak passwords.
+    """
+    name = "sha256"
+
+    @property
+    def params(self):
+        return (self.name,)
+
+    def derive(self, password, salt, length):
+        return hashlib.sha256(salt + password).digest()[:length]
+
+
+class PBKDF2_KDF:
+    def __init__(self, iterations=600000, hash_name="sha256"):
+        """
+        PBKDF2-HMAC (RFC 8018), deliberately slow to make password guessing expensive.
+
+        Parameters:
+            iterations (int, optional): The number of HMAC iterations.
+            hash_name (str, optional): The hashlib digest used by the HMAC.
+        """
+        self.name = "pbkdf2"
+        self.iterations = iterations
+        self.hash_name = hash_name
+
+    @property
+    def params(self):
+        return (self.name, self.hash_name, self.iterations)
+
+    def derive(self, password, salt, length):
+        return hashlib.pbkdf2_hmac(self.hash_name, password, salt, self.iterations, length)
+
+
+class Scrypt_KDF:
+    def __init__(self, n=1 << 14, r=8, p=1, maxmem=0):
+        """
+        scrypt (RFC 7914), slow and memory hard, which also makes guessing on dedicated hardware expensive.
+
+        Parameters:
+            n (int, optional): The CPU/memory cost, a power of two.
+            r (int, optional): The block size.
+            p (int, optional): The parallelization.
+            maxmem (int, optional): The memory limit in bytes passed to OpenSSL, 0 for its default.
+        """
+        self.name = "scrypt"
+        self.n = n
+        self.r = r
+        self.p = p
+        self.maxmem = maxmem
+
+    @property
+    def params(self):
+        return (self.name, self.n, self.r, self.p)
+
+    def derive(self, password, salt, length):
+        return hashlib.scrypt(password, salt=salt, n=self.n, r=self.r, p=self.p, maxmem=self.maxmem, dklen=length)
+
+
+# Key derivation functions selectable by name, created with their default parameters
+KDFS = {"sha256": SHA256_KDF, "pbkdf2": PBKDF2_KDF, "scrypt": Scrypt_KDF}
+
+def get_kdf(kdf):
+    """
+    Return a key derivation function.
+
+    Parameters:
+        kdf (str or object): A name from `KDFS`, or an object with a `params` tuple identifying its settings and
+                             `derive(password, salt, length) -> bytes`, such as `PBKDF2_KDF(iterations=...)`.
+
+    Returns:
+        object: The key derivation function.
+
+    Raises:
+        ValueError: If the name is unknown.
+    """
+    if isinstance(kdf, str):
+        if kdf not in KDFS:
+            raise ValueError(f"Unknown key derivation function {kdf!r}, expected one of {', '.join(KDFS)}")
+        return KDFS[kdf]()
+    return kdf
+
+
+class Derived_Key_Cache:
+    def __init__(self, maxsize=128, ttl=600.0):
+        """
+        Least recently used cache of derived keys, keyed by (KDF settings, password, salt, key length). Entries
+        expire `ttl` seconds after they were derived, so a slow KDF runs once per session rather than once per
+        message while derived keys do not stay in memory indefinitely.
+
+        The cache is safe to share between threads. The KDF runs outside the lock, so a slow derivation never
+        blocks lookups of other passwords.
+
+        Parameters:
+            maxsize (int, optional): The number of derived keys to keep. 0 disables caching.
+            ttl (float, optional): Seconds a derived key stays valid.
+
+        Attributes:
+            hits (int): Number of lookups answered from the cache.
+            misses (int): Number of lookups that had to run the KDF.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kdf, password, salt, length):
+        """
+        Return the key derived from `password`, running the KDF on a miss or after expiry.
+
+        Parameters:
+            kdf (object): The key derivation function, see `get_kdf`.
+            password (str): The password.
+            salt (bytes): The salt.
+            length (int): The key length in bytes.
+
+        Returns:
+            bytes: The derived key.
+        """
+        cache_key = (kdf.params, password, salt, length)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                self._entries.move_to_end(cache_key)
+                return entry[1]
+            self.misses += 1
+        derived = bytes(kdf.derive(password.encode('utf-8'), salt, length))
+        if self.maxsize > 0:
+            with self._lock:
+                self._entries[cache_key] = (now + self.ttl, derived)
+                self._entries.move_to_end(cache_key)
+                self._evict()
+        return derived
+
+    def expire(self):
+        """Drop every entry whose time to live has passed."""
+        now = time.monotonic()
+        with self._lock:
+            for cache_key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                del self._entries[cache_key]
+
+    def resize(self, maxsize):
+        """Change the number of derived keys kept, evicting the least recently used ones if needed."""
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """Drop every cached key and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Return the cache statistics as a dict with hits, misses, maxsize, currsize and ttl."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "maxsize": self.maxsize,
+                    "currsize": len(self._entries), "ttl": self.ttl}
+
+    def _evict(self):
+        while len(self._entries) > max(self.maxsize, 0):
+            self._entries.popitem(last=False)
+
+
+# Process wide cache shared by every AES instance unless one is passed in
+derived_key_cache = Derived_Key_Cache()
+
+def resolve_key(key, AESMODE, kdf, salt=b'', cache=None):
+    """
+    Turn a key argument into raw AES key bytes.
+
+    Parameters:
+        key (str or bytes-like): A password, which is derived with `kdf`, or a raw key of AESMODE/8 bytes,
+                                 which is used as is.
+        AESMODE (int): The key size in bits (128, 192, or 256).
+        kdf (object): The key derivation function for passwords, see `get_kdf`.
+        salt (bytes, optional): The salt for passwords.
+        cache (Derived_Key_Cache, optional): The cache of derived keys. Defaults to the process wide cache.
+
+    Returns:
+        bytes: The raw key.
+
+    Raises:
+        ValueError: If a raw key has the wrong length or the key is neither text nor bytes.
+    """
+    if isinstance(key, str):
+        return (derived_key_cache if cache is None else cache).get(kdf, key, bytes(salt), AESMODE // 8)
+    if isinstance(key, (bytes, bytearray, memoryview)):
+        key = bytes(key)
+        if len(key) != AESMODE // 8:
+            raise ValueError(f"A raw AES-{AESMODE} key must be {AESMODE // 8} bytes long, not {len(key)}; "
+                             "pass passwords as str")
+        return key
+    raise ValueError("Unsupported key type. Expected a str password or a bytes-like raw key.")
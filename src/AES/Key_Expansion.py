@@ -1,5 +1,26 @@
 from AES.SBOX import SBOX
-import numpy as np
+from collections import OrderedDict
+import threading
+
+# Rcon values its just start from 1 and multiply by 2 each time
+RCON = [
+    [0x01, 0x00, 0x00, 0x00],
+    [0x02, 0x00, 0x00, 0x00],
+    [0x04, 0x00, 0x00, 0x00],
+    [0x08, 0x00, 0x00, 0x00],
+    [0x10, 0x00, 0x00, 0x00],
+    [0x20, 0x00, 0x00, 0x00],
+    [0x40, 0x00, 0x00, 0x00],
+    [0x80, 0x00, 0x00, 0x00],
+    [0x1B, 0x00, 0x00, 0x00],
+    [0x36, 0x00, 0x00, 0x00],
+    [0x6C, 0x00, 0x00, 0x00],
+    [0xD8, 0x00, 0x00, 0x00],
+    [0xAB, 0x00, 0x00, 0x00],
+    [0x4D, 0x00, 0x00, 0x00],
+    [0x9A, 0x00, 0x00, 0x00]
+]
+
 class Key_Expansion:
     def __init__(self, key_size=10):
         """defaulted to AES 128
@@ -8,8 +29,6 @@ class Key_Expansion:
             key_size (int, optional): _description_. Defaults to 10 for AES-128.
         """
         self.sbox = SBOX()        
-        self.words = []
-        self.keys = []
         self.key_rounds = key_size
     def generation_factor(self,W,round):
         """
@@ -22,86 +41,142 @@ class Key_Expansion:
         Returns:
             list: New word generated for the key schedule.
         """
-        # Rcon values its just start from 1 and multiply by 2 each time               
-        Rcon = [
-            [0x01, 0x00, 0x00, 0x00],
-            [0x02, 0x00, 0x00, 0x00],
-            [0x04, 0x00, 0x00, 0x00],
-            [0x08, 0x00, 0x00, 0x00],
-            [0x10, 0x00, 0x00, 0x00],
-            [0x20, 0x00, 0x00, 0x00],
-            [0x40, 0x00, 0x00, 0x00],
-            [0x80, 0x00, 0x00, 0x00],
-            [0x1B, 0x00, 0x00, 0x00],
-            [0x36, 0x00, 0x00, 0x00],
-            [0x6C, 0x00, 0x00, 0x00],
-            [0xD8, 0x00, 0x00, 0x00],
-            [0xAB, 0x00, 0x00, 0x00],
-            [0x4D, 0x00, 0x00, 0x00],
-            [0x9A, 0x00, 0x00, 0x00]
-        ]        
         new_word = [W[1],W[2],W[3],W[0]]        
                                                      
         for i in range(len(new_word)):
             new_word[i] = self.sbox.byte_Sub(new_word[i])                                                                            
-        return self.xor(Rcon[round],new_word,mode='Rcon')
+        return self.xor(RCON[round],new_word,mode='Rcon')
                     
     def key_generation(self,word,round):  
         """
-        Generates four words for the current round key based on the previous round's words.
+        Generates the next Nk words of the key schedule from the previous Nk words.
         
         Parameters:
-            previous_words (list): List of the four words from the previous round.
-            round (int): Current round number for generating the appropriate round key.
+            word (list): List of the Nk words from the previous step (4, 6 or 8 words for AES-128/192/256).
+            round (int): Current step number for selecting the appropriate Rcon value.
         
         Returns:
-            list: A list containing four words (lists of bytes) for the current round key.
+            list: A list containing Nk new words (lists of bytes) of the key schedule.
         """                        
         result = []                       
-        W4 = self.xor(word[0],self.generation_factor(word[3],round),mode='flat')
+        W4 = self.xor(word[0],self.generation_factor(word[-1],round),mode='flat')
         result.append(W4) 
          
-        for i in range(1,4):                        
-            Wi = self.xor(word[i],result[i-1],mode='flat')            
+        for i in range(1,len(word)):                        
+            previous = result[i-1]
+            if len(word) > 6 and i == 4:  # AES-256 applies SubWord to the middle word as well
+                previous = [self.sbox.byte_Sub(byte) for byte in previous]
+            Wi = self.xor(word[i],previous,mode='flat')            
             result.append(Wi)                               
         return result
                  
     def key_generation_setup(self,key_matrix): 
         """
-        Initializes the first four words (W0, W1, W2, W3) from the initial key matrix.
+        Builds the first Nk words (W0 ... W(Nk-1)) from the columns of the initial key matrix.
         
         Parameters:
-            key_matrix (list): A 4x4 matrix of hexadecimal values representing the initial key.
+            key_matrix (np.ndarray): A 4xNk uint8 matrix representing the initial key (Nk = 4, 6 or 8).
+        
+        Returns:
+            list: The initial words of the key schedule.
         """                                         
-        for i in range(len(key_matrix)):   
+        words = []
+        for i in range(key_matrix.shape[1]):   
             word = []            
-            for row in range(len(key_matrix)):                            
-                word.append(key_matrix[row][i])                       
-            self.words.append(word) 
+            for row in range(key_matrix.shape[0]):                            
+                word.append(int(key_matrix[row][i]))                       
+            words.append(word) 
+        return words
             
     def key_expansion(self,key_matrix,round=0):
         """
-        Generates the full round keys for AES encryption.
+        Generates the full round keys for AES encryption, following the FIPS-197 key schedule.
         
         Parameters:
-            key_matrix (list): A 4x4 matrix of hexadecimal values representing the initial key.
+            key_matrix (np.ndarray): A 4xNk uint8 matrix representing the initial key.
         
         Returns:
-            list: List of round keys for AES encryption.
+            list: List of key_rounds + 1 round keys (4x4 uint8 matrices) for AES encryption.
         """
-        self.key_generation_setup(key_matrix)
-        
-        # Start with initial key
-        self.keys.append(self.words[:4])  # W0, W1, W2, W3 as the first round key
+        words = self.key_generation_setup(key_matrix)
+        nk = len(words)
+        total_words = 4 * (self.key_rounds + 1)
         
-        # Generate remaining keys for all rounds
-        for _ in range(self.key_rounds):
-            # Generate the next 4 words based on the last 4 words in self.words
-            new_words = self.key_generation(self.words[-4:], round)                       
-            self.words.extend(new_words)  # Add the new words to the list
-            self.keys.append(new_words)   # Add the new round key to keys
+        # Generate Nk words at a time until every round has a key
+        while len(words) < total_words:
+            words.extend(self.key_generation(words[-nk:], round))
             round += 1        
-        return self.inverse_matrix(np.array(self.keys))  
+        keys = [words[i:i + 4] for i in range(0, total_words, 4)]
+        import numpy as np
+        return self.inverse_matrix(np.array(keys, dtype=np.uint8))  
+    
+    def key_expansion_words(self,key):
+        """
+        Generates the round keys as big-endian 32-bit words, one per column, in plain Python. This is the layout
+        the T-table rounds use, and it needs no NumPy.
+        
+        Parameters:
+            key (bytes): The raw AES key, 4 * Nk bytes long.
+        
+        Returns:
+            tuple: The 4 * (key_rounds + 1) words of the key schedule.
+        """
+        S = self.sbox.s_box_table
+        nk = len(key) // 4
+        words = [int.from_bytes(key[i:i + 4], 'big') for i in range(0, len(key), 4)]
+        for i in range(nk, 4 * (self.key_rounds + 1)):
+            word = words[-1]
+            if i % nk == 0:
+                # RotWord, SubWord and Rcon
+                word = (S[(word >> 16) & 0xFF] << 24 | S[(word >> 8) & 0xFF] << 16 | S[word & 0xFF] << 8
+                        | S[word >> 24]) ^ RCON[i // nk - 1][0] << 24
+            elif nk > 6 and i % nk == 4:  # AES-256 applies SubWord to the middle word as well
+                word = S[word >> 24] << 24 | S[(word >> 16) & 0xFF] << 16 | S[(word >> 8) & 0xFF] << 8 | S[word & 0xFF]
+            words.append(words[i - nk] ^ word)
+        return tuple(words)
+    
+    def generation_factors(self,W,round):
+        """
+        `generation_factor` for many key schedules at once.
+        
+        Parameters:
+            W (np.ndarray): A uint8 array of shape (K, 4), one word per key schedule.
+            round (int): Current round number to access the corresponding Rcon value.
+        
+        Returns:
+            np.ndarray: The new words, shape (K, 4).
+        """
+        import numpy as np
+        new_words = self.sbox.matrix_Sub(np.roll(W, -1, axis=1))
+        new_words[:, 0] ^= RCON[round][0]
+        return new_words
+    
+    def key_expansion_many(self,keys):
+        """
+        Generates the round keys of many keys at once. Every word of the FIPS-197 schedule is computed for all
+        keys in one vector step, as `key_generation` does for one key, so the Python work does not grow with the
+        number of keys.
+        
+        Parameters:
+            keys (np.ndarray): A uint8 array of shape (K, 4 * Nk) holding K raw keys of the same size.
+        
+        Returns:
+            np.ndarray: A uint8 array of shape (K, key_rounds + 1, 4, 4), each round key in state layout.
+        """
+        import numpy as np
+        count, nk = len(keys), keys.shape[1] // 4
+        total_words = 4 * (self.key_rounds + 1)
+        words = np.empty((count, total_words, 4), dtype=np.uint8)
+        words[:, :nk] = keys.reshape(count, nk, 4)
+        for i in range(nk, total_words):
+            previous = words[:, i - 1]
+            if i % nk == 0:
+                previous = self.generation_factors(previous, i // nk - 1)
+            elif nk > 6 and i % nk == 4:  # AES-256 applies SubWord to the middle word as well
+                previous = self.sbox.matrix_Sub(previous)
+            words[:, i] = words[:, i - nk] ^ previous
+        # Word c of a round key is column c of its state
+        return np.ascontiguousarray(words.reshape(count, self.key_rounds + 1, 4, 4).transpose(0, 1, 3, 2))
     
     def inverse_matrix(self,matrix_keys):
         """
@@ -122,30 +197,190 @@ class Key_Expansion:
         """Perform element-wise XOR operation between two matrices or lists.
     
         Parameters:
-            M1 (list or np.array): The first matrix or list for XOR.
-            M2 (list or np.array): The second matrix or list for XOR.
+            M1 (list or np.array): The first matrix or list of byte values for XOR.
+            M2 (list or np.array): The second matrix or list of byte values for XOR.
             mode (str): Specifies the type of XOR operation ('Rcon', 'flat', 'matrix').
             
         Returns:
-            list: A list of results from the XOR operation.
+            list or np.ndarray: The XORed bytes as integers; a flat uint8 array in 'matrix' mode.
         """
         result = [] 
-        if mode =='Rcon':            
+        if mode =='Rcon' or mode == 'flat':            
             for i in range(4):  
-                val1 = M1[i]
-                val2 = int(M2[i],16)          
-                result.append(hex(val1 ^ val2).upper())   
-        elif mode == 'flat':  
-            for i in range(4):  
-                val1 = int(M1[i],16)
-                val2 = int(M2[i],16)          
-                result.append(hex(val1 ^ val2).upper())          
+                result.append(int(M1[i]) ^ int(M2[i]))   
         elif mode == 'matrix':                            
-            for row in range(len(M1)):            
-                for col in range(len(M2)):
-                    val1 = int(M1[row][col],16)                    
-                    val2 = int(M2[row][col],16)                       
-                    result.append(hex(val1 ^ val2).upper())            
+            import numpy as np
+            result = np.bitwise_xor(np.asarray(M1, dtype=np.uint8), np.asarray(M2, dtype=np.uint8)).flatten()
         else:
             raise ValueError("Invalid mode. Expected 'Rcon', 'flat', or 'Matrix'.")
-        return result
\ No newline at end of file
+        return result
+
+
+def _round_key_array(keys):
+    import numpy as np
+    words = b''.join(word.to_bytes(4, 'big') for word in keys.round_key_words)
+    # Word c of a round key is column c of its state
+    round_keys = np.frombuffer(words, dtype=np.uint8).reshape(keys.rounds + 1, 4, 4).transpose(0, 2, 1).copy()
+    round_keys.flags.writeable = False
+    return round_keys
+
+
+class Expanded_Key:
+    def __init__(self, key, AESMODE=128):
+        """
+        The complete key schedule for one key, computed once and shared by every block of a message. The schedule
+        is expanded in plain Python, so keys only used by the pure-Python path never load NumPy.
+        
+        Parameters:
+            key (bytes or bytearray): The AES key, 16, 24 or 32 bytes long depending on AESMODE.
+            AESMODE (int): The key size in bits (128, 192, or 256).
+        
+        Attributes:
+            key (bytes): The key the schedule was expanded from.
+            AESMODE (int): The key size in bits.
+            rounds (int): The number of AES rounds (10, 12 or 14).
+            round_keys (np.ndarray): A read-only uint8 array of shape (rounds + 1, 4, 4) holding each round key 
+                                    in state layout, built from the words on first use.
+            round_key_words (tuple): The key schedule as 4 * (rounds + 1) big-endian 32-bit words, one per column.
+        
+        Raises:
+            ValueError: If the key length does not match AESMODE.
+        """
+        self.key = bytes(key)
+        self.AESMODE = AESMODE
+        self.rounds = {128: 10, 192: 12, 256: 14}[AESMODE]
+        if len(self.key) != AESMODE // 8:
+            raise ValueError(f"AES-{AESMODE} needs a {AESMODE // 8} byte key, got {len(self.key)} bytes")
+        self.round_key_words = Key_Expansion(self.rounds).key_expansion_words(self.key)
+        self._derived = {}
+    
+    @property
+    def round_keys(self):
+        return self.derived('round_keys', _round_key_array)
+    
+    def derived(self, name, factory):
+        """
+        Return data derived from this key schedule, such as engine specific round key tables.
+        
+        The value is computed with `factory(self)` the first time `name` is requested and cached on the 
+        key schedule afterwards, so it lives exactly as long as the expanded key does.
+        
+        Parameters:
+            name (str): The name the derived data is cached under.
+            factory (callable): Called with this Expanded_Key to compute the data.
+        
+        Returns:
+            The cached value.
+        """
+        value = self._derived.get(name)
+        if value is None:
+            # Threads racing on the first request may both compute the value, but all of them get the one stored
+            value = self._derived.setdefault(name, factory(self))
+        return value
+    
+    def __getitem__(self, round):
+        return self.round_keys[round]
+    
+    def __len__(self):
+        return self.rounds + 1
+
+
+def expand_keys(keys, AESMODE=128):
+    """
+    Expand many keys of one size together, see `Key_Expansion.key_expansion_many`.
+    
+    Parameters:
+        keys (sequence of bytes-like): The AES keys, each AESMODE/8 bytes long.
+        AESMODE (int): The key size in bits (128, 192, or 256).
+    
+    Returns:
+        np.ndarray: A read-only uint8 array of shape (len(keys), rounds + 1, 4, 4).
+    
+    Raises:
+        ValueError: If a key length does not match AESMODE.
+    """
+    rounds = {128: 10, 192: 12, 256: 14}[AESMODE]
+    keys = [bytes(key) for key in keys]
+    for key in keys:
+        if len(key) != AESMODE // 8:
+            raise ValueError(f"AES-{AESMODE} needs a {AESMODE // 8} byte key, got {len(key)} bytes")
+    import numpy as np
+    raw = np.frombuffer(b''.join(keys), dtype=np.uint8).reshape(len(keys), AESMODE // 8)
+    schedules = Key_Expansion(rounds).key_expansion_many(raw)
+    schedules.flags.writeable = False
+    return schedules
+
+
+class Key_Cache:
+    def __init__(self, maxsize=128):
+        """
+        Least recently used cache of Expanded_Key objects, keyed by (key, AESMODE).
+        
+        The cache is safe to share between threads. A lock guards the bookkeeping only, so keys are expanded
+        outside of it, and threads that miss on the same key at once end up with the same Expanded_Key.
+        
+        Parameters:
+            maxsize (int, optional): The number of key schedules to keep. 0 disables caching.
+        
+        Attributes:
+            hits (int): Number of lookups answered from the cache.
+            misses (int): Number of lookups that had to expand the key.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, AESMODE):
+        """
+        Return the expanded key schedule for `key`, expanding it on a miss.
+        
+        Parameters:
+            key (bytes or bytearray): The AES key.
+            AESMODE (int): The key size in bits (128, 192, or 256).
+        
+        Returns:
+            Expanded_Key: The cached or freshly computed key schedule.
+        """
+        cache_key = (bytes(key), AESMODE)
+        with self._lock:
+            expanded = self._entries.get(cache_key)
+            if expanded is not None:
+                self.hits += 1
+                self._entries.move_to_end(cache_key)
+                return expanded
+            self.misses += 1
+        expanded = Expanded_Key(cache_key[0], AESMODE)
+        if self.maxsize > 0:
+            with self._lock:
+                expanded = self._entries.setdefault(cache_key, expanded)
+                self._entries.move_to_end(cache_key)
+                self._evict()
+        return expanded
+    
+    def resize(self, maxsize):
+        """Change the number of key schedules kept, evicting the least recently used ones if needed."""
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+    
+    def clear(self):
+        """Drop every cached key schedule and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def info(self):
+        """Return the cache statistics as a dict with hits, misses, maxsize and currsize."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "maxsize": self.maxsize, "currsize": len(self._entries)}
+    
+    def _evict(self):
+        while len(self._entries) > max(self.maxsize, 0):
+            self._entries.popitem(last=False)
+
+
+# Process wide cache shared by every Encryption and Decryption instance unless one is passed in
+key_cache = Key_Cache()
@@ -0,0 +1,405 @@
+from AES.AES_File import SEGMENT_SIZE
+import sys
+
+# NumPy is imported by the functions that need it. Short inputs are XORed and counted with Python integers, so a
+# mode running on the pure-Python engine of `AES_Pure` never loads it.
+
+# Buffers up to this many bytes are XORed as integers, which for a few blocks is faster than through NumPy
+XOR_INLINE = 256
+
+def _as_bytes(data):
+    """View any contiguous bytes-like object as a flat uint8 array without copying."""
+    import numpy as np
+    return np.frombuffer(data, dtype=np.uint8)
+
+def as_array(buffer, writable=False):
+    """
+    View a contiguous buffer, such as bytes, a bytearray, a memoryview or a NumPy array of any dtype, as a flat
+    uint8 array without copying.
+
+    Raises:
+        ValueError: If the buffer is not contiguous, or `writable` is set and the buffer is read-only.
+    """
+    import numpy as np
+    if isinstance(buffer, np.ndarray):
+        if not buffer.flags.c_contiguous:
+            raise ValueError("Buffers must be C-contiguous")
+        array = buffer.reshape(-1).view(np.uint8)
+    else:
+        array = np.frombuffer(buffer, dtype=np.uint8)
+    if writable and not array.flags.writeable:
+        raise ValueError("The output buffer is read-only")
+    return array
+
+_steps = None
+
+def _arange(count):
+    """A read-only 0, 1, ..., count - 1 uint64 array, allocated once and reused by later calls."""
+    import numpy as np
+    global _steps
+    if _steps is None or len(_steps) < count:
+        steps = np.arange(count, dtype=np.uint64)
+        steps.flags.writeable = False
+        _steps = steps
+    return _steps[:count]
+
+def _xor(a, b):
+    """XOR two equally long byte strings."""
+    return (int.from_bytes(a, 'big') ^ int.from_bytes(b, 'big')).to_bytes(len(a), 'big')
+
+def _xor_buffers(a, b):
+    """XOR two equally long bytes-like objects, as integers up to `XOR_INLINE` bytes and through NumPy beyond."""
+    if len(a) <= XOR_INLINE:
+        return _xor(a, b)
+    return (_as_bytes(a) ^ _as_bytes(b)).tobytes()
+
+class Cipher_Mode:
+    """
+    Base class of the cipher modes.
+
+    A mode object is created per message or stream. Chained modes remember their feedback block between calls,
+    so a message may be passed in several pieces, every piece but the last a multiple of 16 bytes long.
+
+    Attributes:
+        padding (bool): Whether the plaintext is PKCS#7 padded to whole blocks.
+        seekable (bool): Whether `encrypt`/`decrypt` can start at any byte offset.
+        chained (bool): Whether decrypting a block needs only the previous ciphertext block, so a ciphertext can be
+                        split anywhere on a block boundary with the preceding block as the IV of the next piece.
+        parallel_encrypt (bool): Whether encryption can be split across workers.
+        parallel_decrypt (bool): Whether decryption can be split across workers.
+        tag_size (int): The length of the authentication tag of authenticated modes, 0 for the others.
+    """
+    padding = False
+    seekable = False
+    chained = False
+    parallel_encrypt = False
+    parallel_decrypt = False
+    tag_size = 0
+
+    def __init__(self, encryption, decryption, keys, iv):
+        """
+        Parameters:
+            encryption: An object with `encrypt_blocks(data, keys)`, such as a registered backend's encryption.
+            decryption: An object with `decrypt_blocks(data, keys)`.
+            keys (Expanded_Key): The expanded key schedule.
+            iv (bytes): The 16-byte IV.
+
+        Raises:
+            ValueError: If the IV is not 16 bytes long.
+        """
+        if iv is None or len(iv) != 16:
+            raise ValueError(f"{self.name} mode needs a 16-byte iv")
+        self.engine = encryption
+        self.decryption = decryption
+        self.keys = keys
+        self.iv = bytes(iv)
+        self.register = self.iv  # the feedback block for the next call
+
+    def authenticate_additional_data(self, data):
+        raise ValueError(f"{self.name} mode does not authenticate additional data")
+
+    def encrypt_into(self, src, dst, offset=0):
+        raise ValueError(f"{self.name} mode cannot write into a caller-provided buffer")
+
+    def decrypt_into(self, src, dst, offset=0):
+        raise ValueError(f"{self.name} mode cannot write into a caller-provided buffer")
+
+    def _into(self, src, dst):
+        src, dst = as_array(src), as_array(dst, writable=True)
+        if len(dst) < len(src):
+            raise ValueError(f"The output buffer holds {len(dst)} bytes, the input has {len(src)}")
+        return src, dst[:len(src)]
+
+    def _blocks(self, data):
+        data = memoryview(data).cast('B')
+        if len(data) % 16:
+            raise ValueError(f"{self.name} data must be a multiple of 16 bytes long")
+        return data
+
+
+class ECB_Mode(Cipher_Mode):
+    """Electronic codebook: every block is encrypted on its own. Kept for interoperability; it leaks repeated blocks."""
+    name = "ECB"
+    padding = True
+    parallel_encrypt = True
+    parallel_decrypt = True
+
+    def __init__(self, encryption, decryption, keys, iv=None):
+        self.engine = encryption
+        self.decryption = decryption
+        self.keys = keys
+        self.iv = None
+
+    def encrypt(self, data, offset=0):
+        return self.engine.encrypt_blocks(self._blocks(data), self.keys)
+
+    def decrypt(self, data, offset=0):
+        return self.decryption.decrypt_blocks(self._blocks(data), self.keys)
+
+    def encrypt_into(self, src, dst, offset=0):
+        """
+        Encrypt whole blocks from `src` into `dst`, which may be `src` itself, without padding. The engine must
+        provide `encrypt_blocks_into`.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        src, dst = self._into(src, dst)
+        self._blocks(src)
+        self.engine.encrypt_blocks_into(src, dst, self.keys)
+        return len(src)
+
+    def decrypt_into(self, src, dst, offset=0):
+        """Decrypt whole blocks from `src` into `dst`, the counterpart of `encrypt_into`."""
+        src, dst = self._into(src, dst)
+        self._blocks(src)
+        self.decryption.decrypt_blocks_into(src, dst, self.keys)
+        return len(src)
+
+
+class CBC_Mode(Cipher_Mode):
+    """
+    Cipher block chaining: C[i] = E(P[i] ^ C[i-1]) with C[-1] = IV.
+
+    Encryption is inherently sequential and runs one block per engine call, which is fastest on the "ttable"
+    backend. Decryption, P[i] = D(C[i]) ^ C[i-1], only depends on the ciphertext, so all blocks go through the
+    engine in one batched call.
+    """
+    name = "CBC"
+    padding = True
+    chained = True
+    parallel_decrypt = True
+
+    def encrypt(self, data, offset=0):
+        data = self._blocks(data)
+        out = bytearray(len(data))
+        previous = self.register
+        for i in range(0, len(data), 16):
+            previous = self.engine.encrypt_blocks(_xor(data[i:i + 16], previous), self.keys)
+            out[i:i + 16] = previous
+        self.register = previous
+        return bytes(out)
+
+    def decrypt(self, data, offset=0):
+        data = self._blocks(data)
+        if not data:
+            return b''
+        plain = self.decryption.decrypt_blocks(data, self.keys)
+        feedback = self.register + data[:-16].tobytes()
+        self.register = data[-16:].tobytes()
+        return _xor_buffers(plain, feedback)
+
+
+class CFB_Mode(Cipher_Mode):
+    """
+    Full-block cipher feedback (CFB128): C[i] = P[i] ^ E(C[i-1]) with C[-1] = IV.
+
+    Encryption is sequential. Decryption knows every C[i-1] up front, so the keystream for the whole input is one
+    batched engine call. The last block may be partial.
+    """
+    name = "CFB"
+    chained = True
+    parallel_decrypt = True
+
+    def encrypt(self, data, offset=0):
+        data = memoryview(data).cast('B')
+        out = bytearray(len(data))
+        previous = self.register
+        for i in range(0, len(data), 16):
+            block = data[i:i + 16]
+            stream = self.engine.encrypt_blocks(previous, self.keys)
+            out[i:i + len(block)] = _xor(block, stream[:len(block)])
+            previous = bytes(out[i:i + 16])
+        self.register = previous
+        return bytes(out)
+
+    def decrypt(self, data, offset=0):
+        data = memoryview(data).cast('B')
+        if not data:
+            return b''
+        whole = (len(data) - 1) // 16 * 16  # every block but the last feeds the next keystream block
+        stream = self.engine.encrypt_blocks(self.register + data[:whole].tobytes(), self.keys)
+        self.register = data[-16:].tobytes()
+        return _xor_buffers(data, memoryview(stream)[:len(data)])
+
+
+class OFB_Mode(Cipher_Mode):
+    """
+    Output feedback: the keystream is O[i] = E(O[i-1]) with O[-1] = IV, independent of the data, and encryption
+    and decryption are the same XOR. Generating the keystream is sequential. The last block may be partial.
+    """
+    name = "OFB"
+
+    def encrypt(self, data, offset=0):
+        data = memoryview(data).cast('B')
+        if not data:
+            return b''
+        stream = bytearray()
+        previous = self.register
+        for _ in range(-(-len(data) // 16)):
+            previous = self.engine.encrypt_blocks(previous, self.keys)
+            stream += previous
+        self.register = previous
+        return _xor_buffers(data, memoryview(stream)[:len(data)])
+
+    decrypt = encrypt
+
+
+class CTR_Mode(Cipher_Mode):
+    name = "CTR"
+    seekable = True
+    parallel_encrypt = True
+    parallel_decrypt = True
+
+    def __init__(self, encryption, decryption, keys, iv):
+        """
+        Counter mode on top of any block engine.
+
+        The keystream block for block index i is E(iv + i), where the 16-byte counter block is incremented as a
+        128-bit big-endian integer. Every keystream block can be computed on its own, so the mode can start at any
+        byte offset and decrypt an arbitrary range of a ciphertext without touching the bytes before it. No padding
+        is needed: the output has the length of the input.
+
+        Parameters:
+            encryption: An object with `encrypt_blocks(data, keys)`, such as a registered backend's encryption.
+            decryption: The backend's decryption. CTR only ever runs the cipher forwards, so it is not used.
+            keys (Expanded_Key): The expanded key schedule.
+            iv (bytes): The nonce, 1 to 16 bytes. Shorter nonces are followed by a zero counter, so a 12-byte nonce
+                        leaves a 32-bit block counter.
+
+        Raises:
+            ValueError: If the nonce is empty or longer than 16 bytes.
+        """
+        iv = bytes(iv or b'')
+        if not 0 < len(iv) <= 16:
+            raise ValueError("CTR mode needs a nonce of 1 to 16 bytes")
+        self.engine = encryption
+        self.decryption = decryption
+        self.keys = keys
+        self.iv = iv
+        self.initial_counter = int.from_bytes(iv.ljust(16, b'\x00'), 'big')
+
+    def counter_blocks(self, first_block, count):
+        """
+        Build `count` consecutive counter blocks starting at block index `first_block`.
+
+        Returns:
+            bytes: The counter blocks, 16 bytes each.
+        """
+        start = (self.initial_counter + first_block) % (1 << 128)
+        if 16 * count <= XOR_INLINE:
+            return b''.join(((start + i) % (1 << 128)).to_bytes(16, 'big') for i in range(count))
+        import numpy as np
+        high, low = start >> 64, start & 0xFFFFFFFFFFFFFFFF
+        counters = np.empty((count, 2), dtype='>u8')
+        low_words = np.uint64(low) + np.arange(count, dtype=np.uint64)  # wraps modulo 2^64
+        counters[:, 1] = low_words
+        counters[:, 0] = np.uint64(high) + (low_words < np.uint64(low)).astype(np.uint64)  # carry on wrap
+        return counters.tobytes()
+
+    def keystream(self, offset, length):
+        """
+        Produce `length` bytes of keystream starting at byte `offset`.
+
+        Returns:
+            bytes: The keystream.
+        """
+        first_block, skip = divmod(offset, 16)
+        blocks = -(-(skip + length) // 16)
+        stream = self.engine.encrypt_blocks(self.counter_blocks(first_block, blocks), self.keys)
+        return stream[skip:skip + length]
+
+    def encrypt(self, data, offset=0):
+        """
+        XOR `data` with the keystream starting at byte `offset`. Encryption and decryption are the same operation.
+
+        Parameters:
+            data (bytes-like): The plaintext or ciphertext.
+            offset (int, optional): The byte position of `data` within the whole message.
+
+        Returns:
+            bytes: The transformed data.
+        """
+        data = memoryview(data).cast('B')
+        if len(data) <= XOR_INLINE:
+            return _xor(data, self.keystream(offset, len(data)))
+        import numpy as np
+        data = _as_bytes(data)
+        out = np.empty(len(data), dtype=np.uint8)
+        for start in range(0, len(data), SEGMENT_SIZE):
+            stop = min(start + SEGMENT_SIZE, len(data))
+            stream = np.frombuffer(self.keystream(offset + start, stop - start), dtype=np.uint8)
+            np.bitwise_xor(data[start:stop], stream, out=out[start:stop])
+        return out.tobytes()
+
+    def encrypt_into(self, src, dst, offset=0):
+        """
+        XOR `src` with the keystream starting at byte `offset` into `dst`, which may be `src` itself.
+
+        The counter and keystream blocks are built in the engine's scratch buffers, one engine slice at a time, so
+        once those buffers have grown to a slice the call allocates nothing in proportion to the data. The engine
+        must provide `encrypt_blocks_into` and `scratch`.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        import numpy as np
+        src, dst = self._into(src, dst)
+        step = 16 * self.engine.chunk_blocks
+        first_block, skip = divmod(offset, 16)
+        position = 0
+        while position < len(src):
+            count = min(step - skip, len(src) - position)
+            blocks = -(-(skip + count) // 16)
+            counters = self.engine.scratch('ctr_counters', (blocks, 2), np.uint64)
+            self._fill_counters(counters, first_block)
+            stream = self.engine.scratch('ctr_stream', (16 * blocks,))
+            self.engine.encrypt_blocks_into(counters.view(np.uint8).reshape(-1), stream, self.keys)
+            np.bitwise_xor(src[position:position + count], stream[skip:skip + count],
+                           out=dst[position:position + count])
+            position += count
+            first_block += blocks
+            skip = 0
+        return len(src)
+
+    def _fill_counters(self, counters, first_block):
+        """`counter_blocks` written into an (N, 2) uint64 buffer instead of a new array."""
+        import numpy as np
+        start = (self.initial_counter + first_block) % (1 << 128)
+        high, low = np.uint64(start >> 64), np.uint64(start & 0xFFFFFFFFFFFFFFFF)
+        np.add(_arange(len(counters)), low, out=counters[:, 1])  # wraps modulo 2^64
+        np.less(counters[:, 1], low, out=counters[:, 0], casting='unsafe')  # carry on wrap
+        np.add(counters[:, 0], high, out=counters[:, 0])
+        if sys.byteorder == 'little':
+            counters.byteswap(inplace=True)  # counter blocks are big-endian
+
+    decrypt = encrypt
+    decrypt_into = encrypt_into
+
+
+# Cipher modes available through AES.encrypt/AES.decrypt
+MODES = {
+    "ECB": ECB_Mode,
+    "CBC": CBC_Mode,
+    "CFB": CFB_Mode,
+    "OFB": OFB_Mode,
+    "CTR": CTR_Mode,
+}
+
+def new_mode(mode, encryption, decryption, keys, iv):
+    """
+    Create a cipher mode object.
+
+    Parameters:
+        mode (str): The mode name, see `MODES`.
+        encryption: The block engine providing `encrypt_blocks`.
+        decryption: The block engine providing `decrypt_blocks`.
+        keys (Expanded_Key): The expanded key schedule.
+        iv (bytes): The IV or nonce.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown cipher mode {mode!r}. Expected one of {', '.join(MODES)}.")
+    return MODES[mode](encryption, decryption, keys, iv)
@@ -0,0 +1,118 @@
+from AES.Key_Expansion import expand_keys
+from AES.basic_functions import basic_functions
+import numpy as np
+
+# Cipher modes whose blocks are independent, so messages under different keys can share one engine pass
+MULTI_KEY_MODES = ("ECB", "CTR")
+# Batches with at most this many distinct keys take their schedules from the key cache. Larger batches expand all
+# their keys together without touching the cache, so a flood of one-off keys does not evict the cached ones.
+CACHED_KEYS = 8
+
+class Multi_Key_Batch:
+    def __init__(self, engine, AESMODE=128, key_cache=None):
+        """
+        Encrypt many short messages, each under its own key, in a single engine pass.
+
+        The distinct keys are expanded together into one (K, rounds + 1, 4, 4) array, every block of every message
+        is tagged with the position of its key, and all blocks go through the engine's multi-key round function at
+        once. The Python work per call is a handful of vector steps plus one slice per message, instead of a full
+        key lookup, mode setup and engine call per message.
+
+        Parameters:
+            engine: An object with `encrypt_blocks_multi` and `decrypt_blocks_multi`, such as a `Batch_Engine`.
+            AESMODE (int): The key size in bits (128, 192, or 256).
+            key_cache (Key_Cache, optional): Cache of expanded key schedules for batches with few distinct keys.
+        """
+        self.engine = engine
+        self.AESMODE = AESMODE
+        self.key_cache = key_cache
+        self.functions = basic_functions()
+
+    def encrypt(self, keys, messages, mode="CTR", ivs=None):
+        """
+        Encrypt every message under its own key.
+
+        Parameters:
+            keys (sequence of bytes): The raw key of every message. Repeated keys are expanded once.
+            messages (sequence of bytes): The plaintexts.
+            mode (str, optional): "CTR", or "ECB" with PKCS#7 padding.
+            ivs (sequence of bytes, optional): For CTR, the nonce of every message, 1 to 16 bytes each.
+
+        Returns:
+            list: The ciphertext of every message, as bytes.
+
+        Raises:
+            ValueError: If the mode is not supported, or the keys, nonces and messages do not match up.
+        """
+        if mode == "ECB":
+            return self._ecb(keys, [self.functions.pkcs7_pad(message) for message in messages], True)
+        return self._ctr(keys, messages, mode, ivs)
+
+    def decrypt(self, keys, messages, mode="CTR", ivs=None):
+        """
+        Decrypt every message under its own key, the counterpart of `encrypt`.
+
+        Returns:
+            list: The plaintext of every message, as bytes.
+
+        Raises:
+            ValueError: As `encrypt`, or if an ECB ciphertext is not block aligned or its padding is invalid.
+        """
+        if mode == "ECB":
+            for message in messages:
+                if not len(message) or len(message) % 16:
+                    raise ValueError("ECB ciphertext must be a non-empty multiple of 16 bytes long")
+            return [self.functions.pkcs7_unpad(plain) for plain in self._ecb(keys, messages, False)]
+        return self._ctr(keys, messages, mode, ivs)
+
+    def _schedules(self, keys, messages):
+        if len(keys) != len(messages):
+            raise ValueError(f"Got {len(keys)} keys for {len(messages)} messages")
+        unique = {}
+        positions = np.fromiter((unique.setdefault(bytes(key), len(unique)) for key in keys), dtype=np.intp,
+                                count=len(keys))
+        if self.key_cache is not None and 0 < len(unique) <= CACHED_KEYS:
+            schedules = np.stack([self.key_cache.get(key, self.AESMODE).round_keys for key in unique])
+        else:
+            schedules = expand_keys(list(unique), self.AESMODE)
+        return schedules, positions
+
+    def _split(self, data, lengths, starts):
+        return [data[start:start + length] for start, length in zip(starts.tolist(), lengths)]
+
+    def _ecb(self, keys, messages, encrypt):
+        schedules, positions = self._schedules(keys, messages)
+        lengths = [len(message) for message in messages]
+        index = np.repeat(positions, np.array(lengths, dtype=np.intp) // 16)
+        data = b''.join(messages)
+        run = self.engine.encrypt_blocks_multi if encrypt else self.engine.decrypt_blocks_multi
+        out = run(data, schedules, index) if data else b''
+        return self._split(out, lengths, np.cumsum([0] + lengths[:-1]))
+
+    def _ctr(self, keys, messages, mode, ivs):
+        if mode != "CTR":
+            raise ValueError(f"Multi-key batches support {', '.join(MULTI_KEY_MODES)}, not {mode!r}")
+        if ivs is None or len(ivs) != len(messages):
+            raise ValueError("CTR mode needs one nonce per message")
+        ivs = [b'' if iv is None else bytes(iv) for iv in ivs]
+        if any(not 0 < len(iv) <= 16 for iv in ivs):
+            raise ValueError("CTR mode needs a nonce of 1 to 16 bytes")
+        schedules, positions = self._schedules(keys, messages)
+        lengths = [len(message) for message in messages]
+        counts = -(-np.array(lengths, dtype=np.intp) // 16)
+        starts = np.cumsum(counts) - counts
+        # Counter block j of message m is nonce_m + j as a 128-bit big-endian integer, as in `CTR_Mode`
+        initial = np.frombuffer(b''.join(iv.ljust(16, b'\x00') for iv in ivs), dtype='>u8').reshape(-1, 2)
+        owner = np.repeat(np.arange(len(messages)), counts)
+        low = initial[owner, 1].astype(np.uint64)
+        low_words = low + (np.arange(len(owner)) - starts[owner]).astype(np.uint64)  # wraps modulo 2^64
+        counters = np.empty((len(owner), 2), dtype='>u8')
+        counters[:, 1] = low_words
+        counters[:, 0] = initial[owner, 0] + (low_words < low).astype(np.uint64)  # carry on wrap
+        if not len(owner):
+            return [b''] * len(messages)
+        stream = np.frombuffer(self.engine.encrypt_blocks_multi(counters.tobytes(), schedules, positions[owner]),
+                               dtype=np.uint8)
+        data = np.frombuffer(b''.join(bytes(message).ljust(16 * count, b'\x00')
+                                      for message, count in zip(messages, counts.tolist())), dtype=np.uint8)
+        return self._split((data ^ stream).tobytes(), lengths, 16 * starts)
@@ -0,0 +1,220 @@
+from AES.Backends import get_backend, select_backend
+from AES.Key_Expansion import Key_Cache
+from AES.Key_Derivation import get_kdf, resolve_key
+from AES.Modes import MODES, SEGMENT_SIZE, new_mode
+from AES.CipherText import CipherText
+import AES.GCM  # registers GCM in MODES
+from AES.basic_functions import basic_functions
+from multiprocessing import Pool, resource_tracker, shared_memory
+import os
+import threading
+
+# Per-process state of a pool worker, filled in once by `_init_worker`
+_worker = {}
+
+def _init_worker(engine, AESMODE):
+    """
+    Pool initializer: build the engine once per worker process, with a private key cache so every key schedule is
+    expanded once per worker and then reused for every chunk it is handed.
+    """
+    key_cache = Key_Cache()
+    aesE, aesD = get_backend(engine, AESMODE).create(AESMODE, key_cache)
+    _worker.update(AESMODE=AESMODE, key_cache=key_cache, aesE=aesE, aesD=aesD)
+
+def _attach(name):
+    """
+    Open a shared buffer owned by the scheduler. Only the owner may unlink it, so the worker must not register it
+    with the resource tracker, which would otherwise try to clean it up a second time.
+
+    Before Python 3.13 opening a buffer always registers it, and undoing that with `unregister` is not safe: a
+    worker forked after the scheduler's tracker started shares that tracker, so the worker would remove the
+    scheduler's own registration. The registration is skipped instead. A pool worker runs one task at a time, so
+    nothing else registers a resource meanwhile.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 always tracks
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+def _run_chunk(task):
+    """Transform bytes [start, stop) of the shared input buffer into the same range of the shared output buffer."""
+    operation, mode, source, target, start, stop, key, iv, offset = task
+    keys = _worker['key_cache'].get(key, _worker['AESMODE'])
+    shm_in = _attach(source)
+    shm_out = _attach(target)
+    data = shm_in.buf[start:stop]
+    try:
+        if start and MODES[mode].chained:
+            iv = bytes(shm_in.buf[start - 16:start])  # chained decryption only needs the previous ciphertext block
+        cipher = new_mode(mode, _worker['aesE'], _worker['aesD'], keys, iv)
+        transform = cipher.encrypt if operation == 'encrypt' else cipher.decrypt
+        shm_out.buf[start:stop] = transform(data, offset + start)
+    finally:
+        data.release()
+        shm_in.close()
+        shm_out.close()
+    return stop - start
+
+class Parallel_Scheduler:
+    def __init__(self, AESMODE=128, engine="batch", processes=None, chunk_size=SEGMENT_SIZE, min_parallel=None,
+                 kdf="sha256", salt=b'', derived_key_cache=None):
+        """
+        Run the parallelizable cipher operations on a pool of worker processes.
+
+        Large buffers are copied once into shared memory, split into chunks of `chunk_size` bytes and handed to the
+        workers by name, so neither the input nor the output is pickled. Each worker writes its chunk straight into
+        a shared output buffer. The result is byte-identical to the single process engines. A scheduler may be
+        shared by several threads, whose tasks then interleave on the same pool.
+
+        Parameters:
+            AESMODE (int): The key size in bits (128, 192, or 256).
+            engine (str, optional): The backend name the workers run, or "auto" to benchmark for `chunk_size`.
+            processes (int, optional): The number of worker processes. Defaults to the number of CPUs.
+            chunk_size (int, optional): Bytes per task, a multiple of 16.
+            min_parallel (int, optional): Inputs smaller than this run in the calling process. Defaults to two
+                                          chunks, below which the pool cannot beat a single engine call.
+            kdf (str or object, optional): The key derivation function for passwords, see `Key_Derivation.get_kdf`.
+            salt (bytes, optional): The salt for password derivation.
+            derived_key_cache (Derived_Key_Cache, optional): Cache of derived keys. Defaults to the process wide
+                                                             cache. Workers only ever receive the derived key.
+
+        Raises:
+            ValueError: If `chunk_size` is not a positive multiple of 16.
+        """
+        if chunk_size <= 0 or chunk_size % 16:
+            raise ValueError("chunk_size must be a positive multiple of 16")
+        self.AESMODE = AESMODE
+        self.engine = select_backend(AESMODE, chunk_size, direction="both") if engine == "auto" else engine
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.min_parallel = 2 * chunk_size if min_parallel is None else min_parallel
+        self.functions = basic_functions()
+        self.kdf = get_kdf(kdf)
+        self.salt = bytes(salt)
+        self.derived_key_cache = derived_key_cache
+        self.key_cache = Key_Cache()
+        self.aesE, self.aesD = get_backend(self.engine, AESMODE).create(AESMODE, self.key_cache)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def encrypt(self, data, key, mode="CTR", iv=None, offset=0):
+        """
+        Encrypt data with a cipher mode, the same way as `AES.encrypt`.
+
+        ECB and CTR are split across the workers. CBC, CFB and OFB encryption is sequential and runs in the
+        calling process, and so does GCM, whose tag is a chain over every ciphertext block.
+
+        Parameters:
+            data (bytes-like): The plaintext.
+            key (str or bytes-like): The password, or a raw key of AESMODE/8 bytes.
+            mode (str, optional): The cipher mode, see `Modes.MODES`.
+            iv (bytes): The 16-byte IV, or for CTR the nonce. ECB takes none.
+            offset (int, optional): For CTR, the byte position of `data` within the whole message.
+
+        Returns:
+            bytes: The ciphertext.
+        """
+        if MODES.get(mode) is not None and MODES[mode].padding:
+            data = self.functions.pkcs7_pad(data)
+        return self._schedule('encrypt', mode, data, key, iv, offset)
+
+    def decrypt(self, data, key, mode="CTR", iv=None, offset=0):
+        """
+        Decrypt data with a cipher mode, the same way as `AES.decrypt`.
+
+        ECB, CTR, CBC and CFB are split across the workers; a CBC or CFB chunk takes the last ciphertext block of
+        the chunk before it as its IV. OFB and GCM decryption run in the calling process.
+
+        Returns:
+            bytes: The plaintext, with any padding removed.
+        """
+        out = self._schedule('decrypt', mode, data, key, iv, offset)
+        return self.functions.pkcs7_unpad(out) if MODES[mode].padding else out
+
+    def encrypt_blocks(self, data, key):
+        """
+        Encrypt whole 16-byte blocks independently, without padding.
+
+        Parameters:
+            data (bytes-like): The blocks to encrypt, a multiple of 16 bytes long.
+            key (str or bytes-like): The password, or a raw key of AESMODE/8 bytes.
+
+        Returns:
+            bytes: The encrypted blocks.
+        """
+        return self._schedule('encrypt', 'ECB', data, key)
+
+    def decrypt_blocks(self, data, key):
+        """
+        Decrypt whole 16-byte blocks independently, without padding.
+
+        Returns:
+            bytes: The decrypted blocks.
+        """
+        return self._schedule('decrypt', 'ECB', data, key)
+
+    def ctr(self, data, key, iv, offset=0):
+        """
+        Encrypt or decrypt with CTR mode. Every chunk computes its own keystream from its byte offset.
+
+        Parameters:
+            data (bytes-like): The plaintext or ciphertext.
+            key (str or bytes-like): The password, or a raw key of AESMODE/8 bytes.
+            iv (bytes): The nonce.
+            offset (int, optional): The byte position of `data` within the whole message.
+
+        Returns:
+            bytes: The transformed data.
+        """
+        return self._schedule('encrypt', 'CTR', data, key, iv, offset)
+
+    def close(self):
+        """Shut down the worker processes."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _schedule(self, operation, mode, data, key, iv=None, offset=0):
+        data = memoryview(data.data if isinstance(data, CipherText) else data).cast('B')
+        iv = None if iv is None else bytes(iv)
+        key = resolve_key(key, self.AESMODE, self.kdf, self.salt, self.derived_key_cache)
+        cipher = new_mode(mode, self.aesE, self.aesD, self.key_cache.get(key, self.AESMODE), iv)
+        parallel = cipher.parallel_encrypt if operation == 'encrypt' else cipher.parallel_decrypt
+        if offset and not cipher.seekable:
+            raise ValueError(f"{mode} mode cannot start at an offset")
+        if cipher.tag_size:
+            return cipher.seal(data) if operation == 'encrypt' else cipher.open(data)
+        if not parallel or len(data) < self.min_parallel or self.processes == 1:
+            return (cipher.encrypt if operation == 'encrypt' else cipher.decrypt)(data, offset)
+        if len(data) % 16 and cipher.padding:
+            raise ValueError(f"{mode} data must be a multiple of 16 bytes long")
+        with self._lock:
+            if self._pool is None:
+                self._pool = Pool(self.processes, initializer=_init_worker, initargs=(self.engine, self.AESMODE))
+            pool = self._pool
+        shm_in = shared_memory.SharedMemory(create=True, size=len(data))
+        shm_out = shared_memory.SharedMemory(create=True, size=len(data))
+        try:
+            shm_in.buf[:len(data)] = data
+            tasks = [(operation, mode, shm_in.name, shm_out.name, start, min(start + self.chunk_size, len(data)),
+                      key, iv, offset) for start in range(0, len(data), self.chunk_size)]
+            for _ in pool.imap_unordered(_run_chunk, tasks):
+                pass
+            return bytes(shm_out.buf[:len(data)])
+        finally:
+            for shm in (shm_in, shm_out):
+                shm.close()
+                shm.unlink()
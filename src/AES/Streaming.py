@@ -0,0 +1,140 @@
+from AES.basic_functions import basic_functions
+
+class Stream_Cipher:
+    def __init__(self, mode):
+        """
+        Incremental, hashlib style cipher: feed chunks of any size to `update` and call `finalize` once at the end.
+
+        Input is passed to the mode in whole 16-byte blocks. A partial block at the end of a chunk is carried over to
+        the next call, so the memory used does not depend on the length of the stream, and chunks of any size give
+        the same output as one call with the whole message. For padded modes `finalize` adds or removes the
+        PKCS#7 padding, and for authenticated modes it appends or checks the tag.
+
+        Parameters:
+            mode: A cipher mode object from `Modes.new_mode`.
+
+        Attributes:
+            mode: The cipher mode.
+            position (int): The number of input bytes passed to the mode so far.
+        """
+        self.mode = mode
+        self.position = 0
+        self.functions = basic_functions()
+        self._reserve = 0  # trailing input bytes held back for `finalize`
+        self._buffer = bytearray()
+        self._finalized = False
+
+    def authenticate_additional_data(self, data):
+        """
+        Pass associated data to an authenticated mode. May be called several times, before the first `update`.
+
+        Raises:
+            ValueError: If the mode does not authenticate additional data, or data was already processed.
+        """
+        self.mode.authenticate_additional_data(data)
+
+    def update(self, data):
+        """
+        Process the next chunk of the stream.
+
+        Parameters:
+            data (str or bytes-like): The next chunk. Strings are encoded as UTF-8.
+
+        Returns:
+            bytes: The output for every block completed so far. It may be shorter than the input.
+
+        Raises:
+            ValueError: If the stream has already been finalized.
+        """
+        if self._finalized:
+            raise ValueError("update() called after finalize()")
+        data = memoryview(data.encode('utf-8') if isinstance(data, str) else data).cast('B')
+        total = len(self._buffer) + len(data)
+        ready = max(0, total - self._reserve) // 16 * 16
+        out = b''
+        if ready and self._buffer:
+            # finish the carried bytes on a block boundary; the buffer is never longer than two blocks
+            head = min(ready, -(-len(self._buffer) // 16) * 16)
+            if head <= len(self._buffer):
+                out = self._process(self._buffer[:head])
+                del self._buffer[:head]
+            else:
+                need = head - len(self._buffer)
+                out = self._process(self._buffer + data[:need])
+                data = data[need:]
+                self._buffer = bytearray()
+            ready -= head
+        if ready:
+            out += self._process(data[:ready])
+            data = data[ready:]
+        self._buffer += data
+        return out
+
+    def finalize(self):
+        """
+        Finish the stream, processing the last partial block.
+
+        Returns:
+            bytes: The remaining output.
+
+        Raises:
+            ValueError: If the stream has already been finalized, or a padded ciphertext is truncated or
+                        its padding is invalid.
+            InvalidTag: If the tag of an authenticated mode does not match.
+        """
+        if self._finalized:
+            raise ValueError("finalize() called twice")
+        self._finalized = True
+        buffer, self._buffer = bytes(self._buffer), bytearray()
+        return self._final(buffer)
+
+    def _final(self, buffer):
+        return self._process(buffer) if buffer else b''
+
+    def _process(self, data):
+        out = self._transform(data, self.position)
+        self.position += len(data)
+        return out
+
+    def _transform(self, data, offset):
+        raise NotImplementedError
+
+
+class Stream_Encryptor(Stream_Cipher):
+    """Incremental encryption, returned by `AES.encryptor`. For authenticated modes `finalize` appends the tag."""
+    def _final(self, buffer):
+        if self.mode.padding:
+            return self._process(self.functions.pkcs7_pad(buffer))
+        out = super()._final(buffer)
+        return out + self.mode.tag() if self.mode.tag_size else out
+
+    def _transform(self, data, offset):
+        return self.mode.encrypt(data, offset)
+
+
+class Stream_Decryptor(Stream_Cipher):
+    """
+    Incremental decryption, returned by `AES.decryptor`.
+
+    For padded modes the last block, and for authenticated modes the trailing tag, is held back until `finalize`.
+    Authenticated plaintext returned by `update` must not be used before `finalize` has verified the tag.
+    """
+    def __init__(self, mode):
+        super().__init__(mode)
+        self._reserve = mode.tag_size or (1 if mode.padding else 0)
+
+    def _final(self, buffer):
+        if self.mode.padding:
+            if len(buffer) != 16:
+                raise ValueError(f"{self.mode.name} ciphertext must be a non-empty multiple of 16 bytes long")
+            return self.functions.pkcs7_unpad(self._process(buffer))
+        if self.mode.tag_size:
+            if len(buffer) < self.mode.tag_size:
+                raise ValueError(f"{self.mode.name} ciphertext is shorter than its tag")
+            out = super()._final(buffer[:-self.mode.tag_size])
+            self.mode.verify(buffer[-self.mode.tag_size:])
+            return out
+        return super()._final(buffer)
+
+    def _transform(self, data, offset):
+        return self.mode.decrypt(data, offset)
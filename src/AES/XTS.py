@@ -0,0 +1,159 @@
+import numpy as np
+
+# Doubling steps larger than this would overflow the 64-bit reduction in `shift_tweaks`
+MAX_SHIFT = 56
+
+def shift_tweaks(tweaks, bits=1):
+    """
+    Multiply tweaks by alpha^bits (x^bits) in GF(2^128). With bits=1 this is the XTS doubling.
+
+    Parameters:
+        tweaks (np.ndarray): A '<u8' array of shape (..., 2) holding little-endian 128-bit tweaks as (low, high).
+        bits (int, optional): The power of alpha, 1 to `MAX_SHIFT`.
+
+    Returns:
+        np.ndarray: The multiplied tweaks, same shape.
+    """
+    low, high = tweaks[..., 0], tweaks[..., 1]
+    shift, back = np.uint64(bits), np.uint64(64 - bits)
+    overflow = high >> back
+    shifted = np.empty_like(tweaks)
+    shifted[..., 1] = (high << shift) | (low >> back)
+    # x^128 = x^7 + x^2 + x + 1, so the bits shifted out fold back in multiplied by 0x87
+    shifted[..., 0] = (low << shift) ^ overflow ^ (overflow << np.uint64(1)) ^ (overflow << np.uint64(2)) \
+                      ^ (overflow << np.uint64(7))
+    return shifted
+
+
+class XTS_Mode:
+    def __init__(self, encryption, decryption, data_keys, tweak_keys, sector_size=4096):
+        """
+        XTS-AES (IEEE 1619) for sector-addressed storage.
+
+        Every sector is encrypted on its own under a tweak derived from its sector number, so any sector can be
+        read or rewritten without touching its neighbours. Block j of a sector is encrypted as
+        E(K1, P ^ T_j) ^ T_j with T_0 = E(K2, sector number) and T_j = T_(j-1) * alpha. A sector whose length is
+        not a multiple of 16 bytes uses ciphertext stealing, so the ciphertext has the length of the plaintext.
+
+        Many sectors are processed as one batch: all the tweaks are encrypted in one engine call and extended for
+        all sectors at once in a handful of vector steps, then every data block of the batch goes through the
+        engine in one call. A single sector costs only its own blocks.
+
+        Parameters:
+            encryption: An object with `encrypt_blocks(data, keys)`, such as a registered backend's encryption.
+            decryption: An object with `decrypt_blocks(data, keys)`.
+            data_keys (Expanded_Key): The expanded data key K1.
+            tweak_keys (Expanded_Key): The expanded tweak key K2, which must differ from K1.
+            sector_size (int, optional): The sector size in bytes used by `encrypt_sectors`/`decrypt_sectors`.
+
+        Raises:
+            ValueError: If the two keys are equal or the sector size is below one block.
+        """
+        if data_keys.key == tweak_keys.key:
+            raise ValueError("XTS needs two different keys")
+        if sector_size < 16:
+            raise ValueError("XTS sectors must be at least 16 bytes long")
+        self.engine = encryption
+        self.decryption = decryption
+        self.data_keys = data_keys
+        self.tweak_keys = tweak_keys
+        self.sector_size = sector_size
+
+    def tweaks(self, sectors, blocks):
+        """
+        Compute the tweak sequence of every sector.
+
+        Parameters:
+            sectors (sequence of int): The sector numbers.
+            blocks (int): The number of tweaks per sector.
+
+        Returns:
+            np.ndarray: A uint8 array of shape (len(sectors), 16 * blocks).
+        """
+        numbers = b''.join(int(sector).to_bytes(16, 'little') for sector in sectors)
+        tweak = np.frombuffer(self.engine.encrypt_blocks(numbers, self.tweak_keys), dtype='<u8').reshape(-1, 2)
+        out = np.empty((len(tweak), blocks, 2), dtype='<u8')
+        out[:, 0] = tweak
+        # T_(j+k) = T_j * alpha^k: double the filled prefix until the steps reach MAX_SHIFT, then keep stepping
+        done = 1
+        while done < blocks:
+            step = min(done, MAX_SHIFT, blocks - done)
+            out[:, done:done + step] = shift_tweaks(out[:, done - step:done], step)
+            done += step
+        return out.view(np.uint8).reshape(len(tweak), 16 * blocks)
+
+    def encrypt_sector(self, sector, data):
+        """
+        Encrypt one sector.
+
+        Parameters:
+            sector (int): The sector number.
+            data (bytes-like): The sector plaintext, at least 16 bytes long.
+
+        Returns:
+            bytes: The sector ciphertext, the same length as `data`.
+        """
+        return self._transform([sector], data, len(data), True)
+
+    def decrypt_sector(self, sector, data):
+        """Decrypt one sector encrypted by `encrypt_sector`."""
+        return self._transform([sector], data, len(data), False)
+
+    def encrypt_sectors(self, sectors, data):
+        """
+        Encrypt consecutive sectors of `sector_size` bytes as one batch.
+
+        Parameters:
+            sectors (int or sequence of int): The number of the first sector, or the number of every sector.
+            data (bytes-like): The plaintext of all the sectors, a multiple of `sector_size` bytes long.
+
+        Returns:
+            bytes: The ciphertext of all the sectors.
+        """
+        return self._transform(self._numbers(sectors, data), data, self.sector_size, True)
+
+    def decrypt_sectors(self, sectors, data):
+        """Decrypt a batch of sectors encrypted by `encrypt_sectors`."""
+        return self._transform(self._numbers(sectors, data), data, self.sector_size, False)
+
+    def _numbers(self, sectors, data):
+        count, rest = divmod(len(memoryview(data).cast('B')), self.sector_size)
+        if rest:
+            raise ValueError(f"Data must be a multiple of the {self.sector_size} byte sector size")
+        if isinstance(sectors, int):
+            return range(sectors, sectors + count)
+        if len(sectors) != count:
+            raise ValueError(f"Got {len(sectors)} sector numbers for {count} sectors")
+        return sectors
+
+    def _blocks(self, data, tweaks, encrypt):
+        """XEX every 16-byte block of the (S, 16 * k) array `data` with the matching tweaks."""
+        blocks = np.ascontiguousarray(data ^ tweaks)
+        if encrypt:
+            out = self.engine.encrypt_blocks(blocks, self.data_keys)
+        else:
+            out = self.decryption.decrypt_blocks(blocks, self.data_keys)
+        return np.frombuffer(out, dtype=np.uint8).reshape(data.shape) ^ tweaks
+
+    def _transform(self, sectors, data, size, encrypt):
+        if size < 16:
+            raise ValueError("XTS sectors must be at least 16 bytes long")
+        if not len(sectors):
+            return b''
+        x = np.frombuffer(data, dtype=np.uint8).reshape(len(sectors), size)
+        full, partial = divmod(size, 16)
+        T = self.tweaks(sectors, full + (1 if partial else 0))
+        plain = 16 * (full - 1) if partial else 16 * full  # blocks before any ciphertext stealing
+        out = np.empty_like(x)
+        if plain:
+            out[:, :plain] = self._blocks(x[:, :plain], T[:, :plain], encrypt)
+        if partial:
+            # The last full block is processed with the last tweak when decrypting and with the one before when
+            # encrypting; its tail is stolen to pad the final partial block.
+            first, second = (T[:, plain:plain + 16], T[:, plain + 16:]) if encrypt else \
+                            (T[:, plain + 16:], T[:, plain:plain + 16])
+            stolen = self._blocks(x[:, plain:plain + 16], first, encrypt)
+            out[:, plain + 16:] = stolen[:, :partial]
+            last = np.concatenate([x[:, plain + 16:], stolen[:, partial:]], axis=1)
+            out[:, plain:plain + 16] = self._blocks(last, second, encrypt)
+        return out.tobytes()
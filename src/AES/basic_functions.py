@@ -1,5 +1,5 @@
-import numpy as np
 import hashlib as hash
+from AES.CipherText import CipherText
 class basic_functions():
     def __init__(self,mode = "encrypt") -> None:
         self.mode = mode
@@ -16,13 +16,14 @@ class basic_functions():
                 return False
         return False
     def to_hex(self ,*args):
-        """Convert data into hexadecimal format.
+        """Convert data into byte buffers.
         
         Parameters:
-            *args: Variable length argument list of data (string, integer, bytes, bytearray) to convert to hexadecimal.
+            *args: Variable length argument list of data (string, integer, bytes, bytearray) to convert to bytes.
+                   Strings are encoded as UTF-8.
         
         Returns:
-            list: A list of hexadecimal representations for each input value.
+            list: A list of bytearray buffers, one for each input value.
         
         Raises:
             ValueError: If the data type is not string, integer, bytes, or bytearray.
@@ -30,13 +31,11 @@ class basic_functions():
         segments = []
         for item in args:
             if isinstance(item, str):  # If the input is a string
-                segment = [hex(ord(char)).upper() for char in item]  # Convert each character to hex
+                segment = bytearray(item.encode('utf-8'))  # Encode the characters to bytes
             elif isinstance(item, int):  # If the input is an integer
-                segment = [hex(item).upper()]  # Convert integer to hex
-            elif isinstance(item, bytes):  # If the input is bytes
-                segment = [hex(byte).upper() for byte in item]  # Convert each byte to hex
-            elif isinstance(item, bytearray):  # If the input is bytearray
-                segment = [hex(byte).upper() for byte in item]  # Convert each byte to hex
+                segment = bytearray(item.to_bytes(max(1, (item.bit_length() + 7) // 8), 'big'))
+            elif isinstance(item, (bytes, bytearray, memoryview)):  # If the input is already binary
+                segment = bytearray(item)
             else:
                 raise ValueError("Unsupported data type. Expected string, integer, bytes, or bytearray.")              
             if len(args) == 1 and self.mode == 'decrypt':                                
@@ -44,80 +43,100 @@ class basic_functions():
             segments.append(segment)  # Add each segment to the list of segments    
         return segments                                          
     def padding(self,hex_data):
-        """Pads a list of hexadecimal data to 16 bytes if required.
+        """Pads a byte buffer to 16 bytes if required.
         
         Parameters:
-            hex_data (list): List of hexadecimal data strings.
+            hex_data (bytearray): The data to pad.
         
         Returns:
-            list: The input list padded to a length of 16 hexadecimal strings, using '0x00' as padding.
+            bytearray: The input buffer padded to a length of 16 bytes, using 0x00 as padding.
         """
-        pad = 16-len(hex_data)
-        for _ in range(pad):
-            hex_data.append('0x00')
+        hex_data = bytearray(hex_data)
+        hex_data.extend(bytes(max(0, 16 - len(hex_data))))
         return hex_data
-        
+
+    def pkcs7_pad(self,data,block_size=16):
+        """Pads data to a whole number of blocks with PKCS#7.
+
+        Every padding byte holds the number of padding bytes, and a full block of padding is added when the
+        data is already block aligned, so unlike zero padding the original length can always be recovered.
+
+        Parameters:
+            data (bytes-like): The data to pad.
+            block_size (int, optional): The block size in bytes.
+
+        Returns:
+            bytes: The padded data, 1 to `block_size` bytes longer than the input.
+        """
+        count = block_size - len(data) % block_size
+        return bytes(data) + bytes([count]) * count
+
+    def pkcs7_unpad(self,data,block_size=16):
+        """Removes PKCS#7 padding.
+
+        Parameters:
+            data (bytes-like): The padded data.
+            block_size (int, optional): The block size in bytes.
+
+        Returns:
+            bytes: The data without its padding.
+
+        Raises:
+            ValueError: If the data is not block aligned or the padding is malformed.
+        """
+        data = bytes(data)
+        count = data[-1] if data else 0
+        if len(data) % block_size or not 0 < count <= block_size or data[-count:] != bytes([count]) * count:
+            raise ValueError("Invalid PKCS#7 padding, the key, iv or ciphertext is wrong")
+        return data[:-count]
+
     def overflow(self,data):
         """
-        Splits a list of hexadecimal data into 16-byte chunks and pads the final chunk if necessary.
+        Splits a byte buffer into 16-byte blocks and pads the final block if necessary.
         
         This function divides the input `data` into multiple 16-byte segments, which are required for AES encryption.
-        Each segment is stored in `vals`. If the last chunk contains fewer than 16 bytes, it is padded to a length 
-        of 16 bytes using the `padding` function, which appends '0x00' as needed.
+        If the last block contains fewer than 16 bytes, it is padded with 0x00 bytes.
         
         Parameters:
-            data (list): A list of hexadecimal values, each represented as a string (e.g., '0x54', '0x68'). 
-                        The list can be of any length, and the function will split it into 16-byte segments.
+            data (bytes or bytearray): The data to split. It can be of any length.
                         
         Returns:
-            list: A list of 16-byte segments, where each segment is a list of 16 hexadecimal strings. 
-                The last segment is padded with '0x00' if its length is less than 16.
+            np.ndarray: A uint8 array of shape (N, 16), one row per block.
                 
         Example:
-            >>> data = ['0x54', '0x68', '0x69', '0x73', '0x20', '0x69', '0x73', '0x20',
-                        '0x74', '0x68', '0x65', '0x20', '0x54', '0x65', '0x78', '0x74', 
-                        '0x00', '0x01']
-        >>> overflow(data) = [['0x54', '0x68', '0x69', '0x73', '0x20', '0x69', '0x73', '0x20',
-        '0x74', '0x68', '0x65', '0x20', '0x54', '0x65', '0x78', '0x74'],
-        ['0x00', '0x01', '0x00', '0x00', '0x00', '0x00', '0x00', '0x00',
-        '0x00', '0x00', '0x00', '0x00', '0x00', '0x00', '0x00', '0x00']]
+            >>> overflow(b'This is Text' + bytes(4) + b'\x00\x01')
+            array([[ 84, 104, 105, 115,  32, 105, 115,  32,  84, 101, 120, 116,   0,   0,   0,   0],
+                   [  0,   1,   0,   0,   0,   0,   0,   0,   0,   0,   0,   0,   0,   0,   0,   0]], dtype=uint8)
         """        
-        vals = []
-        matrix_data = []
-        for byte in data:
-            matrix_data.append(byte)
-            if len(matrix_data) == 16:
-                vals.append(matrix_data)
-                matrix_data = [] 
-        if len(matrix_data) < 16:
-            vals.append(self.padding(matrix_data)) 
-        return vals                                          
+        data = bytes(data)
+        blocks = max(1, -(-len(data) // 16))
+        import numpy as np
+        vals = np.zeros(blocks * 16, dtype=np.uint8)
+        vals[:len(data)] = np.frombuffer(data, dtype=np.uint8)
+        return vals.reshape(blocks, 16)
    
     def hex_to_matrix(self,*args):
         """
-        Convert a list of hexadecimal values into a 4x4 matrix.
+        Convert a byte buffer into a 4x4 state matrix.
     
         Parameters:
-            *args: Variable length argument list of hexadecimal data to arrange into a 4x4 matrix. 
-                Assumes 16 hexadecimal values are provided; otherwise, padding or error handling may be necessary.
+            *args: Variable length argument list of byte buffers to arrange into a 4x4 matrix. 
+                The first 16 bytes are used and are written into the matrix column by column.
                 
         Returns:
-            list: A 4x4 matrix (list of lists) containing the hexadecimal values for encryption purposes.
+            list: A list of 4x4 uint8 matrices containing the bytes for encryption purposes.
         """                     
+        import numpy as np
         segments = []              
         for item in args:                         
-            count = 0
-            matrix = [['00' for _ in range(4)] for _ in range(4)]                    
-            for i in range(4):
-                for j in range(4):                                      
-                    matrix[j][i] = item[count]
-                    count+=1  
+            matrix = np.frombuffer(bytes(item), dtype=np.uint8)[:16].reshape(4, 4).T
             if len(args) == 1 and self.mode == 'decrypt':                                
-                return np.array(matrix)                                    
-            segments.append(np.array(matrix))            
+                return matrix                                    
+            segments.append(matrix)            
         return segments
     
     def concatText(self ,*args):
+        import numpy as np
         return np.concatenate(args,axis = 1)         
 
     def hash_key(self, key, AESMODE):   
@@ -133,11 +152,30 @@ class basic_functions():
         return bytearray(key)
                  
     def to_text(self ,*args):        
-        matrixs = np.array(args)
-        convertedText = []
-        for matrix in matrixs:
-            for row in matrix.T:
-                for col in row:
-                    convertedText.append(int(col,16))      
-        text = ''.join(chr(char) for char in convertedText)
-        return text
\ No newline at end of file
+        import numpy as np
+        matrixs = np.array(args, dtype=np.uint8)
+        data = matrixs.transpose(0, 2, 1).tobytes()  # read each state column by column
+        return data.decode('utf-8', errors='replace')
+
+    def to_hex_string(self ,*args):
+        """Format byte buffers or state matrices as a hexadecimal string for display.
+        
+        Parameters:
+            *args: Byte buffers, CipherText objects, or uint8 state matrices of shape (4, 4) or (N, 4, 4).
+        
+        Returns:
+            str: The upper case hexadecimal representation of the bytes, in encryption order.
+        """
+        segments = []
+        for item in args:
+            if isinstance(item, CipherText):
+                item = item.data
+            if isinstance(item, (bytes, bytearray, memoryview)):
+                segments.append(bytes(item).hex().upper())
+                continue
+            import numpy as np
+            item = np.asarray(item, dtype=np.uint8)
+            if item.ndim >= 2:
+                item = np.swapaxes(item, -1, -2)  # states are stored column by column
+            segments.append(item.tobytes().hex().upper())
+        return ''.join(segments)
@@ -0,0 +1,240 @@
+from AES.AES import AES
+from AES.AES_Encryption import Encryption
+from AES.AES_Decryption import Decryption
+from AES.Key_Expansion import Key_Expansion
+from AES.SBOX import SBOX
+from AES.basic_functions import basic_functions
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+KEY_SIZES = (128, 192, 256)
+# 16 B, 1 KiB, 64 KiB, 1 MiB, 16 MiB and 100 MiB messages
+MESSAGE_SIZES = (16, 1 << 10, 1 << 16, 1 << 20, 1 << 24, 100 << 20)
+# Sizes run by --quick
+QUICK_LIMIT = 1 << 20
+# Printable ASCII, so decrypted messages decode to text of the same length as in real use
+_PRINTABLE = bytes(32 + value % 95 for value in range(256))
+
+def parse_size(text):
+    """Parse a message size such as "16", "64K", "1M" or "100M" into bytes."""
+    text = text.strip().upper().rstrip("B")
+    scale = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}.get(text[-1:], 1)
+    return int(text[:-1] if scale > 1 else text) * scale
+
+def format_size(size):
+    for unit, scale in (("G", 1 << 30), ("M", 1 << 20), ("K", 1 << 10)):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale}{unit}"
+    return f"{size}B"
+
+def percentile(values, q):
+    """The q-th percentile of `values`, interpolating linearly between the closest ranks."""
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+def measure(func, min_time=1.0, max_samples=10000):
+    """
+    Time `func` after one call under tracemalloc, which also warms up caches.
+
+    Calls that take less than a millisecond are grouped into batches, so each sample is long enough for the timer.
+    Samples are taken until `min_time` seconds have been spent, or `max_samples` are reached, and at least one
+    sample is always taken.
+
+    Returns:
+        dict: seconds per call for every sample, and the peak memory in bytes allocated by the traced call.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= 1e-3 or number >= 1 << 20:
+            break
+        number *= 10
+    samples = [elapsed / number]
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_samples and time.perf_counter() < deadline:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {"samples": samples, "peak_bytes": peak}
+
+def _result(name, group, measured, size=None, blocks=1):
+    samples = measured["samples"]
+    median = percentile(samples, 50)
+    result = {
+        "name": name,
+        "group": group,
+        "samples": len(samples),
+        "median_s": median,
+        "latency_us": {f"p{q}": percentile(samples, q) / blocks * 1e6 for q in (50, 90, 99)},
+        "peak_bytes": measured["peak_bytes"],
+    }
+    if size is not None:
+        result["bytes"] = size
+        result["mb_per_s"] = size / median / 1e6
+    return result
+
+def bench_primitives(min_time):
+    """
+    Time the building blocks of the reference implementation on one random 4x4 state.
+
+    Returns:
+        list: One result per primitive, latency per call.
+    """
+    import numpy as np
+    state = np.frombuffer(os.urandom(16), dtype=np.uint8).reshape(4, 4).copy()
+    sbox, functions = SBOX(), basic_functions()
+    encryption, decryption = Encryption(128), Decryption(128)
+    primitives = [
+        ("SBOX.matrix_Sub", lambda: sbox.matrix_Sub(state)),
+        ("Encryption.shift_rows", lambda: encryption.shift_rows(state)),
+        ("Encryption.mix_cols", lambda: encryption.mix_cols(state)),
+        ("Decryption.invMixCols", lambda: decryption.invMixCols(state)),
+        ("basic_functions.to_hex", lambda: functions.to_hex("sixteen byte txt")),
+        ("basic_functions.to_text", lambda: functions.to_text(state)),
+    ]
+    for AESMODE in KEY_SIZES:
+        expansion = Key_Expansion({128: 10, 192: 12, 256: 14}[AESMODE])
+        key_matrix = np.frombuffer(os.urandom(AESMODE // 8), dtype=np.uint8).reshape(-1, 4).T
+        primitives.append((f"Key_Expansion.key_expansion/AES-{AESMODE}",
+                           lambda expansion=expansion, key_matrix=key_matrix: expansion.key_expansion(key_matrix)))
+    return [_result(f"primitive/{name}", "primitive", measure(func, min_time)) for name, func in primitives]
+
+def bench_messages(key_sizes, sizes, engine, min_time):
+    """
+    Time `AES.Encryption` and `AES.Decryption` for every key size and message size, on printable text under a raw
+    key, so key derivation is left out.
+
+    Returns:
+        list: One result per key size, message size and direction, latency per 16-byte block.
+    """
+    results = []
+    for AESMODE in key_sizes:
+        aes = AES(AESMODE, engine=engine)
+        key = os.urandom(AESMODE // 8)
+        for size in sizes:
+            text = os.urandom(size).translate(_PRINTABLE)
+            ciphertext = aes.Encryption(text, key)
+            blocks = max(1, -(-size // 16))
+            for operation, func in (("Encryption", lambda: aes.Encryption(text, key)),
+                                    ("Decryption", lambda: aes.Decryption(ciphertext, key))):
+                name = f"{operation}/AES-{AESMODE}/{format_size(size)}"
+                print(f"  {name}", file=sys.stderr, flush=True)
+                results.append(_result(name, operation, measure(func, min_time, max_samples=1000), size, blocks))
+            del text, ciphertext
+    return results
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Compare results with a baseline run by the median time per call.
+
+    Parameters:
+        results (list): Results of this run.
+        baseline (dict): A JSON document written by an earlier run.
+        tolerance (float, optional): The slowdown, as a fraction, above which a result counts as a regression.
+
+    Returns:
+        list: (name, ratio, regressed) for every result present in both runs, where ratio is the current median
+              time over the baseline's.
+    """
+    previous = {result["name"]: result for result in baseline.get("results", [])}
+    rows = []
+    for result in results:
+        base = previous.get(result["name"])
+        if base is None or not base.get("median_s"):
+            continue
+        ratio = result["median_s"] / base["median_s"]
+        rows.append((result["name"], ratio, ratio > 1 + tolerance))
+    return rows
+
+def report(results, comparison=(), out=sys.stdout):
+    ratios = {name: (ratio, regressed) for name, ratio, regressed in comparison}
+    print(f"{'benchmark':<44} {'MB/s':>9} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'peak KiB':>10}"
+          f" {'vs base':>8}", file=out)
+    for result in results:
+        latency = result["latency_us"]
+        throughput = f"{result['mb_per_s']:9.2f}" if "mb_per_s" in result else f"{'':9}"
+        line = (f"{result['name']:<44} {throughput} {latency['p50']:10.3f} {latency['p90']:10.3f}"
+                f" {latency['p99']:10.3f} {result['peak_bytes'] / 1024:10.1f}")
+        if result["name"] in ratios:
+            ratio, regressed = ratios[result["name"]]
+            line += f" {ratio:7.2f}x" + (" REGRESSION" if regressed else "")
+        print(line, file=out)
+
+def environment():
+    """Describe the machine and library versions, stored with the results so runs can be told apart."""
+    import numpy as np
+    return {
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m AES.bench",
+                                     description="Benchmark the AES primitives and whole-message encryption. "
+                                                 "Latencies are per call for primitives and per 16-byte block for "
+                                                 "messages.")
+    parser.add_argument("--sizes", type=lambda text: [parse_size(size) for size in text.split(",")],
+                        default=list(MESSAGE_SIZES), help="comma separated message sizes, e.g. 16,1K,1M,100M")
+    parser.add_argument("--key-sizes", type=lambda text: [int(size) for size in text.split(",")],
+                        default=list(KEY_SIZES), help="comma separated key sizes in bits")
+    parser.add_argument("--quick", action="store_true", help=f"skip messages over {format_size(QUICK_LIMIT)}")
+    parser.add_argument("--engine", default="batch", help="the AES backend, see Backends.available_backends()")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds spent sampling each benchmark")
+    parser.add_argument("--skip-primitives", action="store_true")
+    parser.add_argument("--skip-messages", action="store_true")
+    parser.add_argument("--output", default="aes_bench.json", help="where to write the JSON results")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="slowdown against the baseline, as a fraction, reported as a regression")
+    args = parser.parse_args(argv)
+    sizes = [size for size in args.sizes if not args.quick or size <= QUICK_LIMIT]
+
+    results = []
+    if not args.skip_primitives:
+        print("primitives", file=sys.stderr, flush=True)
+        results += bench_primitives(args.min_time)
+    if not args.skip_messages:
+        print("messages", file=sys.stderr, flush=True)
+        results += bench_messages(args.key_sizes, sizes, args.engine, args.min_time)
+
+    comparison = []
+    if args.baseline:
+        with open(args.baseline) as file:
+            comparison = compare(results, json.load(file), args.tolerance)
+    report(results, comparison)
+    document = {"environment": environment(), "engine": args.engine, "results": results}
+    with open(args.output, "w") as file:
+        json.dump(document, file, indent=2)
+    print(f"results written to {args.output}", file=sys.stderr)
+    regressions = [name for name, _, regressed in comparison if regressed]
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 from tkinter import Tk, ttk
 from AES.AES import AES
+from AES.basic_functions import basic_functions
 
 class AES_GUI:
     def __init__(self) -> None:        
@@ -46,7 +47,7 @@ class AES_GUI:
         self.cyphertext = self.aes.Encryption(self.get_text(self.text_entry), self.get_text(self.key_entry))
         
         print("Encrypted Text:")
-        print(self.cyphertext)
+        print(basic_functions().to_hex_string(self.cyphertext))
         
     def aes_decryption(self):
         aes_mode = int(self.get_text(self.AESMODE_entry))
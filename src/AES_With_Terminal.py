@@ -1,4 +1,5 @@
 from AES.AES import AES
+from AES.basic_functions import basic_functions
 
 AESMODE = None
 while True:
@@ -16,7 +17,7 @@ key = input("Enter the Key for the encryption: ")
 aes = AES(AESMODE=AESMODE)
 cyphertext = aes.Encryption(text,key)
 print('Encrypted text')
-print(cyphertext) 
+print(basic_functions().to_hex_string(cyphertext)) 
 
 decryptedtext = aes.Decryption(cyphertext,key)
 print('Decrypted text')
@@ -0,0 +1,48 @@
+from AES.AES_Batch import Batch_Engine
+from AES.AES_Bitslice import Bitslice_Engine
+from AES.Key_Expansion import Expanded_Key, expand_keys
+import numpy as np
+import os
+import pytest
+
+KEY_SIZES = (128, 192, 256)
+
+@pytest.fixture
+def no_table_lookups(monkeypatch):
+    """Fail if the bitsliced engine falls back to the S-box gathers of the batch engine."""
+    def lookup(*args):
+        raise AssertionError("table lookup on the bitslice engine")
+    monkeypatch.setattr(Bitslice_Engine, "_lookup", lookup)
+
+def _multi_key_input(AESMODE, blocks=200, keys=5):
+    schedules = expand_keys([os.urandom(AESMODE // 8) for _ in range(keys)], AESMODE)
+    index = np.random.randint(0, keys, blocks)
+    return os.urandom(16 * blocks), schedules, index
+
+@pytest.mark.parametrize("AESMODE", KEY_SIZES)
+def test_encrypt_blocks_multi(AESMODE, no_table_lookups):
+    data, schedules, index = _multi_key_input(AESMODE)
+    expected = Batch_Engine(AESMODE).encrypt_blocks_multi(data, schedules, index)
+    assert Bitslice_Engine(AESMODE, chunk_blocks=64).encrypt_blocks_multi(data, schedules, index) == expected
+
+@pytest.mark.parametrize("AESMODE", KEY_SIZES)
+def test_decrypt_blocks_multi(AESMODE, no_table_lookups):
+    data, schedules, index = _multi_key_input(AESMODE)
+    ciphertext = Batch_Engine(AESMODE).encrypt_blocks_multi(data, schedules, index)
+    assert Bitslice_Engine(AESMODE, chunk_blocks=64).decrypt_blocks_multi(ciphertext, schedules, index) == data
+
+@pytest.mark.parametrize("AESMODE", KEY_SIZES)
+def test_encrypt_blocks_into(AESMODE, no_table_lookups):
+    keys = Expanded_Key(os.urandom(AESMODE // 8), AESMODE)
+    src = np.frombuffer(os.urandom(16 * 200), dtype=np.uint8)
+    dst = np.empty_like(src)
+    Bitslice_Engine(AESMODE, chunk_blocks=64).encrypt_blocks_into(src, dst, keys)
+    assert dst.tobytes() == Batch_Engine(AESMODE).encrypt_blocks(src, keys)
+
+@pytest.mark.parametrize("AESMODE", KEY_SIZES)
+def test_decrypt_blocks_into_in_place(AESMODE, no_table_lookups):
+    keys = Expanded_Key(os.urandom(AESMODE // 8), AESMODE)
+    plaintext = os.urandom(16 * 200)
+    buffer = np.frombuffer(bytearray(Batch_Engine(AESMODE).encrypt_blocks(plaintext, keys)), dtype=np.uint8)
+    Bitslice_Engine(AESMODE, chunk_blocks=64).decrypt_blocks_into(buffer, buffer, keys)
+    assert buffer.tobytes() == plaintext
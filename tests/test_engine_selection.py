@@ -0,0 +1,45 @@
+from AES.AES import AES
+from AES.AES_Batch import Batch_Engine
+from AES.Backends import verify_backend
+import numpy as np
+import os
+import pytest
+
+@pytest.fixture
+def no_batch_rounds(monkeypatch):
+    """Fail if any block runs through the table-based rounds of the batch engine."""
+    for AESMODE in (128, 192, 256):  # verify first, the check itself runs the batch engine
+        for name in ("batch", "bitslice"):
+            assert verify_backend(name, AESMODE)
+    def rounds(*args):
+        raise AssertionError("batch engine used")
+    for name in ("encrypt_states", "decrypt_states", "_encrypt_into", "_decrypt_into"):
+        monkeypatch.setattr(Batch_Engine, name, rounds)
+
+@pytest.mark.parametrize("mode", ["ECB", "CTR"])
+def test_many_runs_on_bitslice(mode, no_batch_rounds):
+    aes = AES(128, engine="bitslice")
+    pairs = [(os.urandom(16), os.urandom(size)) for size in (0, 5, 16, 40, 100)]
+    ivs = [os.urandom(12) for _ in pairs] if mode == "CTR" else None
+    ciphertexts = aes.encrypt_many(pairs, mode, ivs)
+    for (key, message), ciphertext in zip(pairs, ciphertexts):
+        assert ciphertext.data == aes.encrypt(message, key, mode, ciphertext.iv).data
+    assert aes.decrypt_many([(key, c) for (key, _), c in zip(pairs, ciphertexts)]) == [m for _, m in pairs]
+
+@pytest.mark.parametrize("mode", ["ECB", "CTR"])
+def test_into_runs_on_bitslice(mode, no_batch_rounds):
+    aes = AES(256, engine="bitslice", small_message=0)
+    key, iv = os.urandom(32), os.urandom(16)
+    data = os.urandom(16 * 100)
+    buffer = np.frombuffer(bytearray(data), dtype=np.uint8)
+    assert aes.encrypt_into(buffer, buffer, key, mode, iv) == len(data)
+    expected = aes.encrypt(data, key, mode, iv).data
+    assert buffer.tobytes() == expected[:len(data)]
+    aes.decrypt_into(buffer, buffer, key, mode, iv)
+    assert buffer.tobytes() == data
+
+def test_ttable_falls_back_to_batch():
+    aes = AES(128, engine="ttable")
+    key = os.urandom(16)
+    ciphertext, = aes.encrypt_many([(key, b"message")], "CTR", [b"nonce"])
+    assert ciphertext.data == aes.encrypt(b"message", key, "CTR", b"nonce").data
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Two schedulers back to back, after a SharedMemory has already started the parent's resource tracker
+SCRIPT = """
+import os
+from multiprocessing import shared_memory
+from AES.AES import AES
+shm = shared_memory.SharedMemory(create=True, size=16)
+shm.close()
+shm.unlink()
+aes = AES(128)
+key, iv = os.urandom(16), os.urandom(16)
+data = os.urandom(1 << 18)
+for _ in range(2):
+    with aes.parallel(processes=2, chunk_size=1 << 16) as scheduler:
+        ciphertext = scheduler.encrypt(data, key, "CTR", iv)
+        assert ciphertext == aes.encrypt(data, key, "CTR", iv).data
+        assert scheduler.decrypt(ciphertext, key, "CTR", iv) == data
+"""
+
+def test_schedulers_leave_resource_tracker_clean():
+    env = dict(os.environ, PYTHONPATH=SRC)
+    result = subprocess.run([sys.executable, "-c", SCRIPT], env=env, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    assert result.stderr == ""